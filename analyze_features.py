@@ -1,166 +1,277 @@
 # -*- coding: utf-8 -*-
 """
-分析 Shapefile 中的要素数量与实际地理实体的对应关系
+分析 Shapefile 中的要素数量与实际地理实体的对应关系，并输出数据概况报告
+
+所有统计都基于 shapely/pandas 的向量化计算（不逐个遍历要素），多个图层在进程池中并行分析，
+结果写入 JSON 报告，便于在导入前检查大数据集:
+    python analyze_features.py                          # 分析 config.SHAPEFILE_PATHS 中的图层
+    python analyze_features.py shp/点_村.shp shp/面_水系.shp --output output/profile.json
 """
 
-import geopandas as gpd
+import argparse
+import json
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyogrio
+import shapely
+
 import config
+from importer.reader import DEFAULT_ENCODINGS, detect_encoding
 
+# 每个字段输出的高频值个数
+TOP_VALUES = 5
 
-def analyze_shapefile(file_path, layer_name):
-    """分析单个 Shapefile"""
-    print(f"\n{'='*60}")
-    print(f"分析: {layer_name}")
-    print(f"{'='*60}")
-    
-    if not os.path.exists(file_path):
-        print(f"[错误] 文件不存在: {file_path}")
+# 分布统计的分位数
+PERCENTILES = [25, 50, 75, 95]
+
+
+def describe_distribution(values):
+    """
+    数值分布统计（忽略 NaN）
+
+    返回:
+        dict 或 None（没有有效值时）
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
         return None
-    
-    # 尝试多种编码读取
-    encodings = ['gbk', 'gb2312', 'utf-8', 'cp936']
-    gdf = None
-    
-    for encoding in encodings:
-        try:
-            gdf = gpd.read_file(file_path, encoding=encoding)
-            print(f"[OK] 成功读取 (编码: {encoding})")
-            break
-        except:
+    result = {
+        'count': int(len(values)),
+        'sum': float(values.sum()),
+        'mean': float(values.mean()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+    }
+    for p, q in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        result[f'p{p}'] = float(q)
+    return result
+
+
+def profile_geometries(geoms):
+    """
+    几何统计：类型、部件数、顶点数、有效性、重复几何
+
+    参数:
+        geoms: 几何 numpy 数组
+    """
+    missing = shapely.is_missing(geoms)
+    empty = shapely.is_empty(geoms) & ~missing
+    present = ~(missing | empty)
+
+    type_names = pd.Series(shapely.get_type_id(geoms)).map(
+        dict(enumerate(['Point', 'LineString', 'LinearRing', 'Polygon', 'MultiPoint',
+                        'MultiLineString', 'MultiPolygon', 'GeometryCollection']))
+    )
+    parts = shapely.get_num_geometries(geoms)
+    vertices = shapely.get_num_coordinates(geoms)
+
+    valid = shapely.is_valid(geoms)
+    invalid_idx = np.flatnonzero(present & ~valid)
+    reasons = pd.Series(shapely.is_valid_reason(geoms[invalid_idx]), dtype=object)
+    reason_counts = reasons.str.replace(r'\[.*\]$', '', regex=True).value_counts()
+
+    wkb = pd.Series(shapely.to_wkb(geoms[present]), dtype=object)
+
+    return {
+        'null': int(missing.sum()),
+        'empty': int(empty.sum()),
+        'types': {k: int(v) for k, v in type_names[present].value_counts().items()},
+        'singlepart': int((present & (parts == 1)).sum()),
+        'multipart': int((present & (parts > 1)).sum()),
+        'parts': describe_distribution(parts[present]),
+        'vertices': describe_distribution(vertices[present]),
+        'invalid': int(len(invalid_idx)),
+        'invalid_reasons': {k: int(v) for k, v in reason_counts.items()},
+        'duplicate_geometries': int(wkb.duplicated().sum()),
+    }
+
+
+def profile_measures(gdf):
+    """
+    面积/长度分布（按 UTM 投影计算，单位: 平方米/米）与范围
+    """
+    result = {'bbox': [float(v) for v in gdf.total_bounds] if not gdf.empty else None,
+              'crs': gdf.crs.to_string() if gdf.crs else None}
+    geoms = gdf.geometry
+    if geoms.isna().all():
+        return result
+
+    projected = gdf
+    if gdf.crs is None or gdf.crs.is_geographic:
+        if gdf.crs is None:
+            projected = gdf.set_crs(epsg=4326)
+        projected = projected.to_crs(projected.estimate_utm_crs())
+    result['projected_crs'] = projected.crs.to_string()
+
+    values = projected.geometry.values
+    dimension = shapely.get_dimensions(values)
+    if (dimension == 2).any():
+        result['area_m2'] = describe_distribution(np.where(dimension == 2, shapely.area(values), np.nan))
+    if (dimension == 1).any():
+        result['length_m'] = describe_distribution(np.where(dimension == 1, shapely.length(values), np.nan))
+    return result
+
+
+def profile_attributes(gdf):
+    """属性统计：类型、空值数、基数（不同值个数）与高频值"""
+    attributes = {}
+    for col in gdf.columns:
+        if col == gdf.geometry.name:
             continue
-    
-    if gdf is None:
-        print(f"[错误] 无法读取文件")
-        return None
-    
-    # 基本信息
+        series = gdf[col]
+        counts = series.value_counts(dropna=True)
+        attributes[col] = {
+            'dtype': str(series.dtype),
+            'null': int(series.isna().sum()),
+            'distinct': int(len(counts)),
+            'distinct_ratio': float(len(counts) / len(series)) if len(series) else 0.0,
+            'top': [[str(k), int(v)] for k, v in counts.head(TOP_VALUES).items()],
+        }
+    return attributes
+
+
+def analyze_shapefile(file_path, layer_name, encodings=None):
+    """
+    分析单个 Shapefile（在工作进程中执行）
+
+    参数:
+        file_path: Shapefile 路径
+        layer_name: 图层名称
+        encodings: 候选编码列表
+
+    返回:
+        dict: 分析结果（失败时包含 error）
+    """
+    report = {'name': layer_name, 'path': file_path}
+    started = time.perf_counter()
+    if not os.path.exists(file_path):
+        report['error'] = f"文件不存在: {file_path}"
+        return report
+
+    try:
+        encoding = detect_encoding(file_path, encodings)
+        gdf = pyogrio.read_dataframe(file_path, encoding=encoding)
+        report['encoding'] = encoding
+        report['read_seconds'] = time.perf_counter() - started
+
+        geoms = np.asarray(gdf.geometry.array, dtype=object)
+        report['features'] = int(len(gdf))
+        report['geometry'] = profile_geometries(geoms)
+        report.update(profile_measures(gdf))
+        report['attributes'] = profile_attributes(gdf)
+
+        attribute_frame = gdf.drop(columns=gdf.geometry.name)
+        attribute_frame['__wkb'] = shapely.to_wkb(geoms)
+        report['duplicate_features'] = int(attribute_frame.duplicated().sum())
+    except Exception as e:
+        report['error'] = str(e)
+
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def print_summary(report):
+    """输出单个图层的分析摘要"""
+    print(f"\n{'='*60}")
+    print(f"分析: {report['name']}")
+    print(f"{'='*60}")
+    if 'error' in report:
+        print(f"[错误] {report['error']}")
+        return
+
+    geometry = report['geometry']
     print(f"\n【基本信息】")
-    print(f"要素总数: {len(gdf)}")
-    print(f"几何类型: {gdf.geom_type.unique()}")
-    
-    # 检查 MultiPart 几何
+    print(f"要素总数: {report['features']} (编码: {report['encoding']}, 用时 {report['seconds']:.2f} 秒)")
+    print(f"几何类型: {geometry['types']}")
+    print(f"范围: {report['bbox']}")
+
     print(f"\n【MultiPart 分析】")
-    multipart_count = 0
-    singlepart_count = 0
-    
-    for idx, geom in enumerate(gdf.geometry):
-        if geom is None or geom.is_empty:
-            continue
-        
-        # 检查是否为 MultiPart
-        if geom.geom_type.startswith('Multi'):
-            multipart_count += 1
-            # 获取部分数量
-            if hasattr(geom, 'geoms'):
-                parts = len(geom.geoms)
-                print(f"  要素 {idx+1}: MultiPart，包含 {parts} 个部分")
-        else:
-            singlepart_count += 1
-    
-    print(f"单部分要素: {singlepart_count}")
-    print(f"多部分要素: {multipart_count}")
-    
-    if multipart_count > 0:
-        print(f"\n[注意] 有 {multipart_count} 个 MultiPart 要素")
-        print(f"   这意味着要素数量 != 实际地理实体数量")
-        print(f"   实际地理实体数量可能更多")
+    print(f"单部分要素: {geometry['singlepart']}")
+    print(f"多部分要素: {geometry['multipart']}")
+    if geometry['multipart'] > 0:
+        print(f"[注意] 有 {geometry['multipart']} 个 MultiPart 要素，"
+              f"实际地理实体数量为 {int(geometry['parts']['sum'])} 个部分")
     else:
-        print(f"\n[OK] 所有要素都是单部分")
-        print(f"   要素数量 = 实际地理实体数量")
-    
-    # 属性字段信息
-    print(f"\n【属性字段】")
-    print(f"字段列表: {list(gdf.columns)}")
-    
-    # 如果有 name 字段，统计唯一名称数量
-    if 'name' in gdf.columns:
-        unique_names = gdf['name'].dropna().nunique()
-        print(f"唯一名称数量: {unique_names}")
-        print(f"要素数量: {len(gdf)}")
-        
-        if unique_names < len(gdf):
-            print(f"[注意] 有 {len(gdf) - unique_names} 个要素可能没有名称或名称重复")
-        elif unique_names == len(gdf):
-            print(f"[OK] 每个要素都有唯一名称")
-    
-    # 统计空值
+        print(f"[OK] 所有要素都是单部分，要素数量 = 实际地理实体数量")
+    if geometry['vertices']:
+        print(f"顶点数: 合计 {int(geometry['vertices']['sum'])}, 最多 {int(geometry['vertices']['max'])}")
+
     print(f"\n【数据质量】")
-    null_counts = gdf.isnull().sum()
-    if null_counts.sum() > 0:
-        print("空值统计:")
-        for col, count in null_counts.items():
-            if count > 0:
-                print(f"  {col}: {count} 个空值")
-    else:
-        print("[OK] 没有发现空值")
-    
-    return gdf
+    print(f"空几何: {geometry['null'] + geometry['empty']}, 无效几何: {geometry['invalid']} {geometry['invalid_reasons'] or ''}")
+    print(f"重复几何: {geometry['duplicate_geometries']}, 重复要素: {report['duplicate_features']}")
+    nulls = {col: attr['null'] for col, attr in report['attributes'].items() if attr['null']}
+    print(f"空值统计: {nulls}" if nulls else "[OK] 没有发现空值")
+    if 'name' in report['attributes']:
+        print(f"唯一名称数量: {report['attributes']['name']['distinct']}")
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description='Shapefile 要素数量与数据概况分析（向量化、多进程）')
+    parser.add_argument('paths', nargs='*', help='Shapefile 路径（默认使用 config.SHAPEFILE_PATHS）')
+    parser.add_argument('--output', default=os.path.join(config.OUTPUT_CONFIG['output_dir'], 'feature_profile.json'),
+                        help='JSON 报告路径（默认: output/feature_profile.json）')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认: 图层数与CPU数的较小值）')
+    parser.add_argument('--encoding', action='append', dest='encodings',
+                        help=f"Shapefile 属性编码，可重复指定（默认依次尝试: {', '.join(DEFAULT_ENCODINGS)}）")
+    return parser
 
 
-def main():
+def main(argv=None):
     """主函数"""
+    # 修复Windows控制台编码问题
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except Exception:
+            pass
+
+    args = build_parser().parse_args(argv)
+    if args.paths:
+        layers = [(path, os.path.splitext(os.path.basename(path))[0]) for path in args.paths]
+    else:
+        layers = [
+            (config.SHAPEFILE_PATHS['point'], '点_村（村庄点数据）'),
+            (config.SHAPEFILE_PATHS['line'], '线_河渠（河渠线数据）'),
+            (config.SHAPEFILE_PATHS['polygon'], '面_水系（水系面数据）'),
+        ]
+
     print("="*60)
     print("Shapefile 要素数量分析")
     print("="*60)
-    print("\n说明:")
-    print("- 要素数量通常对应实际地理实体数量")
-    print("- 但如果存在 MultiPart 几何，一个要素可能包含多个部分")
-    print("- 本脚本将检查是否存在 MultiPart 情况")
-    
-    # 分析点数据
-    point_gdf = analyze_shapefile(
-        config.SHAPEFILE_PATHS['point'],
-        '点_村（村庄点数据）'
-    )
-    
-    # 分析线数据
-    line_gdf = analyze_shapefile(
-        config.SHAPEFILE_PATHS['line'],
-        '线_河渠（河渠线数据）'
-    )
-    
-    # 分析面数据
-    polygon_gdf = analyze_shapefile(
-        config.SHAPEFILE_PATHS['polygon'],
-        '面_水系（水系面数据）'
-    )
-    
-    # 总结
+
+    started = time.perf_counter()
+    workers = args.workers or min(len(layers), os.cpu_count() or 1)
+    if workers <= 1:
+        reports = [analyze_shapefile(path, name, args.encodings) for path, name in layers]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(analyze_shapefile, path, name, args.encodings) for path, name in layers]
+            reports = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    for report in reports:
+        print_summary(report)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'seconds': elapsed, 'layers': reports},
+                  f, ensure_ascii=False, indent=2)
+
     print(f"\n{'='*60}")
-    print("总结")
+    print(f"分析完成: {len(reports)} 个图层, 用时 {elapsed:.2f} 秒")
+    print(f"报告已保存: {args.output}")
     print(f"{'='*60}")
-    
-    if point_gdf is not None:
-        multipart_points = sum(1 for geom in point_gdf.geometry 
-                              if geom is not None and not geom.is_empty 
-                              and geom.geom_type.startswith('Multi'))
-        if multipart_points == 0:
-            print(f"[OK] 点数据: {len(point_gdf)} 个要素 = {len(point_gdf)} 个村庄")
-        else:
-            print(f"[注意] 点数据: {len(point_gdf)} 个要素，但包含 MultiPart")
-    
-    if line_gdf is not None:
-        multipart_lines = sum(1 for geom in line_gdf.geometry 
-                              if geom is not None and not geom.is_empty 
-                              and geom.geom_type.startswith('Multi'))
-        if multipart_lines == 0:
-            print(f"[OK] 线数据: {len(line_gdf)} 个要素 = {len(line_gdf)} 条河渠")
-        else:
-            print(f"[注意] 线数据: {len(line_gdf)} 个要素，但包含 MultiPart")
-    
-    if polygon_gdf is not None:
-        multipart_polygons = sum(1 for geom in polygon_gdf.geometry 
-                                 if geom is not None and not geom.is_empty 
-                                 and geom.geom_type.startswith('Multi'))
-        if multipart_polygons == 0:
-            print(f"[OK] 面数据: {len(polygon_gdf)} 个要素 = {len(polygon_gdf)} 个水系")
-        else:
-            print(f"[注意] 面数据: {len(polygon_gdf)} 个要素，但包含 MultiPart")
-    
-    print(f"\n{'='*60}")
+    return 1 if any('error' in report for report in reports) else 0
 
 
 if __name__ == '__main__':
-    main()
-
+    sys.exit(main())
@@ -19,6 +19,8 @@ except ImportError as e:
     sys.exit(1)
 
 import config
+from backend.utils.simplify import simplify_gdf, tolerance_for_zoom
+from importer.reader import detect_encoding, read_shapefile_bbox
 
 
 def ensure_output_dir():
@@ -28,13 +30,14 @@ def ensure_output_dir():
     return output_dir
 
 
-def read_shapefile_with_encoding(file_path, layer_name):
+def read_shapefile_with_encoding(file_path, layer_name, bbox=None):
     """
     尝试多种编码方式读取 Shapefile
     
     参数:
         file_path: Shapefile 文件路径
         layer_name: 图层名称（用于日志输出）
+        bbox: 只读取与该范围（WGS84）相交的要素，None 表示全部
     
     返回:
         GeoDataFrame 或 None
@@ -47,24 +50,29 @@ def read_shapefile_with_encoding(file_path, layer_name):
         print(f"[警告] {layer_name}数据文件不存在: {file_path}")
         return None
     
-    for encoding in encodings:
-        try:
-            gdf = gpd.read_file(file_path, encoding=encoding)
-            print(f"[OK] 成功加载{layer_name}数据: {len(gdf)} 个要素 (编码: {encoding})")
-            return gdf
-        except (UnicodeDecodeError, LookupError) as e:
-            # 如果是编码错误，尝试下一种编码
-            continue
-        except Exception as e:
-            # 其他错误（如文件格式错误），记录并返回 None
-            print(f"✗ 加载{layer_name}数据失败 ({encoding}): {e}")
-            # 如果不是编码问题，不再尝试其他编码
-            if 'codec' not in str(e).lower() and 'decode' not in str(e).lower():
-                return None
+    # 只读取前若干要素探测编码，避免每种编码都完整读取一遍文件
+    try:
+        encoding = detect_encoding(file_path, encodings)
+    except ValueError:
+        # 所有编码都失败
+        print(f"✗ 加载{layer_name}数据失败: 无法使用常见编码读取文件")
+        return None
+    except Exception as e:
+        # 其他错误（如文件格式错误），记录并返回 None
+        print(f"✗ 加载{layer_name}数据失败: {e}")
+        return None
     
-    # 所有编码都失败
-    print(f"✗ 加载{layer_name}数据失败: 无法使用常见编码读取文件")
-    return None
+    # 地图需要全部要素，这里整体读取（大文件导入数据库请使用 python -m importer 分块导入）
+    try:
+        if bbox:
+            gdf = read_shapefile_bbox(file_path, encoding, bbox)
+        else:
+            gdf = gpd.read_file(file_path, encoding=encoding)
+        print(f"[OK] 成功加载{layer_name}数据: {len(gdf)} 个要素 (编码: {encoding})")
+        return gdf
+    except Exception as e:
+        print(f"✗ 加载{layer_name}数据失败 ({encoding}): {e}")
+        return None
 
 
 def read_shapefiles():
@@ -72,18 +80,21 @@ def read_shapefiles():
     data = {}
     
     print("正在读取 Shapefile 数据...")
+    bbox = config.MAP_CONFIG.get('bbox')
+    if bbox:
+        print(f"只加载范围内的要素: {bbox}")
     
     # 读取点数据
     point_path = config.SHAPEFILE_PATHS['point']
-    data['point'] = read_shapefile_with_encoding(point_path, '点')
+    data['point'] = read_shapefile_with_encoding(point_path, '点', bbox)
     
     # 读取线数据
     line_path = config.SHAPEFILE_PATHS['line']
-    data['line'] = read_shapefile_with_encoding(line_path, '线')
+    data['line'] = read_shapefile_with_encoding(line_path, '线', bbox)
     
     # 读取面数据
     polygon_path = config.SHAPEFILE_PATHS['polygon']
-    data['polygon'] = read_shapefile_with_encoding(polygon_path, '面')
+    data['polygon'] = read_shapefile_with_encoding(polygon_path, '面', bbox)
     
     return data
 
@@ -457,6 +468,14 @@ def create_map(data):
     
     print(f"地图中心: {center}, 缩放级别: {zoom}")
     
+    # 按缩放级别简化线、面几何（不影响单独保存的GeoJSON数据）
+    if config.MAP_CONFIG.get('simplify_by_zoom'):
+        tolerance = tolerance_for_zoom(zoom + config.MAP_CONFIG.get('simplify_zoom_offset', 0))
+        print(f"几何简化容差: {tolerance:.6f} 度")
+        data = dict(data)
+        data['line'] = simplify_gdf(data['line'], tolerance)
+        data['polygon'] = simplify_gdf(data['polygon'], tolerance)
+    
     # 创建地图对象
     map_obj = folium.Map(
         location=center,
@@ -7,13 +7,6 @@ import sys
 import os
 from pathlib import Path
 
-# 修复Windows控制台编码问题
-if sys.platform == 'win32':
-    try:
-        sys.stdout.reconfigure(encoding='utf-8')
-    except:
-        pass
-
 # 添加项目根目录到Python路径
 # 确保无论从哪个目录运行，都能找到backend模块
 current_file = Path(__file__).resolve()
@@ -22,12 +15,21 @@ project_root = backend_dir.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from backend.config import API_CONFIG
+from backend.config import API_CONFIG, QUERY_LOG_CONFIG
 from backend.routes.villages import villages_bp
 from backend.routes.rivers import rivers_bp
 from backend.routes.water_bodies import water_bodies_bp
+from backend.routes.gazetteer import gazetteer_bp
+from backend.routes.changes import changes_bp
+from backend.routes.events import events_bp
+from backend.routes.query import query_bp
+from backend.routes.join import join_bp
+from backend.routes.geomops import geomops_bp
+from backend.routes.export import export_bp
+from backend.utils.metrics import init_metrics, render_metrics
+from backend.utils.query_log import get_query_stats, reset_query_stats
 
 def create_app():
     """创建Flask应用"""
@@ -37,10 +39,20 @@ def create_app():
     if API_CONFIG['cors_enabled']:
         CORS(app)
     
+    # 请求耗时埋点（Server-Timing 头与 /metrics）
+    init_metrics(app)
+    
     # 注册蓝图（API路由）
     app.register_blueprint(villages_bp, url_prefix='/api')
     app.register_blueprint(rivers_bp, url_prefix='/api')
     app.register_blueprint(water_bodies_bp, url_prefix='/api')
+    app.register_blueprint(gazetteer_bp, url_prefix='/api')
+    app.register_blueprint(changes_bp, url_prefix='/api')
+    app.register_blueprint(events_bp, url_prefix='/api')
+    app.register_blueprint(query_bp, url_prefix='/api')
+    app.register_blueprint(join_bp, url_prefix='/api')
+    app.register_blueprint(geomops_bp, url_prefix='/api')
+    app.register_blueprint(export_bp, url_prefix='/api')
     
     # 根路径
     @app.route('/')
@@ -51,7 +63,14 @@ def create_app():
             'endpoints': {
                 'villages': '/api/villages',
                 'rivers': '/api/rivers',
-                'water_bodies': '/api/water_bodies'
+                'water_bodies': '/api/water_bodies',
+                'index': '/api/index',
+                'changes': '/api/changes',
+                'events': '/api/events',
+                'query': '/api/query/intersects, /api/query/contains',
+                'join': '/api/join',
+                'geom_ops': '/api/geom/ops',
+                'export': '/api/<图层>/export?format=parquet|fgb|gpkg'
             }
         })
     
@@ -60,6 +79,24 @@ def create_app():
     def health():
         return jsonify({'status': 'ok'})
     
+    # Prometheus 指标
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+    
+    # SQL 统计（按规范化语句汇总，sort=total_ms|mean_ms|max_ms|calls|rows；POST 读取后清空）
+    # 结果包含带绑定参数的示例语句和执行计划，只在调试模式或 QUERY_LOG_CONFIG['debug_endpoint'] 开启时注册
+    if app.debug or QUERY_LOG_CONFIG.get('debug_endpoint'):
+        @app.route('/debug/queries', methods=['GET', 'POST'])
+        def debug_queries():
+            try:
+                stats = get_query_stats(request.args.get('sort', 'total_ms'), int(request.args.get('limit', 50)))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if request.method == 'POST':
+                reset_query_stats()
+            return jsonify({'statements': stats})
+    
     # 错误处理
     @app.errorhandler(404)
     def not_found(error):
@@ -73,6 +110,13 @@ def create_app():
 
 def main():
     """主函数"""
+    # 修复Windows控制台编码问题（只在启动服务时设置，导入模块时不修改 stdout）
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except Exception:
+            pass
+    
     app = create_app()
     
     print("=" * 50)
@@ -86,6 +130,13 @@ def main():
     print("  POST   /api/villages           - 创建村庄")
     print("  PUT    /api/villages/{id}      - 更新村庄")
     print("  DELETE /api/villages/{id}      - 删除村庄")
+    print("  GET    /api/villages/index     - 村庄地名索引（gid、名称、中心点）")
+    print("  GET    /api/index              - 所有图层地名索引")
+    print("  GET    /api/changes?since={rev} - 增量变更（新增/更新/删除）")
+    print("  GET    /api/events             - 变更事件推送（SSE）")
+    print("  GET    /metrics                - Prometheus 指标")
+    if QUERY_LOG_CONFIG.get('debug_endpoint'):
+        print("  GET    /debug/queries          - SQL 耗时统计与执行计划采样（POST 读取后清空）")
     print("\n  (同样适用于 /api/rivers 和 /api/water_bodies)")
     print("=" * 50)
     
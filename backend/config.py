@@ -20,6 +20,38 @@ def get_database_url():
         f"@{DATABASE_CONFIG['host']}:{DATABASE_CONFIG['port']}/{DATABASE_CONFIG['database']}"
     )
 
+# 数据库访问选项
+# metadata_cache_seconds: 表结构（列名、类型）缓存时间，表结构修改后最多延迟该时间生效
+# verify_writes: 调试用，插入后输出数据库中保存的几何（由 RETURNING 返回，不额外查询）
+DATABASE_OPTIONS = {
+    'metadata_cache_seconds': 60,
+    'verify_writes': False,
+}
+
+# 请求耗时埋点配置（见 backend/utils/metrics.py）
+# server_timing: 是否在响应中添加 Server-Timing 头（sql、gdf、to_json、loads、jsonify 等阶段耗时）
+METRICS_CONFIG = {
+    'enabled': True,
+    'server_timing': True,
+}
+
+# SQL 慢查询日志配置（见 backend/utils/query_log.py，汇总结果通过 /debug/queries 查看）
+# slow_ms: 超过该耗时的语句输出日志（带绑定参数）
+# explain_min_ms / explain_sample_rate: 超过该耗时的只读查询按比例在后台执行 EXPLAIN (ANALYZE, BUFFERS)
+# max_statements: 最多汇总的规范化语句数
+# debug_endpoint: 是否注册 /debug/queries（返回带参数的语句与执行计划，只应在内网/调试时开启；
+#                 FLASK_DEBUG 调试模式下总是注册）
+QUERY_LOG_CONFIG = {
+    'enabled': True,
+    'slow_ms': 200,
+    'log_params': True,
+    'max_param_chars': 200,
+    'explain_min_ms': 500,
+    'explain_sample_rate': 0.1,
+    'max_statements': 500,
+    'debug_endpoint': False,
+}
+
 # API配置
 API_CONFIG = {
     'host': '0.0.0.0',
@@ -28,3 +60,134 @@ API_CONFIG = {
     'cors_enabled': True
 }
 
+# 图层表配置（表名 -> 显示名称、几何类型）
+LAYER_TABLES = {
+    'villages': {'title': '村庄', 'geometry_type': 'point'},
+    'rivers': {'title': '河渠', 'geometry_type': 'line'},
+    'water_bodies': {'title': '水系', 'geometry_type': 'polygon'},
+}
+
+# 地名索引（/api/index）配置
+# cache_seconds: 进程内缓存时间（通过API写入时立即失效，导入等外部修改最多延迟该时间）
+# precision: 坐标保留的小数位数（6位约0.1米）
+INDEX_CONFIG = {
+    'cache_seconds': 300,
+    'precision': 6,
+}
+
+# 变更订阅（/api/changes）配置：每个图层单次返回的要素数（默认值与上限）
+CHANGES_CONFIG = {
+    'default_limit': 5000,
+    'max_limit': 50000,
+}
+
+# 内存空间索引（/api/query/intersects、/api/query/contains）配置，见 backend/utils/snapshot.py
+# 每个图层在首次查询时把有效要素的几何加载到进程内并建立 STRtree 索引，之后按同步位置（事务号水位，与 /api/changes 相同）增量同步
+# max_features: 每个图层最多加载的要素数，超过时该图层不建快照，查询在 PostGIS 中执行
+# refresh_seconds: 查询时距上次同步超过该时间则先同步（通过API写入的数据在下一次查询时立即同步）
+# full_reload_seconds: 距上次整表加载超过该时间则整表重新加载（覆盖重新导入等不经过变更跟踪的修改）
+# max_geometries: 单次请求最多的查询几何数
+SNAPSHOT_CONFIG = {
+    'enabled': True,
+    'tables': ['villages', 'rivers', 'water_bodies'],
+    'max_features': 200_000,
+    'refresh_seconds': 5,
+    'full_reload_seconds': 600,
+    'max_geometries': 1000,
+}
+
+# 空间连接（/api/join）配置，见 backend/utils/spatial_join.py
+# max_pairs: pairs 模式最多返回的要素对数（超出时截断，结果中 truncated 为 true）
+# max_distance: dwithin 的最大距离（米）
+# stream_batch: 服务端游标每批读取并输出的行数
+# statement_timeout_ms: 连接查询的超时时间
+JOIN_CONFIG = {
+    'max_pairs': 1_000_000,
+    'max_distance': 50_000,
+    'stream_batch': 5000,
+    'statement_timeout_ms': 30_000,
+}
+
+# 批量几何运算（/api/geom/ops）配置，见 backend/utils/geomops.py
+# max_geometries / max_vertices: 输入几何数与顶点数上限（顶点数上限同样适用于每一步的结果）
+# max_buffer_distance: 缓冲距离上限（米）
+# max_quad_segs: 缓冲区每四分之一圆的线段数上限（线段数决定结果顶点数）
+# budget_ms: 单个请求的耗时预算，超出时返回 408
+GEOM_OPS_CONFIG = {
+    'max_geometries': 5000,
+    'max_vertices': 500_000,
+    'max_operations': 10,
+    'max_buffer_distance': 50_000,
+    'max_quad_segs': 64,
+    'budget_ms': 2000,
+}
+
+# 写入冲突检查配置，见 backend/utils/conflicts.py
+# tables: 各图层的检查模式 off（不检查）/ warn（返回冲突，仍写入）/ reject（有冲突时拒绝写入，返回 409）
+#         请求参数 conflicts=off|warn|reject 可覆盖
+# min_overlap_area: 面与面重叠面积超过该值（平方米）视为冲突（忽略共边产生的微小重叠）
+# min_overlap_length: 线与线共线部分超过该值（米）视为冲突（单纯交叉不算）
+# line_snap_tolerance: 线与线相距不超过该值（米）的部分视为共线（分别数字化的同一段河道顶点不重合）
+# min_point_distance: 点与点距离小于该值（米）视为重复
+# max_candidates: 写入检查时最多比较的候选要素数
+# workers / chunk_size: 整层检查（scripts/check_conflicts.py）的进程数（None 为CPU数）与每个任务的要素数
+CONFLICT_CONFIG = {
+    'tables': {
+        'villages': 'off',
+        'rivers': 'warn',
+        'water_bodies': 'warn',
+    },
+    'min_overlap_area': 1.0,
+    'min_overlap_length': 1.0,
+    'line_snap_tolerance': 1.0,
+    'min_point_distance': 1.0,
+    'max_candidates': 1000,
+    'workers': None,
+    'chunk_size': 2000,
+}
+
+# 图层导出（/api/<图层>/export 与离线数据包，见 backend/utils/export.py）
+# cache_dir: 导出文件缓存目录（相对项目根目录），按图层 rev 命名，数据未变化时直接返回已生成的文件
+# bundle_dir: 离线数据包输出目录（scripts/build_offline_bundle.py）
+# parquet_compression: GeoParquet 压缩算法（需安装 pyarrow）
+EXPORT_CONFIG = {
+    'cache_dir': 'output/exports',
+    'bundle_dir': 'output/offline',
+    'bundle_formats': ['gpkg', 'fgb', 'parquet'],
+    'parquet_compression': 'zstd',
+}
+
+# 变更事件推送（/api/events，SSE）配置
+# broker: local（进程内，单进程部署）或 postgres（LISTEN/NOTIFY，多工作进程部署）
+# include_geometry: 插入/更新事件是否携带几何（订阅时用 geometry=1 选择接收）
+# queue_size: 每个订阅者缓存的事件数（客户端处理不过来时丢弃最旧的事件）
+EVENTS_CONFIG = {
+    'enabled': True,
+    'broker': 'local',
+    'channel': 'feature_events',
+    'include_geometry': True,
+    'queue_size': 1000,
+    'keepalive_seconds': 15,
+    'retry_ms': 3000,
+}
+
+# 几何简化金字塔配置（仅线、面图层）
+# 每一级对应表中的一个额外几何列，写入时用 ST_SimplifyPreserveTopology 同步维护
+# tolerance 单位为度（EPSG:4326），max_zoom 为该级别适用的最大地图缩放级别
+SIMPLIFY_CONFIG = {
+    'tables': ['rivers', 'water_bodies'],
+    'levels': [
+        {'column': 'geom_s1', 'tolerance': 0.00004, 'max_zoom': 14},
+        {'column': 'geom_s2', 'tolerance': 0.00015, 'max_zoom': 12},
+        {'column': 'geom_s3', 'tolerance': 0.0006, 'max_zoom': 10},
+    ],
+}
+
+# 派生量测列配置（表名 -> 字段）
+# area: 面积 area_m2（平方米）; length: 长度/周长 length_m（米）; centroid: 中心点; bbox: 外包框 bbox_minx..bbox_maxy
+# 面积和长度按椭球面计算，写入时由数据库同步维护，查询时可用 fields 参数只返回这些字段
+MEASURE_CONFIG = {
+    'villages': ['centroid', 'bbox'],
+    'rivers': ['length', 'centroid', 'bbox'],
+    'water_bodies': ['area', 'length', 'centroid', 'bbox'],
+}
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+变更订阅API路由：按同步位置（rev，事务号水位）返回增量，客户端据此更新本地数据而不必全量重新加载
+"""
+
+from flask import Blueprint, jsonify, request
+from backend.config import CHANGES_CONFIG, LAYER_TABLES
+from backend.utils.changes import parse_since
+from backend.utils.crs import parse_srid_arg
+from backend.utils.db import get_change_watermark, read_changes
+
+changes_bp = Blueprint('changes', __name__)
+
+
+def _parse_limit(value):
+    """解析每个图层的返回数量（超过上限时按上限处理）"""
+    if value is None or value == '':
+        return CHANGES_CONFIG['default_limit']
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        raise ValueError(f"无效的 limit: {value}（应为正整数）")
+    return min(limit, CHANGES_CONFIG['max_limit'])
+
+
+@changes_bp.route('/changes', methods=['GET'])
+def get_changes():
+    """
+    获取 since 之后的要素变更
+
+    不带 since 时只返回当前同步位置 rev（客户端先记录 rev，再全量加载，之后用该 rev 增量同步）
+    """
+    try:
+        print(f"[REQUEST] GET /api/changes Args: {dict(request.args)}")
+
+        since = parse_since(request.args.get('since'))
+        if since is None:
+            return jsonify({'rev': get_change_watermark()})
+
+        layers = request.args.get('layers')
+        tables = [name.strip() for name in layers.split(',') if name.strip()] if layers else list(LAYER_TABLES)
+        unknown = [name for name in tables if name not in LAYER_TABLES]
+        if unknown:
+            return jsonify({'error': f"未知图层: {', '.join(unknown)}（可选: {', '.join(LAYER_TABLES)}）"}), 400
+
+        limit = _parse_limit(request.args.get('limit'))
+        srid = parse_srid_arg(request.args)
+        return jsonify(read_changes(tables, since, limit, srid=srid))
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 获取变更失败: {e}")
+        print(f"[ERROR] 错误详情: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+变更事件推送API路由（Server-Sent Events）
+"""
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from backend.config import EVENTS_CONFIG, LAYER_TABLES
+from backend.utils.events import stream_events
+
+events_bp = Blueprint('events', __name__)
+
+
+@events_bp.route('/events', methods=['GET'])
+def get_events():
+    """
+    订阅要素变更事件（text/event-stream）
+
+    可选参数: layers=villages,rivers 只接收指定图层；geometry=1 在插入/更新事件中附带几何
+    """
+    if not EVENTS_CONFIG.get('enabled', True):
+        return jsonify({'error': '事件推送未启用'}), 404
+
+    layers = request.args.get('layers')
+    tables = {name.strip() for name in layers.split(',') if name.strip()} if layers else None
+    unknown = sorted(tables - set(LAYER_TABLES)) if tables else []
+    if unknown:
+        return jsonify({'error': f"未知图层: {', '.join(unknown)}（可选: {', '.join(LAYER_TABLES)}）"}), 400
+    with_geometry = request.args.get('geometry', '').lower() in ('1', 'true', 'yes')
+
+    print(f"[REQUEST] GET /api/events 订阅: layers={sorted(tables) if tables else '全部'}, geometry={with_geometry}")
+    return Response(
+        stream_with_context(stream_events(tables, with_geometry)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # 关闭 Nginx 缓冲，事件立即送达
+            'X-Accel-Buffering': 'no',
+        }
+    )
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+图层导出API路由：GeoParquet / FlatGeobuf / GeoPackage 文件下载（见 backend.utils.export）
+"""
+
+from flask import Blueprint, jsonify, request, send_file
+from backend.config import LAYER_TABLES
+from backend.utils.crs import parse_srid_arg
+from backend.utils.export import EXPORT_FORMATS, ExportFormatUnavailable, export_layer, parse_format
+
+export_bp = Blueprint('export', __name__)
+
+
+@export_bp.route('/<layer>/export', methods=['GET'])
+def export_layer_file(layer):
+    """
+    下载整个图层（format=parquet|fgb|gpkg，默认 gpkg；srid 指定输出坐标系）
+
+    文件以附件形式分块发送，支持 ETag / Range（断点续传）；X-Layer-Version 为图层数据版本。
+    """
+    if layer not in LAYER_TABLES:
+        return jsonify({'error': f"未知图层: {layer}（可选: {', '.join(LAYER_TABLES)}）"}), 404
+    try:
+        fmt = parse_format(request.args.get('format') or 'gpkg')
+        srid = parse_srid_arg(request.args)
+        result = export_layer(layer, fmt, srid)
+
+        extension = EXPORT_FORMATS[fmt]['extension']
+        response = send_file(
+            result['path'], mimetype=EXPORT_FORMATS[fmt]['mimetype'], as_attachment=True,
+            download_name=f"{layer}{f'-{srid}' if srid else ''}.{extension}", conditional=True,
+        )
+        if result['version']:
+            response.headers['X-Layer-Version'] = result['version']
+        return response
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ExportFormatUnavailable as e:
+        return jsonify({'error': str(e)}), 501
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 导出图层失败: {e}")
+        print(f"[ERROR] 错误详情: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
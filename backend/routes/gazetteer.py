@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+地名索引API路由（每个图层只返回 gid、名称、中心点、外包框，支持 ETag 协商缓存）
+"""
+
+from flask import Blueprint, jsonify, request, current_app
+from backend.config import LAYER_TABLES
+from backend.utils.gazetteer import get_layer_index, get_combined_index
+
+gazetteer_bp = Blueprint('gazetteer', __name__)
+
+
+def _index_response(body, etag):
+    """返回带 ETag 的 JSON 响应（If-None-Match 匹配时返回 304）"""
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # 客户端可缓存，但每次使用前需要用 ETag 重新验证
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@gazetteer_bp.route('/index', methods=['GET'])
+def get_index():
+    """获取所有图层的地名索引（可用 layers=villages,rivers 指定图层）"""
+    try:
+        layers = request.args.get('layers')
+        tables = [name.strip() for name in layers.split(',') if name.strip()] if layers else None
+        unknown = [name for name in tables or [] if name not in LAYER_TABLES]
+        if unknown:
+            return jsonify({'error': f"未知图层: {', '.join(unknown)}（可选: {', '.join(LAYER_TABLES)}）"}), 400
+
+        return _index_response(*get_combined_index(tables))
+
+    except Exception as e:
+        print(f"[ERROR] 获取地名索引失败: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@gazetteer_bp.route('/<layer>/index', methods=['GET'])
+def get_layer_index_route(layer):
+    """获取单个图层的地名索引"""
+    if layer not in LAYER_TABLES:
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        return _index_response(*get_layer_index(layer))
+    except Exception as e:
+        print(f"[ERROR] 获取 {layer} 地名索引失败: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+批量几何运算API路由（buffer、simplify、union、clip、difference，见 backend.utils.geomops）
+"""
+
+import json
+
+from flask import Blueprint, Response, jsonify, request
+from backend.utils.crs import parse_srid_arg
+from backend.utils.geojson import crs_member
+from backend.utils.geomops import GeometryLimitExceeded, OperationBudgetExceeded, run_operations
+
+geomops_bp = Blueprint('geomops', __name__)
+
+
+@geomops_bp.route('/geom/ops', methods=['POST'])
+def geometry_operations():
+    """
+    对一批几何执行操作流水线
+
+    请求体: {"geometries": [...] 或 "source": {"layer", "gids"}, "operations": [...]}
+    返回: {"count", "geometries": [GeoJSON几何], "vertices", "timings_ms"}（坐标系与输入相同，srid 参数）
+    """
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({'error': '请求体应为 JSON 对象'}), 400
+        print(f"[REQUEST] POST /api/geom/ops operations: {body.get('operations')}")
+
+        srid = parse_srid_arg(request.args)
+        source = body.get('source') if body.get('source') else body.get('geometries')
+        result = run_operations(source, body.get('operations'), srid)
+
+        # 结果几何已是 GeoJSON 文本，直接拼接
+        crs = crs_member(srid)
+        text = (
+            f'{{"count": {len(result["geometries"])}, "geometries": ['
+            + ', '.join(geometry or 'null' for geometry in result['geometries'])
+            + f'], "vertices": {result["vertices"]}, "timings_ms": {json.dumps(result["timings_ms"])}'
+            + (f', "crs": {json.dumps(crs)}' if crs else '') + '}'
+        )
+        return Response(text, mimetype='application/json')
+
+    except GeometryLimitExceeded as e:
+        return jsonify({'error': str(e)}), 413
+    except OperationBudgetExceeded as e:
+        return jsonify({'error': str(e)}), 408
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 几何运算失败: {e}")
+        print(f"[ERROR] 错误详情: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
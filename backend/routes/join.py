@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+空间连接API路由：两个图层按空间谓词连接，返回要素对或计数（见 backend.utils.spatial_join）
+"""
+
+import itertools
+
+from flask import Blueprint, Response, jsonify, request
+from backend.utils.spatial_join import parse_join_spec, stream_join
+
+join_bp = Blueprint('join', __name__)
+
+
+@join_bp.route('/join', methods=['GET', 'POST'])
+def spatial_join():
+    """
+    空间连接（参数可放在查询字符串或 JSON 请求体中）
+
+    例: /api/join?left=villages&right=rivers&predicate=dwithin&distance=500&right_gids=3
+    """
+    try:
+        print(f"[REQUEST] {request.method} /api/join Args: {dict(request.args)}")
+        params = dict(request.args)
+        if request.method == 'POST':
+            body = request.get_json(silent=True)
+            if not isinstance(body, dict):
+                return jsonify({'error': '请求体应为 JSON 对象'}), 400
+            params.update(body)
+        spec = parse_join_spec(params)
+
+        # 先取第一个片段（执行查询），SQL 错误在发送响应头之前返回 500；之后的错误写在结果的 error 字段中
+        chunks = stream_join(spec)
+        first = next(chunks)
+        return Response(itertools.chain([first], chunks), mimetype='application/json')
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 空间连接失败: {e}")
+        print(f"[ERROR] 错误详情: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
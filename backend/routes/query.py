@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+空间查询API路由：与给定几何相交 / 包含给定几何的要素（优先由内存快照回答，见 backend.utils.snapshot）
+"""
+
+from flask import Blueprint, jsonify, request
+from backend.config import LAYER_TABLES, SNAPSHOT_CONFIG
+from backend.utils.crs import parse_srid_arg
+from backend.utils.features import parse_geometry
+from backend.utils.snapshot import query_layers, snapshot_status
+
+query_bp = Blueprint('query', __name__)
+
+
+def _parse_numbers(value, count, name):
+    """解析逗号分隔的数字（如 point=x,y）"""
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count:
+        raise ValueError(f"无效的 {name}: {value}")
+    return numbers
+
+
+def _request_geometries(body):
+    """
+    读取查询几何
+
+    POST: {"geometry": GeoJSON几何} 或 {"geometries": [GeoJSON几何, ...]}
+    GET:  point=x,y 或 bbox=minx,miny,maxx,maxy
+
+    返回:
+        tuple: (GeoJSON几何列表, 是否为批量查询)
+    """
+    if body:
+        if 'geometries' in body:
+            geometries = body['geometries']
+            if not isinstance(geometries, list) or not geometries:
+                raise ValueError('geometries 应为非空的 GeoJSON 几何数组')
+            return geometries, True
+        if body.get('geometry'):
+            return [body['geometry']], False
+    if request.args.get('point'):
+        return [{'type': 'Point', 'coordinates': _parse_numbers(request.args['point'], 2, 'point')}], False
+    if request.args.get('bbox'):
+        minx, miny, maxx, maxy = _parse_numbers(request.args['bbox'], 4, 'bbox')
+        ring = [[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]
+        return [{'type': 'Polygon', 'coordinates': [ring]}], False
+    raise ValueError('缺少查询几何（POST geometry / geometries，或 GET point / bbox 参数）')
+
+
+def _spatial_query(predicate):
+    """intersects / contains 查询的公共处理"""
+    try:
+        body = request.get_json(silent=True) if request.method == 'POST' else None
+        if body is not None and not isinstance(body, dict):
+            return jsonify({'error': '请求体应为 JSON 对象'}), 400
+
+        layers = (body or {}).get('layers') or request.args.get('layers')
+        if isinstance(layers, str):
+            layers = [name.strip() for name in layers.split(',') if name.strip()]
+        tables = layers or list(LAYER_TABLES)
+        unknown = [name for name in tables if name not in LAYER_TABLES]
+        if unknown:
+            return jsonify({'error': f"未知图层: {', '.join(unknown)}（可选: {', '.join(LAYER_TABLES)}）"}), 400
+
+        geometries, batch = _request_geometries(body)
+        if len(geometries) > SNAPSHOT_CONFIG['max_geometries']:
+            return jsonify({'error': f"查询几何过多: {len(geometries)}（上限 {SNAPSHOT_CONFIG['max_geometries']}）"}), 400
+        srid = parse_srid_arg(request.args)
+        geometries = [parse_geometry(geometry, srid) for geometry in geometries]
+
+        results = query_layers(tables, geometries, predicate)
+        layers = {}
+        for table_name, result in results.items():
+            layers[table_name] = {'source': result['source'], 'rev': result['rev']}
+            if batch:
+                layers[table_name]['matches'] = result['matches']
+            else:
+                layers[table_name]['gids'] = result['matches'][0]
+        return jsonify({'predicate': predicate, 'layers': layers})
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] 空间查询失败: {e}")
+        print(f"[ERROR] 错误详情: {traceback.format_exc()}")
+        return jsonify({'error': str(e)}), 500
+
+
+@query_bp.route('/query/intersects', methods=['GET', 'POST'])
+def query_intersects():
+    """与查询几何相交的要素（如与绘制的面相交的河渠）"""
+    return _spatial_query('intersects')
+
+
+@query_bp.route('/query/contains', methods=['GET', 'POST'])
+def query_contains():
+    """包含查询几何的要素（如包含某点的水系）"""
+    return _spatial_query('contains')
+
+
+@query_bp.route('/query/snapshot', methods=['GET'])
+def get_snapshot_status():
+    """内存快照状态（各图层要素数、坐标数、rev、距上次同步的时间）"""
+    return jsonify({'enabled': SNAPSHOT_CONFIG.get('enabled', False), 'layers': snapshot_status()})
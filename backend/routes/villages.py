@@ -4,8 +4,14 @@
 """
 
 from flask import Blueprint, jsonify, request
-from backend.utils.db import read_postgis_table, insert_feature, update_feature, delete_feature, update_feature_status
-from backend.utils.geojson import gdf_to_geojson
+from backend.utils.db import (
+    read_feature_records, read_feature, read_feature_fields, insert_feature, update_feature, delete_feature,
+    update_feature_status,
+)
+from backend.utils.conflicts import FeatureConflictError
+from backend.utils.crs import parse_srid_arg
+from backend.utils.features import feature_collection_response, feature_response
+from backend.utils.measures import parse_fields_arg
 import json
 
 villages_bp = Blueprint('villages', __name__)
@@ -36,31 +42,29 @@ def get_villages():
             escaped_name = name.replace("'", "''")
             where_clause = f"name LIKE '%{escaped_name}%'"
         
+        # 输出坐标系（srid 参数，在数据库中转换）
+        srid = parse_srid_arg(request.args)
+        
+        # 轻量模式：只返回指定字段（如 fields=centroid,name），不返回几何
+        fields = parse_fields_arg(request.args)
+        if fields:
+            return jsonify(read_feature_fields('villages', fields, where_clause=where_clause, srid=srid))
+        
         # 读取数据
         print(f"[DEBUG] 查询村庄数据，WHERE子句: {where_clause}")
-        gdf = read_postgis_table('villages', geom_col='geometry', where_clause=where_clause)
+        records = read_feature_records('villages', geom_col='geometry', where_clause=where_clause, srid=srid)
         
-        if gdf is None:
-            print("[DEBUG] GeoDataFrame为None")
-            return jsonify({
-                'type': 'FeatureCollection',
-                'features': []
-            })
-        
-        if gdf.empty:
-            print(f"[DEBUG] GeoDataFrame为空，列名: {gdf.columns.tolist()}")
-            return jsonify({
-                'type': 'FeatureCollection',
-                'features': []
-            })
+        if records is None:
+            print("[DEBUG] 村庄表不存在")
+            records = []
         
-        print(f"[DEBUG] 查询到 {len(gdf)} 条村庄记录")
+        print(f"[DEBUG] 查询到 {len(records)} 条村庄记录")
         
-        # 转换为GeoJSON
-        geojson = gdf_to_geojson(gdf)
-        print(f"[DEBUG] GeoJSON转换完成，features数量: {len(geojson.get('features', []))}")
-        return jsonify(geojson)
+        # 几何已由数据库输出为GeoJSON文本，直接拼接响应
+        return feature_collection_response(records, srid)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         import traceback
         print(f"[ERROR] 获取村庄数据失败: {e}")
@@ -83,17 +87,16 @@ def get_village(gid):
         print(f"[REQUEST] Headers: Content-Type={request.headers.get('Content-Type', 'N/A')}")
         print("=" * 60)
         
-        gdf = read_postgis_table('villages', where_clause=f'gid = {gid}')
+        srid = parse_srid_arg(request.args)
+        record = read_feature('villages', gid, srid=srid)
         
-        if gdf is None or gdf.empty:
+        if record is None:
             return jsonify({'error': 'Not found'}), 404
         
-        geojson = gdf_to_geojson(gdf)
-        if geojson['features']:
-            return jsonify(geojson['features'][0])
-        else:
-            return jsonify({'error': 'Not found'}), 404
+        return feature_response(record)
             
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -131,14 +134,18 @@ def create_village():
             return jsonify({'error': 'Invalid GeoJSON Feature'}), 400
         
         # 插入数据库
-        gid = insert_feature('villages', feature)
+        conflicts = []
+        gid = insert_feature('villages', feature, srid=parse_srid_arg(request.args),
+                             conflict_mode=request.args.get('conflicts'), conflicts=conflicts)
         
         return jsonify({
             'success': True,
             'message': '村庄创建成功',
-            'data': {'gid': gid}
+            'data': {'gid': gid, 'conflicts': conflicts}
         }), 201
         
+    except FeatureConflictError as e:
+        return jsonify({'error': str(e), 'conflicts': e.conflicts}), 409
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -179,17 +186,21 @@ def update_village(gid):
             return jsonify({'error': 'Invalid GeoJSON Feature'}), 400
         
         # 更新数据库
-        success = update_feature('villages', gid, feature)
+        conflicts = []
+        success = update_feature('villages', gid, feature, srid=parse_srid_arg(request.args),
+                                 conflict_mode=request.args.get('conflicts'), conflicts=conflicts)
         
         if success:
             return jsonify({
                 'success': True,
                 'message': '村庄更新成功',
-                'data': {'gid': gid}
+                'data': {'gid': gid, 'conflicts': conflicts}
             })
         else:
             return jsonify({'error': 'Update failed'}), 500
             
+    except FeatureConflictError as e:
+        return jsonify({'error': str(e), 'conflicts': e.conflicts}), 409
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -212,13 +223,13 @@ def delete_village(gid):
         print("=" * 60)
         
         # 先检查记录是否存在（包括已删除的记录）
-        from backend.utils.db import read_postgis_table, update_feature_status
-        gdf = read_postgis_table('villages', where_clause=f'gid = {gid}', include_inactive=True)
-        if gdf is None or gdf.empty:
+        from backend.utils.db import get_feature_status, update_feature_status
+        status = get_feature_status('villages', gid)
+        if status is None:
             return jsonify({'error': 'Not found'}), 404
         
         # 检查是否已经删除
-        if gdf.iloc[0]['status'] == 0:
+        if status == 0:
             return jsonify({'error': 'Already deleted'}), 400
         
         # 软删除：更新status为0
@@ -255,14 +266,14 @@ def restore_village(gid):
         print(f"[REQUEST] Headers: Content-Type={request.headers.get('Content-Type', 'N/A')}")
         print("=" * 60)
         
-        from backend.utils.db import read_postgis_table, update_feature_status
+        from backend.utils.db import get_feature_status, update_feature_status
         # 检查记录是否存在（包括已删除的记录）
-        gdf = read_postgis_table('villages', where_clause=f'gid = {gid}', include_inactive=True)
-        if gdf is None or gdf.empty:
+        status = get_feature_status('villages', gid)
+        if status is None:
             return jsonify({'error': 'Not found'}), 404
         
         # 检查是否已经有效
-        if gdf.iloc[0]['status'] == 1:
+        if status == 1:
             return jsonify({'error': 'Already active'}), 400
         
         # 恢复：更新status为1
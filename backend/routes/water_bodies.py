@@ -4,8 +4,12 @@
 """
 
 from flask import Blueprint, jsonify, request
-from backend.utils.db import read_postgis_table, insert_feature, update_feature, delete_feature
-from backend.utils.geojson import gdf_to_geojson
+from backend.utils.db import read_feature_records, read_feature, read_feature_fields, insert_feature, update_feature, delete_feature
+from backend.utils.conflicts import FeatureConflictError
+from backend.utils.crs import parse_srid_arg
+from backend.utils.features import feature_collection_response, feature_response
+from backend.utils.measures import parse_fields_arg
+from backend.utils.simplify import parse_simplify_args
 
 water_bodies_bp = Blueprint('water_bodies', __name__)
 
@@ -31,17 +35,24 @@ def get_water_bodies():
             escaped_name = name.replace("'", "''")
             where_clause = f"name LIKE '%{escaped_name}%'"
         
-        gdf = read_postgis_table('water_bodies', geom_col='geometry', where_clause=where_clause)
+        # 输出坐标系（srid 参数，在数据库中转换）
+        srid = parse_srid_arg(request.args)
         
-        if gdf is None or gdf.empty:
-            return jsonify({
-                'type': 'FeatureCollection',
-                'features': []
-            })
+        # 轻量模式：只返回指定字段（如 fields=centroid,length,name），不返回几何
+        fields = parse_fields_arg(request.args)
+        if fields:
+            return jsonify(read_feature_fields('water_bodies', fields, where_clause=where_clause, srid=srid))
+        
+        # 按缩放级别或容差选择简化几何（zoom / tolerance 参数）
+        simplify_column = parse_simplify_args(request.args, 'water_bodies')
         
-        geojson = gdf_to_geojson(gdf)
-        return jsonify(geojson)
+        records = read_feature_records('water_bodies', geom_col='geometry', where_clause=where_clause,
+                                       simplify_column=simplify_column, srid=srid)
         
+        return feature_collection_response(records or [], srid)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -61,17 +72,16 @@ def get_water_body(gid):
         print(f"[REQUEST] Headers: Content-Type={request.headers.get('Content-Type', 'N/A')}")
         print("=" * 60)
         
-        gdf = read_postgis_table('water_bodies', where_clause=f'gid = {gid}')
+        srid = parse_srid_arg(request.args)
+        record = read_feature('water_bodies', gid, srid=srid)
         
-        if gdf is None or gdf.empty:
+        if record is None:
             return jsonify({'error': 'Not found'}), 404
         
-        geojson = gdf_to_geojson(gdf)
-        if geojson['features']:
-            return jsonify(geojson['features'][0])
-        else:
-            return jsonify({'error': 'Not found'}), 404
+        return feature_response(record)
             
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -108,14 +118,18 @@ def create_water_body():
         if not feature or feature.get('type') != 'Feature':
             return jsonify({'error': 'Invalid GeoJSON Feature'}), 400
         
-        gid = insert_feature('water_bodies', feature)
+        conflicts = []
+        gid = insert_feature('water_bodies', feature, srid=parse_srid_arg(request.args),
+                             conflict_mode=request.args.get('conflicts'), conflicts=conflicts)
         
         return jsonify({
             'success': True,
             'message': '水系创建成功',
-            'data': {'gid': gid}
+            'data': {'gid': gid, 'conflicts': conflicts}
         }), 201
         
+    except FeatureConflictError as e:
+        return jsonify({'error': str(e), 'conflicts': e.conflicts}), 409
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -158,17 +172,21 @@ def update_water_body(gid):
         if not feature or feature.get('type') != 'Feature':
             return jsonify({'error': 'Invalid GeoJSON Feature'}), 400
         
-        success = update_feature('water_bodies', gid, feature)
+        conflicts = []
+        success = update_feature('water_bodies', gid, feature, srid=parse_srid_arg(request.args),
+                                 conflict_mode=request.args.get('conflicts'), conflicts=conflicts)
         
         if success:
             return jsonify({
                 'success': True,
                 'message': '水系更新成功',
-                'data': {'gid': gid}
+                'data': {'gid': gid, 'conflicts': conflicts}
             })
         else:
             return jsonify({'error': 'Update failed'}), 500
             
+    except FeatureConflictError as e:
+        return jsonify({'error': str(e), 'conflicts': e.conflicts}), 409
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
@@ -190,14 +208,14 @@ def delete_water_body(gid):
         print(f"[REQUEST] Headers: Content-Type={request.headers.get('Content-Type', 'N/A')}")
         print("=" * 60)
         
-        from backend.utils.db import read_postgis_table, update_feature_status
+        from backend.utils.db import get_feature_status, update_feature_status
         # 先检查记录是否存在（包括已删除的记录）
-        gdf = read_postgis_table('water_bodies', where_clause=f'gid = {gid}', include_inactive=True)
-        if gdf is None or gdf.empty:
+        status = get_feature_status('water_bodies', gid)
+        if status is None:
             return jsonify({'error': 'Not found'}), 404
         
         # 检查是否已经删除
-        if gdf.iloc[0]['status'] == 0:
+        if status == 0:
             return jsonify({'error': 'Already deleted'}), 400
         
         # 软删除：更新status为0
@@ -234,14 +252,14 @@ def restore_water_body(gid):
         print(f"[REQUEST] Headers: Content-Type={request.headers.get('Content-Type', 'N/A')}")
         print("=" * 60)
         
-        from backend.utils.db import read_postgis_table, update_feature_status
+        from backend.utils.db import get_feature_status, update_feature_status
         # 检查记录是否存在（包括已删除的记录）
-        gdf = read_postgis_table('water_bodies', where_clause=f'gid = {gid}', include_inactive=True)
-        if gdf is None or gdf.empty:
+        status = get_feature_status('water_bodies', gid)
+        if status is None:
             return jsonify({'error': 'Not found'}), 404
         
         # 检查是否已经有效
-        if gdf.iloc[0]['status'] == 1:
+        if status == 1:
             return jsonify({'error': 'Already active'}), 400
         
         # 恢复：更新status为1
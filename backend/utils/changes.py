@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+变更跟踪：所有图层共用一个全局递增序号（rev），用于客户端增量同步
+
+每张图层表有 rev / updated_at / rev_xid 三列:
+    - 插入时由列默认值 nextval('feature_rev_seq') / now() / pg_current_xact_id() 赋值（COPY 导入同样生效）
+    - 更新时（包括软删除/恢复、派生列刷新、增量同步）由 BEFORE UPDATE 触发器重新赋值
+rev 在写入时分配，长事务晚于其他事务提交时会出现比已读到的 rev 更小的值，不能直接作为同步位置。
+增量同步的位置（/api/changes 的 since / rev）因此使用事务号水位: 读取时取当前快照中最早的未结束事务号
+（pg_snapshot_xmin），只返回写入事务号小于该水位的行——这些事务都已结束，之后提交的修改事务号一定不小于水位，
+下次从水位继续不会漏掉晚提交的修改。长事务未结束时，之后其他事务的修改会推迟到它结束后返回。
+rev_xid 为 xid8 类型，需要 PostgreSQL 13 及以上版本。
+"""
+
+from sqlalchemy import text
+
+REV_COLUMN = 'rev'
+UPDATED_AT_COLUMN = 'updated_at'
+XID_COLUMN = 'rev_xid'
+REV_SEQUENCE = 'feature_rev_seq'
+REV_FUNCTION = 'set_feature_rev'
+
+
+def rev_column_defs():
+    """建表时 rev / updated_at / rev_xid 的列定义（序列需先由 sequence_sql 创建）"""
+    return [
+        f"{REV_COLUMN} bigint DEFAULT nextval('{REV_SEQUENCE}')",
+        f"{UPDATED_AT_COLUMN} timestamptz DEFAULT now()",
+        f"{XID_COLUMN} xid8 DEFAULT pg_current_xact_id()",
+    ]
+
+
+def sequence_sql():
+    """创建全局序列与触发器函数的SQL"""
+    return [
+        f"CREATE SEQUENCE IF NOT EXISTS {REV_SEQUENCE}",
+        f"""
+        CREATE OR REPLACE FUNCTION {REV_FUNCTION}() RETURNS trigger AS $$
+        BEGIN
+            NEW.{REV_COLUMN} := nextval('{REV_SEQUENCE}');
+            NEW.{UPDATED_AT_COLUMN} := now();
+            NEW.{XID_COLUMN} := pg_current_xact_id();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+    ]
+
+
+def change_tracking_sql(table_name, schema='public'):
+    """
+    为表启用变更跟踪的SQL（可重复执行；已有记录在添加列时按顺序分配 rev）
+
+    参数:
+        table_name: 表名
+        schema: 模式名
+
+    返回:
+        list: SQL语句
+    """
+    target = f"{schema}.{table_name}"
+    trigger = f"trg_{table_name}_{REV_COLUMN}"
+    return sequence_sql() + [
+        f"ALTER TABLE {target} ADD COLUMN IF NOT EXISTS {rev_column_defs()[0]}",
+        f"ALTER TABLE {target} ADD COLUMN IF NOT EXISTS {rev_column_defs()[1]}",
+        f"ALTER TABLE {target} ADD COLUMN IF NOT EXISTS {rev_column_defs()[2]}",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{REV_COLUMN} ON {target} ({REV_COLUMN})",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{XID_COLUMN} ON {target} ({XID_COLUMN})",
+        f"DROP TRIGGER IF EXISTS {trigger} ON {target}",
+        f"CREATE TRIGGER {trigger} BEFORE UPDATE ON {target} "
+        f"FOR EACH ROW EXECUTE FUNCTION {REV_FUNCTION}()",
+    ]
+
+
+def ensure_change_tracking(conn, table_name, schema='public'):
+    """为表启用变更跟踪（调用方负责提交事务）"""
+    for sql in change_tracking_sql(table_name, schema):
+        conn.execute(text(sql))
+
+
+def xid_param(name):
+    """把整数参数转换为 xid8 的SQL表达式（与 rev_xid 比较时可以使用索引）"""
+    return f"CAST(CAST(:{name} AS text) AS xid8)"
+
+
+def read_watermark(conn):
+    """
+    当前的同步水位：快照中最早的未结束事务号（事务号小于它的写入都已提交或回滚）
+
+    返回:
+        int
+    """
+    return conn.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar()
+
+
+def parse_since(value):
+    """
+    解析 since 参数（上次同步返回的位置，0 表示从头开始）
+
+    返回:
+        int 或 None（未指定时）
+
+    异常:
+        ValueError: 不是非负整数
+    """
+    if value is None or value == '':
+        return None
+    try:
+        since = int(value)
+    except (TypeError, ValueError):
+        since = -1
+    if since < 0:
+        raise ValueError(f"无效的 since: {value}（应为非负整数）")
+    return since
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+写入冲突检查：新增/修改的要素与同图层其他有效要素的重叠、重复，以及线的自相交
+
+冲突类型:
+    overlap            面与面内部重叠（area_m2），线与线共线重叠（length_m，相距不超过 line_snap_tolerance
+                       的部分视为共线）；单纯的接边、交叉不算
+    duplicate          点与点距离小于 min_point_distance（distance_m）
+    self_intersection  线自相交（gid 为 null）
+写入检查（insert_feature / update_feature）在写入的同一事务中执行: 候选要素用外包框条件（&&，走 GiST 索引）
+取出，再向量化计算重叠面积/长度（shapely 2），不逐个调用 PostGIS 函数。重叠部分在存储坐标系中求交，
+只把交集投影到要素所在的 UTM 投影带量测（先投影再求交时，4326 中共线但顶点不同的线段投影后不再严格共线，
+共线重叠会被漏掉）。分别数字化的同一段线顶点不重合，精确求交只得到交点，因此线求交前先在 line_snap_tolerance
+范围内互相吸附（shapely.snap，把对方的顶点插入自身），使共线部分的顶点一致。
+reject 模式下同一图层的检查与写入用事务级 advisory 锁串行，避免两个并发写入都通过检查。
+整层检查（check_layer）在进程池中分块执行，每个工作进程持有整层几何和 STRtree，每对要素只计算一次。
+"""
+
+from sqlalchemy import text
+
+from backend.config import CONFLICT_CONFIG, LAYER_TABLES
+from backend.utils.crs import STORAGE_SRID, transform_geometries, utm_crs
+from backend.utils.metrics import timed
+
+CONFLICT_MODES = ('off', 'warn', 'reject')
+
+# 几何类型 -> (冲突类型, 量测字段)
+CONFLICT_MEASURES = {
+    'polygon': ('overlap', 'area_m2'),
+    'line': ('overlap', 'length_m'),
+    'point': ('duplicate', 'distance_m'),
+}
+
+# 把距离（点重复距离、线吸附容差）换算成度时的每度长度（每度纬度的最小长度，偏大只增加候选）
+METERS_PER_DEGREE = 110_000
+
+
+class FeatureConflictError(Exception):
+    """reject 模式下写入的要素与已有要素冲突"""
+
+    def __init__(self, table_name, conflicts):
+        super().__init__(f'要素与 {table_name} 中的已有要素冲突（{len(conflicts)} 处）')
+        self.table_name = table_name
+        self.conflicts = conflicts
+
+
+def resolve_mode(table_name, override=None):
+    """
+    确定图层的检查模式
+
+    参数:
+        table_name: 表名
+        override: 请求指定的模式（None 或空字符串表示使用配置）
+
+    返回:
+        str: 'off' / 'warn' / 'reject'
+
+    异常:
+        ValueError: 模式无效
+    """
+    mode = override or CONFLICT_CONFIG['tables'].get(table_name, 'off')
+    if mode not in CONFLICT_MODES:
+        raise ValueError(f"无效的 conflicts: {mode}（可选: {', '.join(CONFLICT_MODES)}）")
+    return mode
+
+
+def pair_conflicts(geometry_type, left, right, metric_crs):
+    """
+    向量化计算成对几何的冲突（left[i] 与 right[i]，存储坐标系 EPSG:4326；left 可为单元素数组）
+
+    点在 metric_crs 中量测距离；线、面在存储坐标系中求交，只把交集转换到 metric_crs 量测长度/面积。
+    线求交前两两互相吸附（容差 line_snap_tolerance 米，按每度 METERS_PER_DEGREE 米换算成度）。
+
+    参数:
+        geometry_type: 'point' / 'line' / 'polygon'
+        left, right: 几何数组
+        metric_crs: 量测用的投影坐标系（米）
+
+    返回:
+        tuple: (是否冲突的布尔数组, 量测值数组)
+    """
+    import shapely
+    storage_crs = f"EPSG:{STORAGE_SRID}"
+    if geometry_type == 'point':
+        measure = shapely.distance(transform_geometries(left, storage_crs, metric_crs),
+                                   transform_geometries(right, storage_crs, metric_crs))
+        return measure < CONFLICT_CONFIG['min_point_distance'], measure
+    if geometry_type == 'line':
+        tolerance = CONFLICT_CONFIG['line_snap_tolerance'] / METERS_PER_DEGREE
+        left = shapely.snap(left, right, tolerance)
+        right = shapely.snap(right, left, tolerance)
+    overlap = transform_geometries(shapely.intersection(left, right), storage_crs, metric_crs)
+    if geometry_type == 'polygon':
+        measure = shapely.area(overlap)
+        return measure > CONFLICT_CONFIG['min_overlap_area'], measure
+    # 线与线交叉的交点长度为 0，只有共线部分计入
+    measure = shapely.length(overlap)
+    return measure > CONFLICT_CONFIG['min_overlap_length'], measure
+
+
+def _candidate_distance(geometry_type):
+    """取候选要素的扩展距离（度）: 点为重复距离，线为吸附容差（相距很近但不相交的线也可能共线），面为 0"""
+    if geometry_type == 'point':
+        return CONFLICT_CONFIG['min_point_distance'] / METERS_PER_DEGREE * 2
+    if geometry_type == 'line':
+        return CONFLICT_CONFIG['line_snap_tolerance'] / METERS_PER_DEGREE * 2
+    return 0
+
+
+def _conflict(gid, geometry_type, measure):
+    kind, key = CONFLICT_MEASURES[geometry_type]
+    return {'gid': gid, 'type': kind, key: round(float(measure), 2)}
+
+
+def find_conflicts(conn, table_name, geometry, exclude_gid=None):
+    """
+    检查一个要素与图层中已有要素的冲突（在写入事务中调用）
+
+    参数:
+        conn: 数据库连接（写入所在的事务）
+        table_name: 表名
+        geometry: shapely 几何（EPSG:4326）
+        exclude_gid: 不参与比较的 gid（更新时为要素本身）
+
+    返回:
+        list: [{'gid', 'type', 'area_m2' | 'length_m' | 'distance_m'}, ...]，重叠按量测值从大到小排列
+    """
+    import numpy as np
+    import shapely
+
+    geometry_type = LAYER_TABLES[table_name]['geometry_type']
+    conflicts = []
+    if geometry_type == 'line' and not shapely.is_simple(geometry):
+        conflicts.append({'gid': None, 'type': 'self_intersection'})
+
+    expand = _candidate_distance(geometry_type)
+    sql = (f'SELECT gid, "geometry" FROM {table_name} '
+           f'WHERE status = 1 AND "geometry" && ST_Expand(ST_SetSRID(ST_GeomFromWKB(:geom), {STORAGE_SRID}), :expand)'
+           + (' AND gid <> :gid' if exclude_gid is not None else '') + ' LIMIT :limit')
+    params = {'geom': shapely.to_wkb(geometry), 'expand': float(expand), 'gid': exclude_gid,
+              'limit': CONFLICT_CONFIG['max_candidates']}
+    with timed('conflicts'):
+        rows = conn.execute(text(sql), params).fetchall()
+        if not rows:
+            return conflicts
+        if len(rows) >= CONFLICT_CONFIG['max_candidates']:
+            print(f"[WARN] {table_name} 冲突检查的候选要素达到上限 {CONFLICT_CONFIG['max_candidates']}，只比较前 {len(rows)} 个")
+
+        gids = np.array([row[0] for row in rows], dtype=np.int64)
+        candidates = shapely.from_wkb(np.array([row[1] for row in rows], dtype=object))
+        mask, measure = pair_conflicts(geometry_type, np.array([geometry], dtype=object), candidates,
+                                       utm_crs([geometry]))
+
+    order = np.argsort(measure[mask] if geometry_type == 'point' else -measure[mask], kind='stable')
+    conflicts.extend(_conflict(int(gid), geometry_type, value)
+                     for gid, value in zip(gids[mask][order], measure[mask][order]))
+    return conflicts
+
+
+def check_write(conn, table_name, geometry, mode, exclude_gid=None):
+    """
+    写入前的冲突检查（insert_feature / update_feature 在写入语句之前调用）
+
+    返回:
+        list: 冲突列表（off 模式为空）
+
+    异常:
+        FeatureConflictError: reject 模式下存在冲突（调用方回滚事务）
+    """
+    if mode == 'off':
+        return []
+    if mode == 'reject':
+        conn.execute(text('SELECT pg_advisory_xact_lock(hashtext(:table_name))'), {'table_name': table_name})
+    conflicts = find_conflicts(conn, table_name, geometry, exclude_gid)
+    if conflicts:
+        print(f"[WARN] 写入 {table_name} 的要素存在 {len(conflicts)} 处冲突（模式 {mode}）: {conflicts[:5]}")
+        if mode == 'reject':
+            raise FeatureConflictError(table_name, conflicts)
+    return conflicts
+
+
+# ---- 整层检查（进程池） ----
+
+# 工作进程中的整层数据（由 _init_worker 设置）
+_worker_layer = {}
+
+
+def _init_worker(geometry_type, gids, wkb, metric_crs):
+    """工作进程初始化：解析整层几何（保持存储坐标系）并建立 STRtree"""
+    import numpy as np
+    import shapely
+    geometries = shapely.from_wkb(np.array(wkb, dtype=object))
+    _worker_layer.update(geometry_type=geometry_type, gids=np.asarray(gids, dtype=np.int64),
+                         geometries=geometries, tree=shapely.STRtree(geometries), metric_crs=metric_crs)
+
+
+def _check_chunk(bounds):
+    """
+    检查 [start, stop) 范围内的要素与整层的冲突（只报告 i < j 的要素对，每对只出现一次）
+
+    返回:
+        list: [{'gid', 'other_gid', 'type', 量测字段}, ...] 与自相交 [{'gid', 'type': 'self_intersection'}]
+    """
+    import numpy as np
+    import shapely
+
+    start, stop = bounds
+    geometry_type = _worker_layer['geometry_type']
+    gids = _worker_layer['gids']
+    geometries = _worker_layer['geometries']
+    chunk = geometries[start:stop]
+
+    conflicts = []
+    if geometry_type == 'line':
+        for index in np.flatnonzero(~shapely.is_simple(chunk)):
+            conflicts.append({'gid': int(gids[start + index]), 'type': 'self_intersection'})
+
+    if geometry_type == 'polygon':
+        left, right = _worker_layer['tree'].query(chunk, predicate='intersects')
+    else:
+        # 存储坐标系中按度扩展取候选，距离与重叠由 pair_conflicts 在投影坐标系中精确量测
+        left, right = _worker_layer['tree'].query(chunk, predicate='dwithin',
+                                                  distance=_candidate_distance(geometry_type))
+    left = left + start
+    keep = left < right
+    left, right = left[keep], right[keep]
+    if len(left):
+        mask, measure = pair_conflicts(geometry_type, geometries[left], geometries[right],
+                                       _worker_layer['metric_crs'])
+        for i, j, value in zip(left[mask], right[mask], measure[mask]):
+            conflict = _conflict(int(gids[i]), geometry_type, value)
+            conflict['other_gid'] = int(gids[j])
+            conflicts.append(conflict)
+    return conflicts
+
+
+def check_layer(table_name, workers=None, chunk_size=None):
+    """
+    检查整个图层中有效要素之间的冲突（进程池并行）
+
+    图层只从数据库读取一次，几何以 WKB 传给各工作进程，任务为要素序号范围。
+
+    参数:
+        table_name: 表名
+        workers: 进程数（None 使用配置，仍为 None 时为CPU数）
+        chunk_size: 每个任务的要素数（None 使用配置）
+
+    返回:
+        dict: {'table', 'features', 'conflicts': [...], 'elapsed_seconds'}
+
+    异常:
+        ValueError: 图层未知
+    """
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    from backend.utils.db import get_engine
+
+    if table_name not in LAYER_TABLES:
+        raise ValueError(f"无效的图层: {table_name}（可选: {', '.join(LAYER_TABLES)}）")
+    geometry_type = LAYER_TABLES[table_name]['geometry_type']
+    workers = workers or CONFLICT_CONFIG['workers']
+    chunk_size = chunk_size or CONFLICT_CONFIG['chunk_size']
+
+    started = time.perf_counter()
+    with get_engine().connect() as conn:
+        rows = conn.execute(text(
+            f'SELECT gid, ST_AsBinary("geometry") FROM {table_name} '
+            f'WHERE status = 1 AND "geometry" IS NOT NULL ORDER BY gid'
+        )).fetchall()
+    gids = [row[0] for row in rows]
+    wkb = [bytes(row[1]) for row in rows]
+    print(f"[DEBUG] 整层冲突检查 {table_name}: {len(gids)} 个要素")
+
+    conflicts = []
+    if gids:
+        import shapely
+        metric_crs = utm_crs(shapely.from_wkb(wkb))
+        ranges = [(start, min(start + chunk_size, len(gids))) for start in range(0, len(gids), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(geometry_type, gids, wkb, metric_crs)) as executor:
+            for result in executor.map(_check_chunk, ranges):
+                conflicts.extend(result)
+
+    return {
+        'table': table_name,
+        'features': len(gids),
+        'conflicts': conflicts,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+坐标系工具：缓存 pyproj Transformer，按数组批量转换坐标
+
+数据库统一存储 EPSG:4326；CGCS2000 / 高斯-克吕格等投影坐标的源数据在导入和写入时转换到 4326，
+API 读取时可通过 srid 参数在数据库中用 ST_Transform 输出其他坐标系。
+pyproj / numpy / shapely 在函数内导入，导入本模块时不加载。
+"""
+
+from functools import lru_cache
+
+# 数据库存储坐标系
+STORAGE_SRID = 4326
+
+
+@lru_cache(maxsize=64)
+def get_crs(crs_input):
+    """解析坐标系（EPSG代码、'EPSG:xxxx'、WKT 等），结果按输入缓存"""
+    from pyproj import CRS
+    return CRS.from_user_input(crs_input)
+
+
+@lru_cache(maxsize=64)
+def get_transformer(source, target):
+    """
+    获取坐标转换器（按源/目标坐标系缓存，避免每批数据重复创建）
+
+    参数:
+        source: 源坐标系（可哈希的坐标系描述，如 'EPSG:4547'、4326 或 WKT）
+        target: 目标坐标系
+
+    返回:
+        pyproj.Transformer（always_xy=True，即 经度/东向 在前）
+    """
+    from pyproj import Transformer
+    return Transformer.from_crs(get_crs(source), get_crs(target), always_xy=True)
+
+
+def _crs_key(crs):
+    """把 CRS 对象转换为可哈希的缓存键（优先使用 EPSG 代码）"""
+    if isinstance(crs, (int, str)):
+        return crs
+    epsg = crs.to_epsg()
+    return f"EPSG:{epsg}" if epsg else crs.to_wkt()
+
+
+def transform_geometries(geometries, source, target):
+    """
+    批量转换几何坐标（所有几何的坐标一次性交给 pyproj 转换）
+
+    参数:
+        geometries: 几何数组
+        source: 源坐标系
+        target: 目标坐标系
+
+    返回:
+        numpy.ndarray: 转换后的几何
+    """
+    import numpy as np
+    import shapely
+
+    transformer = get_transformer(_crs_key(source), _crs_key(target))
+
+    geoms = np.asarray(geometries, dtype=object)
+
+    def transform_coords(coords):
+        return np.column_stack(transformer.transform(*coords.T))
+
+    # 带 Z 值的几何单独转换（连同高程），避免丢失 Z
+    has_z = shapely.has_z(geoms)
+    if not has_z.any():
+        return shapely.transform(geoms, transform_coords)
+    result = geoms.copy()
+    result[has_z] = shapely.transform(geoms[has_z], transform_coords, include_z=True)
+    result[~has_z] = shapely.transform(geoms[~has_z], transform_coords)
+    return result
+
+
+def utm_crs(geometries):
+    """
+    几何外包框中心所在的 UTM 投影带（WGS84），用于按米计算距离、面积和长度
+
+    参数:
+        geometries: EPSG:4326 几何数组
+
+    返回:
+        str: 如 'EPSG:32650'
+    """
+    import shapely
+    minx, miny, maxx, maxy = shapely.total_bounds(geometries)
+    lon, lat = (minx + maxx) / 2, (miny + maxy) / 2
+    zone = min(max(int((lon + 180) // 6) + 1, 1), 60)
+    return f"EPSG:{(32600 if lat >= 0 else 32700) + zone}"
+
+
+def to_srid(gdf, srid=STORAGE_SRID, source_crs=None):
+    """
+    把 GeoDataFrame 转换到指定坐标系（未定义坐标系时按 source_crs 设置，仍未知则视为目标坐标系）
+
+    参数:
+        gdf: GeoDataFrame
+        srid: 目标 EPSG 代码
+        source_crs: 数据本身未带坐标系时使用的源坐标系
+
+    返回:
+        GeoDataFrame（坐标系已相同时原样返回）
+    """
+    target = f"EPSG:{srid}"
+    if gdf.crs is None:
+        gdf = gdf.set_crs(source_crs if source_crs is not None else target)
+    if gdf.crs.to_epsg() == srid:
+        return gdf
+
+    transformed = transform_geometries(gdf.geometry.values, gdf.crs, target)
+    gdf = gdf.copy()
+    gdf[gdf.geometry.name] = transformed
+    return gdf.set_crs(target, allow_override=True)
+
+
+def parse_srid(value):
+    """
+    解析并校验 SRID（EPSG 代码）
+
+    返回:
+        int 或 None（未指定时）
+
+    异常:
+        ValueError: 不是整数或不是已知的 EPSG 坐标系
+    """
+    if value is None or value == '':
+        return None
+    from pyproj.exceptions import CRSError
+    try:
+        srid = int(value)
+        get_crs(f"EPSG:{srid}")
+    except (TypeError, ValueError, CRSError):
+        raise ValueError(f"无效的 srid: {value}（应为 EPSG 代码，如 4326、3857、4547）")
+    return srid
+
+
+def parse_srid_arg(args):
+    """从请求参数中读取 srid（None 或与存储坐标系相同时表示不转换）"""
+    srid = parse_srid(args.get('srid'))
+    return None if srid == STORAGE_SRID else srid
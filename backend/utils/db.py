@@ -1,24 +1,60 @@
 # -*- coding: utf-8 -*-
 """
 数据库操作工具
+
+geopandas / pandas / shapely 只在需要的函数内导入，导入本模块（以及启动API服务）时不加载这些库。
 """
 
+import json
+import threading
+import time
+
 from sqlalchemy import create_engine, text
 from sqlalchemy.pool import NullPool
-import geopandas as gpd
-from backend.config import get_database_url
-import sys
-
-# 修复Windows控制台编码问题
-if sys.platform == 'win32':
-    try:
-        sys.stdout.reconfigure(encoding='utf-8')
-    except:
-        pass
+from backend.config import DATABASE_OPTIONS, get_database_url
+from backend.utils.changes import (
+    REV_COLUMN, REV_SEQUENCE, UPDATED_AT_COLUMN, XID_COLUMN, read_watermark, xid_param,
+)
+from backend.utils.conflicts import FeatureConflictError, check_write, resolve_mode
+from backend.utils.crs import STORAGE_SRID
+from backend.utils.features import GEOJSON_MAX_DECIMALS, feature_collection, parse_geometry, records_from_rows
+from backend.utils.metrics import instrument_engine, record_cache, record_rows, timed
+from backend.utils.query_log import install_query_log
+from backend.utils.measures import (
+    get_measure_columns, measure_properties, measure_select_items, measure_sql_expressions, MEASURE_FIELDS,
+)
+from backend.utils.simplify import get_simplify_columns, simplify_sql_expressions
 
 # 创建数据库引擎（使用连接池）
 _engine = None
 
+# 数据写入监听器（如地名索引缓存、事件推送），通过API修改的数据提交后调用 listener(event)
+_write_listeners = []
+
+
+def add_write_listener(listener):
+    """注册数据写入监听器（插入、更新、软删除/恢复提交后调用）"""
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def notify_write(table_name, gid, op, **extra):
+    """
+    通知监听器表数据已修改（监听器异常只记录日志，不影响写入结果）
+
+    参数:
+        table_name: 表名
+        gid: 记录ID
+        op: 操作类型（insert / update / status）
+        extra: 附加信息，如 status（状态变更）、geometry（写入的 shapely 几何，EPSG:4326）
+    """
+    event = {'layer': table_name, 'gid': gid, 'op': op, **extra}
+    for listener in _write_listeners:
+        try:
+            listener(event)
+        except Exception as e:
+            print(f"[WARN] 写入监听器执行失败: {e}")
+
 def get_engine():
     """获取数据库引擎（单例模式）"""
     global _engine
@@ -28,6 +64,8 @@ def get_engine():
             poolclass=NullPool,  # 不使用连接池，避免PostGIS类型问题
             echo=False
         )
+        instrument_engine(_engine)
+        install_query_log(_engine)
     return _engine
 
 def execute_query(sql, params=None):
@@ -49,21 +87,56 @@ def execute_query(sql, params=None):
             result = conn.execute(text(sql))
         return result
 
-def get_table_columns(table_name, schema='public'):
+# 表结构缓存：(schema, 表名) -> (读取时间, [(列名, 数据类型, 可为空, 默认值)])
+_metadata_cache = {}
+_metadata_lock = threading.Lock()
+
+_COLUMNS_SQL = text("""
+    SELECT column_name, data_type, is_nullable = 'YES', column_default FROM information_schema.columns
+    WHERE table_schema = :schema AND table_name = :table_name
+    ORDER BY ordinal_position
+""")
+
+
+def get_column_metadata(table_name, schema='public'):
+    """
+    获取表的列信息（按 DATABASE_OPTIONS['metadata_cache_seconds'] 缓存，避免每次读写都查询 information_schema）
+
+    返回:
+        list: [(列名, 数据类型, 可为空, 默认值)]
+    """
+    key = (schema, table_name)
+    max_age = DATABASE_OPTIONS.get('metadata_cache_seconds', 60)
+    with _metadata_lock:
+        cached = _metadata_cache.get(key)
+    if cached and time.monotonic() - cached[0] < max_age:
+        record_cache('table_metadata', True)
+        return cached[1]
+    
+    record_cache('table_metadata', False)
+    with get_engine().connect() as conn:
+        rows = [tuple(row) for row in conn.execute(_COLUMNS_SQL, {'schema': schema, 'table_name': table_name})]
+    # 表不存在时不缓存，建表后立即可见
+    if rows:
+        with _metadata_lock:
+            _metadata_cache[key] = (time.monotonic(), rows)
+    return rows
+
+
+def clear_metadata_cache():
+    """清空表结构缓存（迁移脚本修改表结构后调用）"""
+    with _metadata_lock:
+        _metadata_cache.clear()
+
+
+def get_table_columns(table_name, schema='public', conn=None):
     """
     Get list of column names for a PostGIS table (for filtering gdf columns on insert/update).
+    Pass conn to see columns added by an uncommitted migration on that connection (not cached).
     """
-    engine = get_engine()
-    with engine.connect() as conn:
-        result = conn.execute(
-            text("""
-                SELECT column_name FROM information_schema.columns
-                WHERE table_schema = :schema AND table_name = :table_name
-                ORDER BY ordinal_position
-            """),
-            {'schema': schema, 'table_name': table_name}
-        )
-        return [row[0] for row in result]
+    if conn is not None:
+        return [row[0] for row in conn.execute(_COLUMNS_SQL, {'schema': schema, 'table_name': table_name})]
+    return [row[0] for row in get_column_metadata(table_name, schema)]
 
 
 def get_table_not_null_columns_without_default(table_name, schema='public'):
@@ -71,22 +144,104 @@ def get_table_not_null_columns_without_default(table_name, schema='public'):
     Get (column_name, data_type) for columns that are NOT NULL and have no default.
     Used to fill default values on insert when request does not provide them.
     """
-    engine = get_engine()
-    with engine.connect() as conn:
-        result = conn.execute(
-            text("""
-                SELECT column_name, data_type FROM information_schema.columns
-                WHERE table_schema = :schema AND table_name = :table_name
-                  AND is_nullable = 'NO'
-                  AND (column_default IS NULL OR column_default = '')
-                ORDER BY ordinal_position
-            """),
-            {'schema': schema, 'table_name': table_name}
-        )
-        return [(row[0], row[1]) for row in result]
+    return [
+        (name, data_type) for name, data_type, nullable, default in get_column_metadata(table_name, schema)
+        if not nullable and not default
+    ]
+
+
+# 导入程序写入的源要素指纹列（见 importer.sync），客户端不可写、查询时不返回
+HASH_COLUMN = 'src_hash'
+
+
+def get_derived_columns():
+    """获取由数据库/导入程序维护的派生列（客户端写入时忽略这些列，查询时不返回）"""
+    return set(get_simplify_columns()) | set(get_measure_columns()) | {HASH_COLUMN, UPDATED_AT_COLUMN, XID_COLUMN}
+
+
+def get_readonly_columns():
+    """获取客户端不可写的列（派生列与变更序号 rev；rev 随查询返回）"""
+    return get_derived_columns() | {REV_COLUMN}
+
+
+def build_select_list(table_name, geom_col='geometry', simplify_column=None, srid=None, as_geojson=False):
+    """
+    构建SELECT列表：排除派生列，需要时用简化几何替换原几何，并在数据库中转换坐标系
 
+    参数:
+        table_name: 表名
+        geom_col: 几何列名
+        simplify_column: 简化几何列名（可选）
+        srid: 输出坐标系的 EPSG 代码（可选，None 表示存储坐标系 4326）
+        as_geojson: 几何列输出为 GeoJSON 文本（ST_AsGeoJSON）
+
+    返回:
+        str: SELECT列表
+    """
+    table_columns = get_table_columns(table_name)
+    derived_columns = get_derived_columns()
+    transform = srid is not None and srid != STORAGE_SRID
+    if not table_columns or (not transform and not as_geojson and not derived_columns.intersection(table_columns)):
+        return '*'
 
-def read_postgis_table(table_name, geom_col='geometry', where_clause=None, include_inactive=False):
+    select_items = []
+    for col in table_columns:
+        if col in derived_columns:
+            continue
+        if col != geom_col:
+            select_items.append(f'"{col}"')
+            continue
+        geom_expr = f'"{geom_col}"'
+        if simplify_column in table_columns:
+            # 简化列尚未填充时回退到原几何
+            geom_expr = f'COALESCE("{simplify_column}", "{geom_col}")'
+        if transform:
+            geom_expr = f'ST_Transform({geom_expr}, {int(srid)})'
+        if as_geojson:
+            geom_expr = f'ST_AsGeoJSON({geom_expr}, {GEOJSON_MAX_DECIMALS})'
+        select_items.append(geom_expr if geom_expr == f'"{geom_col}"' else f'{geom_expr} AS "{geom_col}"')
+    return ', '.join(select_items)
+
+
+def refresh_derived_columns(conn, table_name, gid=None, geom_col='geometry'):
+    """
+    重新计算派生列（简化几何金字塔、面积/长度/中心点/外包框），调用方负责提交事务
+
+    参数:
+        conn: 数据库连接
+        table_name: 表名
+        gid: 记录ID，或记录ID列表（None表示整表刷新）
+        geom_col: 几何列名
+
+    返回:
+        int: 更新的记录数
+    """
+    table_columns = get_table_columns(table_name, conn=conn)
+    expressions = {
+        **simplify_sql_expressions(table_name, f'"{geom_col}"'),
+        **measure_sql_expressions(table_name, f'"{geom_col}"'),
+    }
+    expressions = {col: expr for col, expr in expressions.items() if col in table_columns}
+    if not expressions:
+        return 0
+
+    assignments = ', '.join(f'"{col}" = {expr}' for col, expr in expressions.items())
+    sql = f"UPDATE {table_name} SET {assignments}"
+    params = {}
+    if isinstance(gid, (list, tuple)):
+        if not gid:
+            return 0
+        sql += " WHERE gid = ANY(:gids)"
+        params['gids'] = list(gid)
+    elif gid is not None:
+        sql += " WHERE gid = :gid"
+        params['gid'] = gid
+    result = conn.execute(text(sql), params)
+    return result.rowcount
+
+
+def read_postgis_table(table_name, geom_col='geometry', where_clause=None, include_inactive=False,
+                       simplify_column=None, srid=None):
     """
     从PostGIS表读取数据
     
@@ -95,6 +250,8 @@ def read_postgis_table(table_name, geom_col='geometry', where_clause=None, inclu
         geom_col: 几何列名（默认'geometry'）
         where_clause: WHERE子句（可选）
         include_inactive: 是否包含无效数据（默认False，只查询status=1的记录）
+        simplify_column: 简化几何列名（可选，见 backend.utils.simplify）
+        srid: 输出坐标系的 EPSG 代码（可选，在数据库中用 ST_Transform 转换）
     
     返回:
         GeoDataFrame对象
@@ -113,7 +270,8 @@ def read_postgis_table(table_name, geom_col='geometry', where_clause=None, inclu
         conditions.append(f"({where_clause})")
     
     # 构建SQL
-    sql = f"SELECT * FROM {table_name}"
+    select_list = build_select_list(table_name, geom_col, simplify_column, srid)
+    sql = f"SELECT {select_list} FROM {table_name}"
     if conditions:
         sql += " WHERE " + " AND ".join(conditions)
     
@@ -140,11 +298,24 @@ def read_postgis_table(table_name, geom_col='geometry', where_clause=None, inclu
             count = result.scalar()
             print(f"[DEBUG] 表 {table_name} 有效记录数: {count}")
         
-        gdf = gpd.read_postgis(
-            sql,
-            engine,
-            geom_col=geom_col
-        )
+        # 分阶段读取：执行查询（sql），再由结果构建 GeoDataFrame（gdf），便于分别计时
+        with timed('sql'):
+            with engine.connect() as conn:
+                result = conn.execute(text(sql))
+                columns = list(result.keys())
+                rows = result.fetchall()
+        record_rows(table_name, len(rows))
+        
+        with timed('gdf'):
+            import geopandas as gpd
+            import numpy as np
+            import pandas as pd
+            import shapely
+            geom_index = columns.index(geom_col)
+            geometries = shapely.from_wkb(np.array([row[geom_index] for row in rows], dtype=object))
+            df = pd.DataFrame.from_records(rows, columns=columns)
+            df[geom_col] = geometries
+            gdf = gpd.GeoDataFrame(df, geometry=geom_col, crs=f"EPSG:{srid or STORAGE_SRID}")
         
         if gdf is not None:
             print(f"[DEBUG] 读取成功，GeoDataFrame形状: {gdf.shape}, 列名: {gdf.columns.tolist()}")
@@ -158,155 +329,428 @@ def read_postgis_table(table_name, geom_col='geometry', where_clause=None, inclu
         print(f"[错误] 错误详情: {traceback.format_exc()}")
         return None
 
-def insert_feature(table_name, feature, geom_col='geometry'):
+
+def read_feature_records(table_name, geom_col='geometry', where_clause=None, include_inactive=False,
+                         simplify_column=None, srid=None, params=None):
     """
-    插入单个要素到PostGIS表
-    
+    读取要素记录（不构建 GeoDataFrame，几何由数据库输出为 GeoJSON 文本，见 backend.utils.features）
+
     参数:
         table_name: 表名
-        feature: GeoJSON Feature对象
         geom_col: 几何列名
+        where_clause: WHERE子句（可选，可使用 :name 形式的绑定参数）
+        include_inactive: 是否包含无效数据（默认只查询status=1的记录）
+        simplify_column: 简化几何列名（可选）
+        srid: 输出坐标系的 EPSG 代码（可选）
+        params: where_clause 的绑定参数
+
+    返回:
+        list[FeatureRecord]；表不存在时返回 None
+    """
+    if not get_table_columns(table_name):
+        print(f"[ERROR] 表 {table_name} 不存在")
+        return None
+
+    conditions = [] if include_inactive else ['status = 1']
+    if where_clause:
+        conditions.append(f"({where_clause})")
+    sql = f"SELECT {build_select_list(table_name, geom_col, simplify_column, srid, as_geojson=True)} FROM {table_name}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    print(f"[DEBUG] 执行SQL: {sql}")
+
+    with timed('sql'):
+        with get_engine().connect() as conn:
+            result = conn.execute(text(sql), params or {})
+            columns = list(result.keys())
+            rows = result.fetchall()
+    record_rows(table_name, len(rows))
+
+    with timed('records'):
+        return records_from_rows(columns, rows, geom_col)
+
+
+def read_feature(table_name, gid, geom_col='geometry', include_inactive=False, srid=None):
+    """
+    按 gid 读取单个要素
+
+    返回:
+        FeatureRecord；不存在（或已删除且 include_inactive=False）时返回 None
+    """
+    records = read_feature_records(table_name, geom_col, 'gid = :gid', include_inactive, srid=srid,
+                                   params={'gid': gid})
+    return records[0] if records else None
+
+
+def get_feature_status(table_name, gid):
+    """
+    查询要素状态（1=有效，0=已删除）
+
+    返回:
+        int；要素不存在时返回 None
+    """
+    with get_engine().connect() as conn:
+        return conn.execute(text(f"SELECT status FROM {table_name} WHERE gid = :gid"), {'gid': gid}).scalar()
+
+
+def read_feature_fields(table_name, fields, geom_col='geometry', where_clause=None, include_inactive=False,
+                        srid=None):
+    """
+    轻量查询：只返回指定字段（量测字段与属性列），不返回几何
+
+    参数:
+        table_name: 表名
+        fields: 字段列表（见 backend.utils.measures.parse_fields_arg）
+        geom_col: 几何列名
+        where_clause: WHERE子句（可选）
+        include_inactive: 是否包含无效数据
+        srid: centroid / bbox 的输出坐标系（可选）
+
+    返回:
+        dict: GeoJSON FeatureCollection（geometry 为 null，字段放在 properties 中）
+
+    异常:
+        ValueError: 字段不存在
+    """
+    table_columns = get_table_columns(table_name)
+    if not table_columns:
+        raise ValueError(f'表不存在: {table_name}')
+    derived_columns = get_derived_columns()
+    
+    select_items = ['gid']
+    for field in fields:
+        if field in MEASURE_FIELDS:
+            select_items.extend(measure_select_items(field, table_columns, geom_col, srid))
+        elif field in table_columns and field not in derived_columns and field != geom_col:
+            if field != 'gid':
+                select_items.append(f'"{field}"')
+        else:
+            raise ValueError(f'未知字段: {field}（可选: {", ".join(MEASURE_FIELDS)} 或属性列）')
+    
+    conditions = [] if include_inactive else ['status = 1']
+    if where_clause:
+        conditions.append(f"({where_clause})")
+    sql = f"SELECT {', '.join(select_items)} FROM {table_name}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY gid"
+    print(f"[DEBUG] 执行SQL: {sql}")
+    
+    with timed('sql'):
+        with get_engine().connect() as conn:
+            rows = conn.execute(text(sql)).mappings().all()
+    record_rows(table_name, len(rows))
     
+    features = []
+    for row in rows:
+        properties = {'gid': row['gid']}
+        for field in fields:
+            if field in MEASURE_FIELDS:
+                properties.update(measure_properties(row, field))
+            elif field != 'gid':
+                properties[field] = row[field]
+        features.append({'type': 'Feature', 'id': row['gid'], 'geometry': None, 'properties': properties})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def get_current_rev():
+    """获取当前全局变更序号（尚无变更时为0）"""
+    with get_engine().connect() as conn:
+        exists = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {'name': REV_SEQUENCE}).scalar()
+        if not exists:
+            return 0
+        return conn.execute(
+            text(f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {REV_SEQUENCE}")
+        ).scalar()
+
+
+def get_change_watermark():
+    """获取增量同步的起始位置（不带 since 的 /api/changes，见 backend.utils.changes）"""
+    with get_engine().connect() as conn:
+        return read_watermark(conn)
+
+
+def read_changes(tables, since, limit=5000, geom_col='geometry', srid=None):
+    """
+    读取 since 之后提交的要素变更（插入、更新、软删除/恢复）
+
+    只返回写入事务号在 [since, 当前水位) 之间的行（水位见 backend.utils.changes），返回的 rev 为下次的 since，
+    不会越过仍未提交的写入。每个图层约返回 limit 条，同一事务写入的行不拆分（单个事务超过 limit 时整体返回）；
+    有图层被截断时 rev 取被截断图层的续读位置中最小的一个（其他图层可能重复返回少量要素，客户端按 gid 覆盖即可）。
+
+    参数:
+        tables: 表名列表
+        since: 上次同步返回的 rev（同步位置）
+        limit: 每个图层的最大要素数
+        geom_col: 几何列名
+        srid: 输出坐标系（可选）
+
     返回:
-        插入的记录ID（gid）
+        dict: {'since', 'rev', 'has_more', 'layers': {表名: {'upserted': FeatureCollection, 'deleted': [gid]}}}
+
+    异常:
+        ValueError: 表未启用变更跟踪
     """
     engine = get_engine()
+    # 水位在读取各图层之前确定：小于水位的事务都已结束，之后的查询一定能看到它们的修改
+    with engine.connect() as conn:
+        watermark = read_watermark(conn)
+    layers = {}
+    truncated_revs = []
+    for table_name in tables:
+        if XID_COLUMN not in get_table_columns(table_name):
+            raise ValueError(f'表 {table_name} 未启用变更跟踪，请先执行 python scripts/add_change_tracking.py')
+
+        # 先确定本次返回的事务号上限（不含），再按范围读取完整要素
+        with engine.connect() as conn:
+            xids = conn.execute(
+                text(f"SELECT {XID_COLUMN}::text::bigint FROM {table_name} "
+                     f"WHERE {XID_COLUMN} >= {xid_param('since')} AND {XID_COLUMN} < {xid_param('watermark')} "
+                     f"ORDER BY {XID_COLUMN} LIMIT :limit"),
+                {'since': since, 'watermark': watermark, 'limit': limit + 1}
+            ).scalars().all()
+        if not xids:
+            layers[table_name] = {'upserted': feature_collection([], srid), 'deleted': []}
+            continue
+        upper = watermark
+        if len(xids) > limit:
+            # 在第 limit+1 行所在的事务处截断；第一个事务就超过 limit 时整体返回
+            upper = xids[limit] if xids[limit] != xids[0] else xids[0] + 1
+            truncated_revs.append(upper)
+
+        records = read_feature_records(
+            table_name, geom_col,
+            where_clause=f"{XID_COLUMN} >= {xid_param('since')} AND {XID_COLUMN} < {xid_param('upper')}",
+            include_inactive=True, srid=srid, params={'since': since, 'upper': upper}
+        )
+        if records is None:
+            raise RuntimeError(f'读取表 {table_name} 的变更失败')
+        active = [record for record in records if record.status == 1]
+        deleted = [record.gid for record in records if record.status != 1]
+        layers[table_name] = {'upserted': feature_collection(active, srid), 'deleted': deleted}
+        print(f"[DEBUG] 表 {table_name} 自 rev {since} 起变更: {len(active)} 条新增/更新, {len(deleted)} 条删除")
+
+    rev = min(truncated_revs) if truncated_revs else max(watermark, since)
+    return {'since': since, 'rev': rev, 'has_more': bool(truncated_revs), 'layers': layers}
+
+
+def insert_feature(table_name, feature, geom_col='geometry', srid=None, return_geometry=False,
+                   conflict_mode=None, conflicts=None):
+    """
+    插入单个要素到PostGIS表
     
-    # 将Feature转换为GeoDataFrame
-    import geopandas as gpd
-    from backend.utils.geojson import feature_to_gdf, validate_and_fix_geometry
+    属性写入、几何写入与派生列计算在同一条 INSERT ... RETURNING 语句中完成，
+    新记录的 gid 由 RETURNING 返回（并发插入时同样准确）。
+    写入前在同一事务中检查与已有要素的冲突（见 backend.utils.conflicts）。
     
-    feature = validate_and_fix_geometry(feature)
-    gdf = feature_to_gdf(feature)
+    参数:
+        table_name: 表名
+        feature: GeoJSON Feature对象
+        geom_col: 几何列名
+        srid: 要素坐标的 EPSG 代码（可选，非 4326 时先转换到 4326 再写入）
+        return_geometry: 是否同时返回数据库中保存的几何
+        conflict_mode: 冲突检查模式 off / warn / reject（None 使用 CONFLICT_CONFIG）
+        conflicts: 列表（可选），warn 模式下检查到的冲突追加到其中
     
-    # Only keep columns that exist in the target table (e.g. rivers has no fclass)
-    table_columns = get_table_columns(table_name)
-    if table_columns:
-        valid_cols = [c for c in gdf.columns if c in table_columns]
-        if valid_cols:
-            gdf = gdf[valid_cols]
-        else:
-            # Keep at least geometry
-            if 'geometry' in gdf.columns:
-                gdf = gdf[['geometry']]
+    返回:
+        插入的记录ID（gid）；return_geometry=True 时返回 (gid, GeoJSON几何)
     
-    # Fill NOT NULL columns that have no default and are missing from gdf (e.g. water_bodies.osm_id, code)
-    not_null_cols = get_table_not_null_columns_without_default(table_name)
-    for col, data_type in not_null_cols:
-        if col in gdf.columns or col == 'geometry' or col == 'gid':
+    异常:
+        FeatureConflictError: reject 模式下与已有要素冲突（不写入）
+    """
+    mode = resolve_mode(table_name, conflict_mode)
+    geometry = parse_geometry(feature.get('geometry'), srid)
+    properties = writable_properties(table_name, feature.get('properties'), geom_col)
+    readonly_columns = get_readonly_columns() | {'gid', geom_col}
+    
+    # 补齐没有默认值的 NOT NULL 列（如 water_bodies.osm_id, code）
+    for col, data_type in get_table_not_null_columns_without_default(table_name):
+        if col in properties or col in readonly_columns:
             continue
-        if data_type in ('character varying', 'text', 'char'):
-            gdf[col] = ''
-        elif data_type in ('integer', 'bigint', 'smallint'):
-            gdf[col] = 0
-        else:
-            gdf[col] = ''  # fallback for other types (e.g. varchar)
-    
-    # 调试：输出插入前的坐标数据
-    if not gdf.empty and 'geometry' in gdf.columns:
-        geom = gdf.iloc[0]['geometry']
-        if geom is not None:
-            if hasattr(geom, 'x') and hasattr(geom, 'y'):
-                print(f"[DEBUG] 插入前的坐标 - 经度: {geom.x}, 纬度: {geom.y}")
-            elif hasattr(geom, 'exterior') and geom.exterior is not None:
-                coords = list(geom.exterior.coords)
-                print(f"[DEBUG] 插入前的坐标数据 (Polygon): {coords}")
-            elif hasattr(geom, 'coords'):
-                try:
-                    coords = list(geom.coords)
-                    print(f"[DEBUG] 插入前的坐标数据: {coords}")
-                except NotImplementedError:
-                    pass
-    
-    # 插入到数据库
+        properties[col] = 0 if data_type in ('integer', 'bigint', 'smallint') else ''
+    
+    sql, params = build_insert_sql(table_name, properties, geometry, geom_col,
+                                   return_geometry or DATABASE_OPTIONS.get('verify_writes'))
     try:
-        gdf.to_postgis(
-            table_name,
-            engine,
-            if_exists='append',
-            index=False
-        )
-        
-        # 获取插入的记录ID
-        with engine.connect() as conn:
-            result = conn.execute(
-                text(f"SELECT MAX(gid) FROM {table_name}")
-            )
-            gid = result.scalar()
-            
-            # 调试：验证插入后的几何（ST_X/ST_Y 仅适用于 POINT，线/面用 ST_AsText 即可）
-            if gid:
-                verify_sql = text(
-                    f"SELECT ST_AsText(geometry) as geom_text, ST_GeometryType(geometry) as geom_type FROM {table_name} WHERE gid = :gid"
-                )
-                verify_result = conn.execute(verify_sql, {'gid': gid})
-                verify_row = verify_result.fetchone()
-                if verify_row:
-                    print(f"[DEBUG] 插入后的几何类型: {verify_row.geom_type}")
-                    print(f"[DEBUG] 几何文本: {verify_row.geom_text}")
-                    if verify_row.geom_type and 'Point' in str(verify_row.geom_type):
-                        point_sql = text(f"SELECT ST_X(geometry) as lon, ST_Y(geometry) as lat FROM {table_name} WHERE gid = :gid")
-                        point_result = conn.execute(point_sql, {'gid': gid})
-                        point_row = point_result.fetchone()
-                        if point_row:
-                            print(f"[DEBUG] 插入后的坐标验证 - 经度: {point_row.lon}, 纬度: {point_row.lat}")
-            
-            return gid
+        with get_engine().begin() as conn:
+            found = check_write(conn, table_name, geometry, mode)
+            row = conn.execute(text(sql), params).mappings().one()
+    except FeatureConflictError:
+        raise
     except Exception as e:
         import traceback
         print(f"[错误] 插入要素失败: {e}")
         print(traceback.format_exc())
         raise
+    
+    gid = row['gid']
+    if conflicts is not None:
+        conflicts.extend(found)
+    saved_geometry = json.loads(row['geometry_json']) if 'geometry_json' in row else None
+    if DATABASE_OPTIONS.get('verify_writes'):
+        print(f"[DEBUG] 插入表 {table_name} 记录 {gid}，保存的几何: {row['geometry_json']}")
+    notify_write(table_name, gid, 'insert', geometry=geometry)
+    
+    if return_geometry:
+        return gid, saved_geometry
+    return gid
+
 
-def update_feature(table_name, gid, feature, geom_col='geometry'):
+def writable_properties(table_name, properties, geom_col='geometry'):
+    """
+    只保留目标表中存在的可写属性列（如 rivers 没有 fclass；gid、派生列与 rev 不可写）
+
+    参数:
+        table_name: 表名
+        properties: 要素属性（dict，可为 None）
+        geom_col: 几何列名
+
+    返回:
+        dict: {列名: 值}
+    """
+    table_columns = get_table_columns(table_name)
+    readonly_columns = get_readonly_columns() | {'gid', geom_col}
+    return {
+        col: value for col, value in (properties or {}).items()
+        if col in table_columns and col not in readonly_columns
+    }
+
+
+def _derived_expressions(table_name, geom_expr):
+    """派生列（简化几何、量测字段）由 geom_expr 计算的SQL表达式（只包含表中存在的列）"""
+    table_columns = get_table_columns(table_name)
+    return {
+        col: expr for col, expr in {
+            **simplify_sql_expressions(table_name, geom_expr),
+            **measure_sql_expressions(table_name, geom_expr),
+        }.items()
+        if col in table_columns
+    }
+
+
+def build_insert_sql(table_name, properties, geometry, geom_col='geometry', return_geometry=False):
+    """
+    生成单条插入语句：属性按表的列类型转换（json_populate_record），几何与派生列在同一语句中写入
+
+    参数:
+        table_name: 表名
+        properties: {列名: 值}（值需可 JSON 序列化）
+        geometry: shapely 几何（EPSG:4326）
+        geom_col: 几何列名
+        return_geometry: RETURNING 中是否包含保存的几何（geometry_json）
+
+    返回:
+        tuple: (SQL, 参数)
+    """
+    new_geom = '__new_geom'
+    derived = _derived_expressions(table_name, new_geom)
+    
+    columns = [f'"{col}"' for col in properties] + [f'"{geom_col}"'] + [f'"{col}"' for col in derived]
+    values = [f'r."{col}"' for col in properties] + [new_geom] + list(derived.values())
+    returning = 'gid'
+    if return_geometry:
+        returning += f', ST_AsGeoJSON("{geom_col}") AS geometry_json'
+    
+    sql = f"""
+        WITH src AS (
+            SELECT r.*, ST_SetSRID(ST_GeomFromWKB(:geom), {STORAGE_SRID}) AS {new_geom}
+            FROM json_populate_record(NULL::{table_name}, CAST(:properties AS json)) r
+        )
+        INSERT INTO {table_name} ({', '.join(columns)})
+        SELECT {', '.join(values)} FROM src r
+        RETURNING {returning}
+    """
+    import shapely
+    params = {
+        'geom': shapely.to_wkb(geometry),
+        'properties': json.dumps(properties, ensure_ascii=False, default=str),
+    }
+    return sql, params
+
+def build_update_sql(table_name, gid, properties, geometry, geom_col='geometry'):
+    """
+    生成单条更新语句：在原记录上更新属性、几何与派生列
+
+    gid 与源要素指纹（src_hash）保持不变，rev / updated_at 由触发器维护；请求中未提供的属性列保持原值。
+
+    参数:
+        table_name: 表名
+        gid: 记录ID
+        properties: {列名: 值}（值需可 JSON 序列化）
+        geometry: shapely 几何（EPSG:4326）
+        geom_col: 几何列名
+
+    返回:
+        tuple: (SQL, 参数)
+    """
+    new_geom = '__new_geom'
+    derived = _derived_expressions(table_name, new_geom)
+    assignments = ([f'"{col}" = r."{col}"' for col in properties] + [f'"{geom_col}" = {new_geom}']
+                   + [f'"{col}" = {expr}' for col, expr in derived.items()])
+    
+    sql = f"""
+        WITH src AS (
+            SELECT r.*, ST_SetSRID(ST_GeomFromWKB(:geom), {STORAGE_SRID}) AS {new_geom}
+            FROM json_populate_record(NULL::{table_name}, CAST(:properties AS json)) r
+        )
+        UPDATE {table_name} SET {', '.join(assignments)}
+        FROM src r
+        WHERE {table_name}.gid = :gid
+        RETURNING {table_name}.gid
+    """
+    import shapely
+    params = {
+        'gid': gid,
+        'geom': shapely.to_wkb(geometry),
+        'properties': json.dumps(properties, ensure_ascii=False, default=str),
+    }
+    return sql, params
+
+
+def update_feature(table_name, gid, feature, geom_col='geometry', srid=None, conflict_mode=None, conflicts=None):
     """
     更新PostGIS表中的要素
     
+    属性、几何与派生列在同一条 UPDATE 语句中原地更新（见 build_update_sql），
+    更新前在同一事务中检查新几何与其他要素的冲突。
+    
     参数:
         table_name: 表名
         gid: 记录ID
         feature: GeoJSON Feature对象（包含更新后的数据）
         geom_col: 几何列名
+        srid: 要素坐标的 EPSG 代码（可选，非 4326 时先转换到 4326 再写入）
+        conflict_mode: 冲突检查模式 off / warn / reject（None 使用 CONFLICT_CONFIG）
+        conflicts: 列表（可选），warn 模式下检查到的冲突追加到其中
     
     返回:
-        bool: 是否成功
-    """
-    engine = get_engine()
-    
-    # 将Feature转换为GeoDataFrame
-    from backend.utils.geojson import feature_to_gdf, validate_and_fix_geometry
-    feature = validate_and_fix_geometry(feature)
-    gdf = feature_to_gdf(feature)
+        bool: 是否成功（记录不存在时返回 False）
     
-    # Only keep columns that exist in the target table (e.g. rivers has no fclass)
-    table_columns = get_table_columns(table_name)
-    if table_columns:
-        valid_cols = [c for c in gdf.columns if c in table_columns]
-        if valid_cols:
-            gdf = gdf[valid_cols]
-        else:
-            if 'geometry' in gdf.columns:
-                gdf = gdf[['geometry']]
+    异常:
+        FeatureConflictError: reject 模式下与其他要素冲突（不更新）
+    """
+    mode = resolve_mode(table_name, conflict_mode)
+    geometry = parse_geometry(feature.get('geometry'), srid)
+    properties = writable_properties(table_name, feature.get('properties'), geom_col)
+    sql, params = build_update_sql(table_name, gid, properties, geometry, geom_col)
     
-    # 更新数据库
     try:
-        # 先删除旧记录
-        with engine.connect() as conn:
-            conn.execute(text(f"DELETE FROM {table_name} WHERE gid = :gid"), {'gid': gid})
-            conn.commit()
-        
-        # 插入新记录（保持相同的gid）
-        gdf['gid'] = gid
-        gdf.to_postgis(
-            table_name,
-            engine,
-            if_exists='append',
-            index=False
-        )
-        return True
+        with get_engine().begin() as conn:
+            found = check_write(conn, table_name, geometry, mode, exclude_gid=gid)
+            updated = conn.execute(text(sql), params).scalar() is not None
+    except FeatureConflictError:
+        raise
     except Exception as e:
         print(f"[错误] 更新要素失败: {e}")
         return False
+    
+    if not updated:
+        print(f"[错误] 更新要素失败: 表 {table_name} 中不存在记录 {gid}")
+        return False
+    if conflicts is not None:
+        conflicts.extend(found)
+    notify_write(table_name, gid, 'update', geometry=geometry)
+    return True
 
 def update_feature_status(table_name, gid, status):
     """
@@ -332,6 +776,7 @@ def update_feature_status(table_name, gid, status):
             updated = result.rowcount > 0
             if updated:
                 print(f"[DEBUG] 更新表 {table_name} 记录 {gid} 状态为 {status}")
+                notify_write(table_name, gid, 'status', status=status)
             return updated
     except Exception as e:
         print(f"[错误] 更新状态失败: {e}")
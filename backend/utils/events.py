@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+要素变更事件推送（/api/events，Server-Sent Events）
+
+通过API写入的数据提交后（见 backend.utils.db.notify_write）发布一条紧凑事件:
+    {"layer": "villages", "gid": 12, "op": "insert|update|status", "status": 0, "geometry": {...}}
+geometry 只在插入/更新时附带（订阅时通过 geometry=1 选择是否接收）。
+
+两种消息代理（EVENTS_CONFIG['broker']）:
+    local    进程内分发，单进程部署时使用（默认）
+    postgres 通过 PostgreSQL LISTEN/NOTIFY 在多个工作进程间分发；每个进程一个监听线程，
+             收到通知后再分发给本进程的订阅者。NOTIFY 负载上限约 8000 字节，超出时去掉 geometry。
+"""
+
+import itertools
+import json
+import queue
+import select
+import threading
+import time
+
+from backend.config import EVENTS_CONFIG, get_database_url
+from backend.utils.db import add_write_listener, get_engine
+
+# NOTIFY 负载上限（PostgreSQL 默认 8000 字节，留出余量）
+NOTIFY_MAX_BYTES = 7900
+
+
+class LocalBroker:
+    """进程内事件代理：每个订阅者一个有界队列，队列满时丢弃最旧的事件"""
+
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        """订阅事件，返回队列（元素为 (事件编号, 事件)）"""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        """取消订阅"""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def dispatch(self, event):
+        """把事件分发给本进程的所有订阅者"""
+        item = (next(self._ids), event)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            while True:
+                try:
+                    q.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def publish(self, event):
+        """发布事件"""
+        self.dispatch(event)
+
+
+class PostgresBroker(LocalBroker):
+    """PostgreSQL LISTEN/NOTIFY 事件代理（多工作进程部署时使用）"""
+
+    def __init__(self, channel, queue_size=1000):
+        super().__init__(queue_size)
+        self.channel = channel
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self):
+        self._ensure_listener()
+        return super().subscribe()
+
+    def publish(self, event):
+        """通过 pg_notify 发布（本进程的订阅者同样经由监听线程收到）"""
+        payload = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+        if len(payload.encode('utf-8')) > NOTIFY_MAX_BYTES and 'geometry' in event:
+            event = {k: v for k, v in event.items() if k != 'geometry'}
+            event['geometry_omitted'] = True
+            payload = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+        from sqlalchemy import text
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {'channel': self.channel, 'payload': payload})
+            conn.commit()
+
+    def _ensure_listener(self):
+        """首次订阅时启动监听线程"""
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='pg-event-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        """监听线程：断线后自动重连"""
+        import psycopg2
+        import psycopg2.extensions
+
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(get_database_url())
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                print(f"[DEBUG] 事件监听已启动: LISTEN {self.channel}")
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self.dispatch(json.loads(notify.payload))
+                        except ValueError as e:
+                            print(f"[WARN] 无法解析事件通知: {e}")
+            except Exception as e:
+                print(f"[WARN] 事件监听连接中断，5 秒后重连: {e}")
+                time.sleep(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """获取事件代理（按 EVENTS_CONFIG 创建，单例）"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            queue_size = EVENTS_CONFIG.get('queue_size', 1000)
+            if EVENTS_CONFIG.get('broker') == 'postgres':
+                _broker = PostgresBroker(EVENTS_CONFIG.get('channel', 'feature_events'), queue_size)
+            else:
+                _broker = LocalBroker(queue_size)
+    return _broker
+
+
+def build_event(event):
+    """把写入监听器收到的事件转换为可序列化的紧凑事件"""
+    result = {'layer': event['layer'], 'gid': event['gid'], 'op': event['op']}
+    if 'status' in event:
+        result['status'] = event['status']
+    geometry = event.get('geometry')
+    if geometry is not None and EVENTS_CONFIG.get('include_geometry', True):
+        from shapely.geometry import mapping
+        result['geometry'] = mapping(geometry)
+    return result
+
+
+def publish_change(event):
+    """写入监听器：发布变更事件（未启用时忽略）"""
+    if not EVENTS_CONFIG.get('enabled', True):
+        return
+    get_broker().publish(build_event(event))
+
+
+def format_sse(event_id, event, with_geometry=False):
+    """格式化为 SSE 消息（不需要几何时去掉 geometry）"""
+    if not with_geometry and 'geometry' in event:
+        event = {k: v for k, v in event.items() if k != 'geometry'}
+    data = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event_id}\nevent: change\ndata: {data}\n\n"
+
+
+def stream_events(layers=None, with_geometry=False):
+    """
+    SSE 消息生成器（客户端断开时由 Flask 关闭生成器并取消订阅）
+
+    参数:
+        layers: 只推送这些图层的事件（None 表示全部）
+        with_geometry: 是否附带几何
+    """
+    broker = get_broker()
+    q = broker.subscribe()
+    keepalive = EVENTS_CONFIG.get('keepalive_seconds', 15)
+    try:
+        yield f"retry: {EVENTS_CONFIG.get('retry_ms', 3000)}\n\n"
+        while True:
+            try:
+                event_id, event = q.get(timeout=keepalive)
+            except queue.Empty:
+                # 注释行保持连接，防止代理超时断开
+                yield ": keepalive\n\n"
+                continue
+            if layers and event.get('layer') not in layers:
+                continue
+            yield format_sse(event_id, event, with_geometry)
+    finally:
+        broker.unsubscribe(q)
+
+
+add_write_listener(publish_change)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+图层导出：GeoParquet / FlatGeobuf / GeoPackage 文件与离线数据包
+
+格式:
+    parquet  GeoParquet（列式存储，zstd 压缩，需安装 pyarrow），适合分析与 DuckDB / QGIS 3.30+
+    fgb      FlatGeobuf（带打包 R 树空间索引，可按范围读取部分要素），适合平板端离线浏览
+    gpkg     GeoPackage（SQLite，带 R 树空间索引），QGIS / ArcGIS / 移动端通用
+导出文件缓存在 EXPORT_CONFIG['cache_dir'] 中，文件名包含图层版本（rev 最大值与行数）；
+数据未变化时直接返回已生成的文件，变化后重新生成并删除旧版本。文件先写入临时文件再原子替换，
+并发请求不会读到写了一半的文件。未启用变更跟踪的表无法判断版本，每次重新生成。
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from pathlib import Path
+
+from sqlalchemy import text
+
+from backend.config import EXPORT_CONFIG, LAYER_TABLES
+from backend.utils.changes import REV_COLUMN
+from backend.utils.db import get_current_rev, get_engine, get_table_columns, read_postgis_table
+from backend.utils.metrics import record_cache, timed
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+EXPORT_FORMATS = {
+    'parquet': {'title': 'GeoParquet', 'extension': 'parquet', 'mimetype': 'application/vnd.apache.parquet'},
+    'fgb': {'title': 'FlatGeobuf', 'extension': 'fgb', 'mimetype': 'application/flatgeobuf',
+            'driver': 'FlatGeobuf'},
+    'gpkg': {'title': 'GeoPackage', 'extension': 'gpkg', 'mimetype': 'application/geopackage+sqlite3',
+             'driver': 'GPKG'},
+}
+
+
+class ExportFormatUnavailable(RuntimeError):
+    """导出格式所需的依赖未安装"""
+
+
+def parse_format(value):
+    """
+    校验导出格式
+
+    异常:
+        ValueError: 格式未知
+        ExportFormatUnavailable: parquet 格式但未安装 pyarrow
+    """
+    if value not in EXPORT_FORMATS:
+        raise ValueError(f"无效的 format: {value}（可选: {', '.join(EXPORT_FORMATS)}）")
+    if value == 'parquet':
+        import importlib.util
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ExportFormatUnavailable('导出 GeoParquet 需要安装 pyarrow（pip install pyarrow）')
+    return value
+
+
+def layer_version(conn, table_name):
+    """
+    图层数据版本（rev 最大值与行数，任何写入或删除都会改变）
+
+    返回:
+        str 如 'r1042-n56'；表未启用变更跟踪时返回 None
+    """
+    if REV_COLUMN not in get_table_columns(table_name, conn=conn):
+        return None
+    max_rev, count = conn.execute(text(f'SELECT max({REV_COLUMN}), count(*) FROM {table_name}')).one()
+    return f'r{max_rev or 0}-n{count}'
+
+
+def _read_layer(table_name, srid=None):
+    gdf = read_postgis_table(table_name, srid=srid)
+    if gdf is None:
+        raise RuntimeError(f'读取表 {table_name} 失败')
+    return gdf
+
+
+def write_layer(gdf, path, fmt, table_name):
+    """
+    把 GeoDataFrame 写入导出文件（FlatGeobuf / GeoPackage 由 GDAL 默认建立空间索引）
+
+    参数:
+        gdf: GeoDataFrame
+        path: 输出文件路径
+        fmt: 导出格式
+        table_name: 图层名（GeoPackage 中的图层名）
+    """
+    with timed('export'):
+        if fmt == 'parquet':
+            gdf.to_parquet(path, compression=EXPORT_CONFIG['parquet_compression'], index=False)
+        else:
+            gdf.to_file(path, driver=EXPORT_FORMATS[fmt]['driver'], layer=table_name)
+
+
+def _temporary_path(path):
+    """同目录下的临时文件（保留扩展名，GDAL 按扩展名检查格式）"""
+    return path.with_name(f'.tmp-{os.getpid()}-{threading.get_ident()}-{path.name}')
+
+
+def export_layer(table_name, fmt, srid=None):
+    """
+    导出图层为文件（版本未变化时返回缓存的文件）
+
+    参数:
+        table_name: 表名
+        fmt: 导出格式（parquet / fgb / gpkg）
+        srid: 输出坐标系的 EPSG 代码（None 表示 4326）
+
+    返回:
+        dict: {'path': 文件路径, 'version': 图层版本或 None, 'cached': 是否命中缓存}
+    """
+    extension = EXPORT_FORMATS[fmt]['extension']
+    directory = PROJECT_ROOT / EXPORT_CONFIG['cache_dir'] / f'epsg{srid or 4326}'
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with get_engine().connect() as conn:
+        version = layer_version(conn, table_name)
+    path = directory / f"{table_name}-{version or 'latest'}.{extension}"
+    if version is not None and path.exists():
+        record_cache('export', True)
+        return {'path': path, 'version': version, 'cached': True}
+    record_cache('export', False)
+
+    gdf = _read_layer(table_name, srid)
+    temporary = _temporary_path(path)
+    try:
+        write_layer(gdf, temporary, fmt, table_name)
+        os.replace(temporary, path)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+    print(f"[DEBUG] 导出 {table_name} ({fmt}): {len(gdf)} 个要素, {path.stat().st_size} 字节, 版本 {version}")
+
+    # 删除同一图层的旧版本（正在被其他请求读取的文件在 Windows 上删除失败时保留）
+    for old in directory.glob(f'{table_name}-*.{extension}'):
+        if old != path:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    return {'path': path, 'version': version, 'cached': False}
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_bundle(tables=None, formats=None, srid=None, output_dir=None, version=None, archive=True):
+    """
+    生成离线数据包：<output_dir>/<版本>/ 下每个图层每种格式一个文件，加 manifest.json（可选打包为 zip）
+
+    每个图层只从数据库读取一次，再依次写出各格式。
+
+    参数:
+        tables: 表名列表（None 为全部图层）
+        formats: 格式列表（None 使用 EXPORT_CONFIG['bundle_formats']，未安装 pyarrow 时跳过 parquet）
+        srid: 输出坐标系的 EPSG 代码（None 表示 4326）
+        output_dir: 输出目录（None 使用 EXPORT_CONFIG['bundle_dir']）
+        version: 数据包版本（None 时为 日期-r全局rev，如 20240601-r1042）
+        archive: 是否同时生成 <版本>.zip
+
+    返回:
+        dict: manifest 内容（另含 'path' 与 'archive'）
+
+    异常:
+        ValueError: 图层或格式无效
+        ExportFormatUnavailable: 显式指定了 parquet 但未安装 pyarrow
+    """
+    tables = tables or list(LAYER_TABLES)
+    unknown = [name for name in tables if name not in LAYER_TABLES]
+    if unknown:
+        raise ValueError(f"未知图层: {', '.join(unknown)}（可选: {', '.join(LAYER_TABLES)}）")
+    if formats is None:
+        formats = []
+        for fmt in EXPORT_CONFIG['bundle_formats']:
+            try:
+                formats.append(parse_format(fmt))
+            except ExportFormatUnavailable as e:
+                print(f"[WARN] 跳过 {fmt}: {e}")
+    else:
+        formats = [parse_format(fmt) for fmt in formats]
+
+    rev = get_current_rev()
+    created_at = datetime.datetime.now().astimezone()
+    version = version or f"{created_at:%Y%m%d}-r{rev}"
+    bundle_dir = Path(output_dir or PROJECT_ROOT / EXPORT_CONFIG['bundle_dir']) / version
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        'version': version,
+        'created_at': created_at.isoformat(timespec='seconds'),
+        'rev': rev,
+        'srid': srid or 4326,
+        'layers': {},
+    }
+    for table_name in tables:
+        gdf = _read_layer(table_name, srid)
+        files = {}
+        for fmt in formats:
+            path = bundle_dir / f"{table_name}.{EXPORT_FORMATS[fmt]['extension']}"
+            if path.exists():
+                path.unlink()
+            write_layer(gdf, path, fmt, table_name)
+            files[fmt] = {'file': path.name, 'bytes': path.stat().st_size, 'sha256': _sha256(path)}
+            print(f"[OK] {table_name} -> {path.name}: {files[fmt]['bytes']} 字节")
+        manifest['layers'][table_name] = {
+            'title': LAYER_TABLES[table_name]['title'],
+            'geometry_type': LAYER_TABLES[table_name]['geometry_type'],
+            'features': len(gdf),
+            'files': files,
+        }
+
+    with open(bundle_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    archive_path = None
+    if archive:
+        archive_path = bundle_dir.parent / f'{version}.zip'
+        with zipfile.ZipFile(archive_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for path in sorted(bundle_dir.iterdir()):
+                zf.write(path, f'{version}/{path.name}')
+        print(f"[OK] 离线数据包: {archive_path} ({archive_path.stat().st_size} 字节)")
+    return {**manifest, 'path': str(bundle_dir), 'archive': str(archive_path) if archive_path else None}
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+轻量要素记录：API 读写要素时不构建 GeoDataFrame
+
+读取时几何由 PostGIS 直接输出为 GeoJSON 文本（ST_AsGeoJSON），每个要素只保存 gid、属性字典和几何文本，
+序列化时几何文本原样拼接进响应，不再解析；写入时只用 shapely 解析单个几何，按需修复和转换坐标系。
+geopandas / pandas 只用于导入和分析（read_postgis_table）。
+"""
+
+import datetime
+import decimal
+import json
+
+from flask import Response
+
+from backend.utils.geojson import crs_member
+from backend.utils.metrics import timed
+
+# ST_AsGeoJSON 输出的最大小数位数（与 GeoDataFrame.to_json 的精度相当）
+GEOJSON_MAX_DECIMALS = 15
+
+
+def _json_value(value):
+    """把数据库驱动返回的 Decimal / 日期时间转换为 JSON 值（与 GeoDataFrame.to_json 的输出一致）"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value):
+    converted = _json_value(value)
+    return str(value) if converted is value else converted
+
+
+def dumps(value):
+    """序列化为 JSON 文本（中文不转义）"""
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+class FeatureRecord:
+    """单个要素：gid、属性字典（含 gid、status 等）与 GeoJSON 几何文本（几何为空时为 None）"""
+
+    __slots__ = ('gid', 'properties', 'geometry_json')
+
+    def __init__(self, gid, properties, geometry_json=None):
+        self.gid = gid
+        self.properties = properties
+        self.geometry_json = geometry_json
+
+    @property
+    def status(self):
+        return self.properties.get('status')
+
+    def to_dict(self):
+        """GeoJSON Feature（dict）"""
+        return {
+            'type': 'Feature',
+            'id': self.gid,
+            'geometry': json.loads(self.geometry_json) if self.geometry_json else None,
+            'properties': {name: _json_value(value) for name, value in self.properties.items()},
+        }
+
+    def to_json(self):
+        """GeoJSON Feature 的 JSON 文本（几何文本直接拼接，不解析）"""
+        return (f'{{"type": "Feature", "id": {dumps(self.gid)}, "geometry": {self.geometry_json or "null"}, '
+                f'"properties": {dumps(self.properties)}}}')
+
+
+def records_from_rows(columns, rows, geom_col='geometry'):
+    """
+    由查询结果构建要素记录（几何列须为 GeoJSON 文本）
+
+    参数:
+        columns: 列名列表
+        rows: 结果行（元组）
+        geom_col: 几何列名
+
+    返回:
+        list[FeatureRecord]
+    """
+    geom_index = columns.index(geom_col)
+    property_items = [(index, name) for index, name in enumerate(columns) if index != geom_index]
+    records = []
+    for row in rows:
+        properties = {name: row[index] for index, name in property_items}
+        records.append(FeatureRecord(properties.get('gid'), properties, row[geom_index]))
+    return records
+
+
+def feature_collection(records, srid=None):
+    """
+    GeoJSON FeatureCollection（dict，用于嵌入其他响应）
+
+    参数:
+        records: 要素记录列表
+        srid: 坐标所用的 EPSG 代码（非 4326 时加入 crs 成员）
+    """
+    geojson = {'type': 'FeatureCollection', 'features': [record.to_dict() for record in records]}
+    if crs_member(srid):
+        geojson['crs'] = crs_member(srid)
+    return geojson
+
+
+def feature_collection_json(records, srid=None):
+    """GeoJSON FeatureCollection 的 JSON 文本（逐个拼接要素文本）"""
+    crs = crs_member(srid)
+    return (
+        '{"type": "FeatureCollection", "features": ['
+        + ', '.join(record.to_json() for record in records)
+        + ']' + (f', "crs": {dumps(crs)}' if crs else '') + '}'
+    )
+
+
+def feature_collection_response(records, srid=None):
+    """直接返回 FeatureCollection 文本的响应（序列化计入 jsonify 阶段）"""
+    with timed('jsonify'):
+        body = feature_collection_json(records, srid)
+    return Response(body, mimetype='application/json')
+
+
+def feature_response(record):
+    """返回单个 Feature 的响应"""
+    with timed('jsonify'):
+        body = record.to_json()
+    return Response(body, mimetype='application/json')
+
+
+def parse_geometry(geometry, srid=None):
+    """
+    解析写入请求中的 GeoJSON 几何：无效时尝试 make_valid 修复，坐标系不是 4326 时转换到存储坐标系
+
+    参数:
+        geometry: GeoJSON 几何对象
+        srid: 坐标所用的 EPSG 代码（可选）
+
+    返回:
+        shapely 几何（EPSG:4326）
+
+    异常:
+        ValueError: 几何缺失、无法解析或修复后仍无效
+    """
+    from shapely.geometry import shape
+
+    from backend.utils.crs import STORAGE_SRID, transform_geometries
+    from backend.utils.geojson import GEOMETRY_REPAIRED, GEOMETRY_VALID, validate_and_fix_geometries
+
+    if not geometry:
+        raise ValueError('要素缺少几何')
+    try:
+        geom = shape(geometry)
+    except Exception as e:
+        raise ValueError(f'无法解析几何: {e}') from e
+
+    fixed, status, reasons = validate_and_fix_geometries([geom])
+    if status[0] != GEOMETRY_VALID:
+        print(f"[WARN] Invalid geometry: {reasons[0]}")
+        if status[0] != GEOMETRY_REPAIRED:
+            raise ValueError(f"Invalid geometry: {reasons[0]}")
+        print("[INFO] Geometry repaired with make_valid")
+    geom = fixed[0]
+
+    if srid is not None and srid != STORAGE_SRID:
+        geom = transform_geometries([geom], f"EPSG:{srid}", f"EPSG:{STORAGE_SRID}")[0]
+    return geom
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+地名索引（gazetteer）：每个图层只返回 gid、名称、中心点和外包框
+
+数据来自表中维护的 centroid / bbox 列（见 MEASURE_CONFIG），按列存储为紧凑数组:
+    {"layer": "villages", "title": "村庄", "count": 2,
+     "gid": [1, 2], "name": ["张村", "李村"], "centroid": [[x, y], ...], "bbox": null}
+点图层的外包框与中心点相同，不重复输出（bbox 为 null）。
+结果序列化后缓存在进程内并计算 ETag；通过API写入数据时立即失效，其他来源的修改在 cache_seconds 后生效。
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from backend.config import INDEX_CONFIG, LAYER_TABLES
+from backend.utils.db import add_write_listener, get_table_columns, read_feature_fields
+from backend.utils.metrics import record_cache
+
+INDEX_FIELDS = ['gid', 'name', 'centroid', 'bbox']
+
+# 表名 -> {'body': bytes, 'etag': str, 'built_at': float}
+_cache = {}
+# 失效计数：表名 -> 次数（None 键为清空全部的次数）；构建期间计数变化时结果已过期，不写入缓存
+_generations = {}
+_cache_lock = threading.Lock()
+
+
+def _round_coords(values, precision):
+    """坐标按精度取整（None 原样返回）"""
+    if values is None:
+        return None
+    return [round(v, precision) for v in values]
+
+
+def build_layer_index(table_name):
+    """
+    从数据库构建单个图层的地名索引
+
+    参数:
+        table_name: 表名（LAYER_TABLES 的键）
+
+    返回:
+        dict: 按列存储的索引
+    """
+    layer = LAYER_TABLES[table_name]
+    precision = INDEX_CONFIG.get('precision', 6)
+    has_name = 'name' in get_table_columns(table_name)
+    with_bbox = layer['geometry_type'] != 'point'
+
+    fields = ['centroid'] + (['name'] if has_name else []) + (['bbox'] if with_bbox else [])
+    features = read_feature_fields(table_name, fields)['features']
+
+    properties = [feature['properties'] for feature in features]
+    return {
+        'layer': table_name,
+        'title': layer['title'],
+        'geometry_type': layer['geometry_type'],
+        'count': len(properties),
+        'fields': INDEX_FIELDS,
+        'gid': [p['gid'] for p in properties],
+        'name': [p.get('name') for p in properties] if has_name else None,
+        'centroid': [_round_coords(p['centroid'], precision) for p in properties],
+        'bbox': [_round_coords(p['bbox'], precision) for p in properties] if with_bbox else None,
+    }
+
+
+def _serialize(payload):
+    """紧凑序列化并计算 ETag"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return body, hashlib.sha1(body).hexdigest()
+
+
+def _generation(table_name):
+    """图层当前的失效计数（调用方持有 _cache_lock）"""
+    return _generations.get(None, 0), _generations.get(table_name, 0)
+
+
+def get_layer_index(table_name):
+    """
+    获取单个图层的地名索引（带进程内缓存）
+
+    返回:
+        tuple: (JSON 字节串, ETag)
+    """
+    max_age = INDEX_CONFIG.get('cache_seconds', 300)
+    with _cache_lock:
+        entry = _cache.get(table_name)
+        if entry and time.time() - entry['built_at'] < max_age:
+            record_cache('gazetteer', True)
+            return entry['body'], entry['etag']
+        generation = _generation(table_name)
+    record_cache('gazetteer', False)
+
+    started = time.perf_counter()
+    body, etag = _serialize(build_layer_index(table_name))
+    print(f"[DEBUG] 构建地名索引 {table_name}: {len(body)} 字节, 用时 {time.perf_counter() - started:.3f} 秒")
+    with _cache_lock:
+        if _generation(table_name) == generation:
+            _cache[table_name] = {'body': body, 'etag': etag, 'built_at': time.time()}
+        else:
+            print(f"[DEBUG] 地名索引 {table_name} 构建期间数据已修改，结果不缓存")
+    return body, etag
+
+
+def get_combined_index(tables=None):
+    """
+    获取多个图层的合并索引: {"layers": [图层索引, ...]}
+
+    返回:
+        tuple: (JSON 字节串, ETag)
+    """
+    tables = tables or list(LAYER_TABLES)
+    parts = [get_layer_index(table) for table in tables]
+    body = b'{"layers":[' + b','.join(part for part, _ in parts) + b']}'
+    etag = hashlib.sha1(''.join(tag for _, tag in parts).encode('ascii')).hexdigest()
+    return body, etag
+
+
+def invalidate_index(table_name=None):
+    """使地名索引缓存失效（table_name 为 None 时清空全部）"""
+    with _cache_lock:
+        _generations[table_name] = _generations.get(table_name, 0) + 1
+        if table_name is None:
+            _cache.clear()
+        else:
+            _cache.pop(table_name, None)
+
+
+def _on_write(event):
+    """数据写入后使对应图层的缓存失效"""
+    invalidate_index(event['layer'])
+
+
+add_write_listener(_on_write)
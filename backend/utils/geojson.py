@@ -1,54 +1,130 @@
 # -*- coding: utf-8 -*-
 """
 GeoJSON转换工具
+
+geopandas / shapely 在函数内导入，导入本模块时不加载。
 """
 
 import json
-import copy
-import geopandas as gpd
-from shapely.geometry import shape, mapping
-from shapely.validation import explain_validity
+from backend.utils.metrics import timed
+
+# 几何校验状态
+GEOMETRY_VALID = 'valid'
+GEOMETRY_REPAIRED = 'repaired'
+GEOMETRY_INVALID = 'invalid'
+
+# 几何类型ID -> 类型族（修复后单部件变为多部件视为同一类型，如自相交面修复为 MultiPolygon）
+_GEOMETRY_FAMILY = (0, 1, 1, 3, 0, 1, 3, 7)
+
+
+def _geometry_family(geometries):
+    import numpy as np
+    import shapely
+    type_ids = shapely.get_type_id(geometries)
+    return np.where(type_ids >= 0, np.array(_GEOMETRY_FAMILY)[np.clip(type_ids, 0, 7)], -1)
+
+
+def validate_and_fix_geometries(geometries):
+    """
+    批量校验并修复几何（shapely 2 向量化函数，整个数组一次完成）
+
+    无效几何用 make_valid(method='structure') 修复；修复结果仍有效、非空且类型族不变时采用，
+    否则标记为无效并保留原几何。有效几何原样返回，不做任何复制。
+
+    参数:
+        geometries: 几何数组（GeoSeries、list 或 numpy 数组，可包含 None）
+
+    返回:
+        (geometries, status, reasons)
+        geometries: 修复后的几何（numpy object 数组）
+        status: 每个几何的状态 'valid' / 'repaired' / 'invalid'（None 视为 valid）
+        reasons: 无效原因（is_valid_reason），有效几何为 None
+    """
+    import numpy as np
+    import shapely
+    geoms = np.asarray(geometries, dtype=object)
+    fixed = geoms.copy()
+    status = np.full(len(geoms), GEOMETRY_VALID, dtype=object)
+    reasons = np.full(len(geoms), None, dtype=object)
+
+    invalid_idx = np.flatnonzero(~(shapely.is_valid(geoms) | shapely.is_missing(geoms)))
+    if len(invalid_idx) == 0:
+        return fixed, status, reasons
+
+    invalid = geoms[invalid_idx]
+    reasons[invalid_idx] = shapely.is_valid_reason(invalid)
+    repaired = shapely.make_valid(invalid, method='structure', keep_collapsed=False)
+    ok = (shapely.is_valid(repaired) & ~shapely.is_empty(repaired)
+          & (_geometry_family(repaired) == _geometry_family(invalid)))
+    fixed[invalid_idx[ok]] = repaired[ok]
+    status[invalid_idx] = np.where(ok, GEOMETRY_REPAIRED, GEOMETRY_INVALID)
+    return fixed, status, reasons
+
+
+def validate_and_fix_gdf(gdf):
+    """
+    批量校验并修复 GeoDataFrame 的几何列（只在存在修复时替换几何列）
+
+    返回:
+        (gdf, status, reasons)，status/reasons 与 validate_and_fix_geometries 相同
+    """
+    fixed, status, reasons = validate_and_fix_geometries(gdf.geometry.values)
+    if (status == GEOMETRY_REPAIRED).any():
+        import geopandas as gpd
+        gdf = gdf.set_geometry(gpd.GeoSeries(fixed, index=gdf.index, crs=gdf.crs), crs=gdf.crs)
+    return gdf, status, reasons
 
 
 def validate_and_fix_geometry(feature):
     """
-    Validate geometry; if invalid, try buffer(0) to fix minor self-intersection.
-    Raises ValueError with explain_validity if still invalid after fix attempt.
+    Validate geometry; if invalid, try make_valid to fix self-intersection etc.
+    Raises ValueError with the validity reason if still invalid after fix attempt.
     """
     if not feature or 'geometry' not in feature:
         return feature
+    from shapely.geometry import mapping, shape
     geom = shape(feature['geometry'])
-    if geom.is_valid:
+    fixed, status, reasons = validate_and_fix_geometries([geom])
+    if status[0] == GEOMETRY_VALID:
         return feature
-    reason = explain_validity(geom)
-    print(f"[WARN] Invalid geometry: {reason}")
-    try:
-        geom_fixed = geom.buffer(0)
-        if geom_fixed.is_valid and not geom_fixed.is_empty and geom_fixed.geom_type == geom.geom_type:
-            feature = copy.deepcopy(feature)
-            feature['geometry'] = mapping(geom_fixed)
-            print("[INFO] Geometry repaired with buffer(0)")
-            return feature
-    except Exception as e:
-        print(f"[WARN] buffer(0) repair failed: {e}")
-    raise ValueError(f"Invalid geometry: {reason}")
-
-
-def gdf_to_geojson(gdf):
+    print(f"[WARN] Invalid geometry: {reasons[0]}")
+    if status[0] == GEOMETRY_REPAIRED:
+        print("[INFO] Geometry repaired with make_valid")
+        return {**feature, 'geometry': mapping(fixed[0])}
+    raise ValueError(f"Invalid geometry: {reasons[0]}")
+
+
+def crs_member(srid):
+    """
+    GeoJSON 的 crs 成员（坐标不是 WGS84 时告知客户端坐标系，见 GeoJSON 2008 规范）
+
+    返回:
+        dict 或 None（WGS84 不需要 crs 成员）
+    """
+    if srid is None or srid == 4326:
+        return None
+    return {'type': 'name', 'properties': {'name': f'urn:ogc:def:crs:EPSG::{srid}'}}
+
+
+def gdf_to_geojson(gdf, srid=None):
     """
     将GeoDataFrame转换为GeoJSON格式
     
     参数:
         gdf: GeoDataFrame对象
+        srid: 坐标所用的 EPSG 代码（非 4326 时在结果中加入 crs 成员）
     
     返回:
         dict: GeoJSON FeatureCollection对象
     """
     if gdf is None or gdf.empty:
-        return {
+        geojson = {
             'type': 'FeatureCollection',
             'features': []
         }
+        if crs_member(srid):
+            geojson['crs'] = crs_member(srid)
+        return geojson
     
     # 调试：输出转换前的坐标（从数据库读取后）
     if 'geometry' in gdf.columns and not gdf.empty:
@@ -58,8 +134,12 @@ def gdf_to_geojson(gdf):
                 print(f"[DEBUG] gdf_to_geojson: 转换前的坐标 - 经度: {first_geom.x}, 纬度: {first_geom.y}")
     
     # 使用GeoPandas的to_json方法
-    geojson_str = gdf.to_json()
-    geojson = json.loads(geojson_str)
+    with timed('to_json'):
+        geojson_str = gdf.to_json()
+    with timed('loads'):
+        geojson = json.loads(geojson_str)
+    if crs_member(srid):
+        geojson['crs'] = crs_member(srid)
     
     # 调试：输出转换后的坐标（返回给前端前）
     if geojson.get('features') and len(geojson['features']) > 0:
@@ -75,23 +155,38 @@ def gdf_to_geojson(gdf):
     
     return geojson
 
-def geojson_to_gdf(geojson_data):
+def geojson_to_gdf(geojson_data, validate=True):
     """
     将GeoJSON转换为GeoDataFrame
     
     参数:
         geojson_data: GeoJSON FeatureCollection对象（dict）
+        validate: 是否批量校验并修复几何（无法修复时抛出 ValueError）
     
     返回:
         GeoDataFrame对象
     """
+    import geopandas as gpd
+    import numpy as np
     if isinstance(geojson_data, str):
         geojson_data = json.loads(geojson_data)
     
-    return gpd.GeoDataFrame.from_features(
+    gdf = gpd.GeoDataFrame.from_features(
         geojson_data.get('features', []),
         crs='EPSG:4326'
     )
+    if not validate or gdf.empty:
+        return gdf
+    
+    gdf, status, reasons = validate_and_fix_gdf(gdf)
+    invalid = np.flatnonzero(status == GEOMETRY_INVALID)
+    if len(invalid):
+        details = ', '.join(f"#{i}: {reasons[i]}" for i in invalid[:5])
+        raise ValueError(f"{len(invalid)} 个要素的几何无效且无法修复（{details}）")
+    repaired = int((status == GEOMETRY_REPAIRED).sum())
+    if repaired:
+        print(f"[INFO] geojson_to_gdf: 修复了 {repaired} 个无效几何")
+    return gdf
 
 def feature_to_gdf(feature, crs='EPSG:4326'):
     """
@@ -126,6 +221,7 @@ def feature_to_gdf(feature, crs='EPSG:4326'):
     # 它能够正确处理 GeoJSON Feature 格式
     features = [feature] if feature.get('type') == 'Feature' else [{'type': 'Feature', **feature}]
     
+    import geopandas as gpd
     gdf = gpd.GeoDataFrame.from_features(features, crs=crs)
     
     # 调试：输出转换后的坐标（Point 用 .x/.y，LineString 用 .coords，Polygon 用 .exterior.coords）
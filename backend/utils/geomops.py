@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+批量几何运算：对一批几何依次执行操作流水线（shapely 2 向量化函数，整批一次完成）
+
+请求示例:
+    {"geometries": [GeoJSON几何, ...],              # 或 "source": {"layer": "rivers", "gids": [3]}
+     "operations": [{"op": "buffer", "distance": 500},
+                    {"op": "clip", "layer": "water_bodies", "gids": [12]},
+                    {"op": "simplify", "tolerance": 5}]}
+操作:
+    buffer      缓冲区（distance 米，可选 quad_segs 1..max_quad_segs、cap_style=round|flat|square、join_style=round|mitre|bevel）
+    simplify    简化（tolerance 米，preserve_topology 默认 true）
+    union       合并为一个几何（结果只有一个）
+    clip        与裁剪几何求交（geometry 为 GeoJSON，或 layer + gids 取图层要素）
+    difference  减去裁剪几何（参数同 clip）
+含距离参数的操作（buffer / simplify）在批次中心所在的 UTM 投影带中计算，结果转换回输入坐标系。
+输入几何数、顶点数和操作数有上限，每个操作完成后检查耗时预算（单个操作本身无法中断）。
+结果中的空几何（裁剪后没有剩余、负缓冲距离把面缩没）输出为 null。
+"""
+
+import math
+import time
+
+from backend.config import GEOM_OPS_CONFIG, LAYER_TABLES
+from backend.utils.crs import STORAGE_SRID, transform_geometries, utm_crs
+from backend.utils.metrics import timed
+
+OPERATIONS = ('buffer', 'simplify', 'union', 'clip', 'difference')
+
+# 参数单位为米、需要在投影坐标系中计算的操作
+METRIC_OPERATIONS = ('buffer', 'simplify')
+
+CAP_STYLES = ('round', 'flat', 'square')
+JOIN_STYLES = ('round', 'mitre', 'bevel')
+
+
+class GeometryLimitExceeded(ValueError):
+    """输入或中间结果超过大小限制"""
+
+
+class OperationBudgetExceeded(RuntimeError):
+    """运算耗时超过预算"""
+
+
+def _parse_geometries(items, srid, name='geometries'):
+    """GeoJSON 几何列表 -> shapely 几何数组（EPSG:4326），无效几何尝试修复"""
+    import numpy as np
+    from shapely.geometry import shape
+
+    from backend.utils.geojson import GEOMETRY_INVALID, validate_and_fix_geometries
+
+    if not isinstance(items, list) or not items:
+        raise ValueError(f'{name} 应为非空的 GeoJSON 几何数组')
+    geometries = np.empty(len(items), dtype=object)
+    for index, item in enumerate(items):
+        try:
+            geometries[index] = shape(item)
+        except Exception as e:
+            raise ValueError(f'{name}[{index}] 无法解析: {e}') from e
+    fixed, status, reasons = validate_and_fix_geometries(geometries)
+    invalid = np.flatnonzero(status == GEOMETRY_INVALID)
+    if len(invalid):
+        raise ValueError(f'{name}[{invalid[0]}] 几何无效: {reasons[invalid[0]]}')
+    if srid is not None and srid != STORAGE_SRID:
+        fixed = transform_geometries(fixed, f"EPSG:{srid}", f"EPSG:{STORAGE_SRID}")
+    return fixed
+
+
+def layer_geometries(table_name, gids):
+    """
+    读取图层要素的几何（EPSG:4326，有内存快照时不访问数据库）
+
+    返回:
+        numpy 几何数组（与 gids 顺序相同）
+
+    异常:
+        ValueError: 图层未知或要素不存在
+        GeometryLimitExceeded: gid 数超过 max_geometries（在读取之前检查）
+    """
+    import numpy as np
+
+    from backend.utils.snapshot import get_snapshot
+
+    if table_name not in LAYER_TABLES:
+        raise ValueError(f"无效的图层: {table_name}（可选: {', '.join(LAYER_TABLES)}）")
+    if not isinstance(gids, list):
+        raise ValueError(f'gids 应为数组: {gids}')
+    if len(gids) > GEOM_OPS_CONFIG['max_geometries']:
+        raise GeometryLimitExceeded(f"gids 过多: {len(gids)}（上限 {GEOM_OPS_CONFIG['max_geometries']}）")
+    try:
+        gids = [int(gid) for gid in gids]
+    except (TypeError, ValueError):
+        raise ValueError(f'无效的 gids: {gids}')
+    if not gids:
+        raise ValueError('gids 不能为空')
+
+    snapshot = get_snapshot(table_name)
+    if snapshot is not None:
+        mask = np.isin(snapshot.gids, gids)
+        found = dict(zip(snapshot.gids[mask].tolist(), snapshot.geometries[mask]))
+    else:
+        import shapely
+        from sqlalchemy import text
+
+        from backend.utils.db import get_engine
+        with timed('sql'):
+            with get_engine().connect() as conn:
+                rows = conn.execute(
+                    text(f'SELECT gid, "geometry" FROM {table_name} WHERE status = 1 AND gid = ANY(:gids)'),
+                    {'gids': gids}
+                ).fetchall()
+        found = {gid: geometry for gid, geometry in zip(
+            [row[0] for row in rows], shapely.from_wkb(np.array([row[1] for row in rows], dtype=object)))}
+
+    missing = [gid for gid in gids if gid not in found]
+    if missing:
+        raise ValueError(f"{table_name} 中不存在要素: {', '.join(map(str, missing))}")
+    return np.array([found[gid] for gid in gids], dtype=object)
+
+
+def _check_size(geometries, stage):
+    import shapely
+    vertices = int(shapely.get_num_coordinates(geometries).sum())
+    if vertices > GEOM_OPS_CONFIG['max_vertices']:
+        raise GeometryLimitExceeded(
+            f"{stage}的顶点数 {vertices} 超过上限 {GEOM_OPS_CONFIG['max_vertices']}")
+    return vertices
+
+
+def _operand(operation, srid, work_crs):
+    """clip / difference 的裁剪几何（合并为一个，转换到计算坐标系）"""
+    import shapely
+    if operation.get('geometry'):
+        geometries = _parse_geometries([operation['geometry']], srid, 'geometry')
+    elif operation.get('layer'):
+        geometries = layer_geometries(operation['layer'], operation.get('gids') or [])
+    else:
+        raise ValueError(f"{operation['op']} 需要 geometry 或 layer + gids")
+    _check_size(geometries, f"{operation['op']} 裁剪几何")
+    if work_crs != f"EPSG:{STORAGE_SRID}":
+        geometries = transform_geometries(geometries, f"EPSG:{STORAGE_SRID}", work_crs)
+    return shapely.union_all(geometries)
+
+
+def _number(operation, key, default=None, minimum=0.0, maximum=None):
+    value = operation.get(key, default)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{operation['op']} 的 {key} 应为数字")
+    if not math.isfinite(value):
+        raise ValueError(f"{operation['op']} 的 {key} 应为有限的数字")
+    if value < minimum or (maximum is not None and value > maximum):
+        limits = f"在 {minimum} 到 {maximum} 之间" if maximum is not None else f"不小于 {minimum}"
+        raise ValueError(f"{operation['op']} 的 {key} 应{limits}")
+    return value
+
+
+def validate_operations(operations):
+    """
+    校验操作列表
+
+    异常:
+        ValueError: 操作未知、参数无效或操作过多
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations 应为非空数组')
+    if len(operations) > GEOM_OPS_CONFIG['max_operations']:
+        raise ValueError(f"操作过多: {len(operations)}（上限 {GEOM_OPS_CONFIG['max_operations']}）")
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            raise ValueError(f"无效的操作: {operation}（可选: {', '.join(OPERATIONS)}）")
+        if operation['op'] == 'buffer':
+            _number(operation, 'distance', maximum=GEOM_OPS_CONFIG['max_buffer_distance'],
+                    minimum=-GEOM_OPS_CONFIG['max_buffer_distance'])
+            quad_segs = _number(operation, 'quad_segs', 8, minimum=1, maximum=GEOM_OPS_CONFIG['max_quad_segs'])
+            if quad_segs != int(quad_segs):
+                raise ValueError('buffer 的 quad_segs 应为整数')
+            if operation.get('cap_style', 'round') not in CAP_STYLES:
+                raise ValueError(f"无效的 cap_style（可选: {', '.join(CAP_STYLES)}）")
+            if operation.get('join_style', 'round') not in JOIN_STYLES:
+                raise ValueError(f"无效的 join_style（可选: {', '.join(JOIN_STYLES)}）")
+        elif operation['op'] == 'simplify':
+            _number(operation, 'tolerance')
+
+
+def run_operations(geometries, operations, srid=None):
+    """
+    执行操作流水线
+
+    参数:
+        geometries: GeoJSON 几何列表，或 {'layer': 表名, 'gids': [...]}（取图层要素）
+        operations: 操作列表（见模块说明）
+        srid: 输入几何与结果的坐标系（None 表示 4326）
+
+    返回:
+        dict: {'geometries': GeoJSON 文本列表, 'timings_ms': {序号:操作: 毫秒}, 'vertices': 结果顶点数}
+
+    异常:
+        ValueError: 参数无效（GeometryLimitExceeded: 超过大小限制）
+        OperationBudgetExceeded: 超过耗时预算
+    """
+    import numpy as np
+    import shapely
+
+    validate_operations(operations)
+    started = time.perf_counter()
+    budget = GEOM_OPS_CONFIG['budget_ms'] / 1000
+
+    if isinstance(geometries, dict):
+        source = layer_geometries(geometries.get('layer'), geometries.get('gids') or [])
+    else:
+        if isinstance(geometries, list) and len(geometries) > GEOM_OPS_CONFIG['max_geometries']:
+            raise GeometryLimitExceeded(
+                f"几何过多: {len(geometries)}（上限 {GEOM_OPS_CONFIG['max_geometries']}）")
+        source = _parse_geometries(geometries, srid)
+    _check_size(source, '输入')
+
+    storage_crs = f"EPSG:{STORAGE_SRID}"
+    output_crs = f"EPSG:{srid}" if srid is not None else storage_crs
+    metric = any(operation['op'] in METRIC_OPERATIONS for operation in operations)
+    work_crs = utm_crs(source) if metric else storage_crs
+    current = source if work_crs == storage_crs else transform_geometries(source, storage_crs, work_crs)
+
+    timings = {}
+    for index, operation in enumerate(operations):
+        op = operation['op']
+        op_started = time.perf_counter()
+        with timed('geom_ops'):
+            if op == 'buffer':
+                current = shapely.buffer(
+                    current, float(operation['distance']),
+                    quad_segs=int(_number(operation, 'quad_segs', 8)),
+                    cap_style=operation.get('cap_style', 'round'), join_style=operation.get('join_style', 'round'),
+                )
+            elif op == 'simplify':
+                current = shapely.simplify(current, _number(operation, 'tolerance'),
+                                           preserve_topology=bool(operation.get('preserve_topology', True)))
+            elif op == 'union':
+                current = np.array([shapely.union_all(current)], dtype=object)
+            elif op == 'clip':
+                current = shapely.intersection(current, _operand(operation, srid, work_crs))
+            elif op == 'difference':
+                current = shapely.difference(current, _operand(operation, srid, work_crs))
+        timings[f'{index}:{op}'] = round((time.perf_counter() - op_started) * 1000, 3)
+        _check_size(current, f'第 {index + 1} 步（{op}）结果')
+        if time.perf_counter() - started > budget:
+            raise OperationBudgetExceeded(
+                f"运算超过耗时预算 {GEOM_OPS_CONFIG['budget_ms']} ms（已完成 {index + 1}/{len(operations)} 步）")
+
+    if work_crs != output_crs:
+        current = transform_geometries(current, work_crs, output_crs)
+    # 空几何的 GeoJSON（如 {"type":"Polygon","coordinates":[[]]}）不合法，输出为 null
+    current = np.where(shapely.is_empty(current), None, current)
+    return {
+        'geometries': shapely.to_geojson(current).tolist(),
+        'timings_ms': timings,
+        'vertices': int(shapely.get_num_coordinates(current).sum()),
+    }
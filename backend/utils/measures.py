@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+派生量测列工具
+
+面积、长度、中心点和外包框存储在表的额外列中（见 MEASURE_CONFIG），写入时由数据库同步计算，
+查询时可通过 fields 参数只返回这些值而不返回完整几何。面积/长度按椭球面（geography）计算。
+"""
+
+from backend.config import MEASURE_CONFIG
+from backend.utils.crs import STORAGE_SRID
+
+# 量测字段 -> [(列名, 列类型, SQL表达式模板)]，{geom} 为源几何表达式
+MEASURE_FIELDS = {
+    'area': [('area_m2', 'double precision', 'ST_Area({geom}::geography)')],
+    'length': [(
+        'length_m', 'double precision',
+        'CASE WHEN ST_Dimension({geom}) = 2 THEN ST_Perimeter({geom}::geography) '
+        'ELSE ST_Length({geom}::geography) END'
+    )],
+    'centroid': [('centroid', f'geometry(Point, {STORAGE_SRID})', 'ST_Centroid({geom})')],
+    'bbox': [
+        ('bbox_minx', 'double precision', 'ST_XMin({geom})'),
+        ('bbox_miny', 'double precision', 'ST_YMin({geom})'),
+        ('bbox_maxx', 'double precision', 'ST_XMax({geom})'),
+        ('bbox_maxy', 'double precision', 'ST_YMax({geom})'),
+    ],
+}
+
+# fields 参数允许的别名
+FIELD_ALIASES = {'area_m2': 'area', 'length_m': 'length', 'center': 'centroid', 'extent': 'bbox'}
+
+
+def get_measure_fields(table_name):
+    """获取表维护的量测字段（见 MEASURE_CONFIG）"""
+    return [field for field in MEASURE_CONFIG.get(table_name, []) if field in MEASURE_FIELDS]
+
+
+def get_measure_column_types(table_name=None):
+    """
+    获取量测列定义
+
+    参数:
+        table_name: 表名（None 时返回所有字段的列）
+
+    返回:
+        list: [(列名, 列类型)]
+    """
+    fields = MEASURE_FIELDS if table_name is None else get_measure_fields(table_name)
+    return [(col, col_type) for field in fields for col, col_type, _ in MEASURE_FIELDS[field]]
+
+
+def get_measure_columns(table_name=None):
+    """获取量测列名列表（table_name为None时返回所有量测列）"""
+    return [col for col, _ in get_measure_column_types(table_name)]
+
+
+def measure_sql_expressions(table_name, geom_expr='geometry'):
+    """
+    生成维护量测列的SQL表达式
+
+    参数:
+        table_name: 表名
+        geom_expr: 源几何的SQL表达式
+
+    返回:
+        dict: {列名: SQL表达式}
+    """
+    return {
+        col: template.format(geom=geom_expr)
+        for field in get_measure_fields(table_name)
+        for col, _, template in MEASURE_FIELDS[field]
+    }
+
+
+def parse_fields_arg(args):
+    """
+    解析 fields 参数（逗号分隔），如 fields=centroid,area,name
+
+    返回:
+        list: 规范化后的字段名（量测字段使用标准名称，其余视为属性列）；未指定时返回None
+
+    异常:
+        ValueError: 字段名格式错误
+    """
+    value = args.get('fields')
+    if not value:
+        return None
+    fields = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if not name.replace('_', '').isalnum():
+            raise ValueError(f'无效的字段名: {name}')
+        name = FIELD_ALIASES.get(name, name)
+        if name not in fields:
+            fields.append(name)
+    if not fields:
+        raise ValueError('fields参数不能为空')
+    return fields
+
+
+def measure_select_items(field, table_columns, geom_col='geometry', srid=None):
+    """
+    生成查询单个量测字段的SELECT项（表中没有对应列时直接由几何计算）
+
+    参数:
+        field: 量测字段名（MEASURE_FIELDS 的键）
+        table_columns: 表的列名列表
+        geom_col: 几何列名
+        srid: 输出坐标系（centroid、bbox 需要转换时）
+
+    返回:
+        list: SELECT项（别名与列名相同，centroid 拆分为 centroid_x / centroid_y）
+    """
+    expressions = {}
+    for col, _, template in MEASURE_FIELDS[field]:
+        computed = template.format(geom=f'"{geom_col}"')
+        expressions[col] = f'COALESCE("{col}", {computed})' if col in table_columns else computed
+
+    transform = srid is not None and srid != STORAGE_SRID
+    if field == 'centroid':
+        point = expressions['centroid']
+        if transform:
+            point = f'ST_Transform({point}, {int(srid)})'
+        return [f'ST_X({point}) AS centroid_x', f'ST_Y({point}) AS centroid_y']
+    if field == 'bbox' and transform:
+        envelope = (f"ST_Transform(ST_MakeEnvelope({expressions['bbox_minx']}, {expressions['bbox_miny']}, "
+                    f"{expressions['bbox_maxx']}, {expressions['bbox_maxy']}, {STORAGE_SRID}), {int(srid)})")
+        return [f'ST_XMin({envelope}) AS bbox_minx', f'ST_YMin({envelope}) AS bbox_miny',
+                f'ST_XMax({envelope}) AS bbox_maxx', f'ST_YMax({envelope}) AS bbox_maxy']
+    return [f'{expr} AS {col}' for col, expr in expressions.items()]
+
+
+def measure_properties(row, field):
+    """
+    把查询结果中的量测字段转换为输出属性
+
+    返回:
+        dict: 例如 {'centroid': [x, y]}、{'bbox': [minx, miny, maxx, maxy]}、{'area_m2': 123.4}
+    """
+    if field == 'centroid':
+        x, y = row['centroid_x'], row['centroid_y']
+        return {'centroid': [x, y] if x is not None else None}
+    if field == 'bbox':
+        bbox = [row['bbox_minx'], row['bbox_miny'], row['bbox_maxx'], row['bbox_maxy']]
+        return {'bbox': bbox if bbox[0] is not None else None}
+    return {col: row[col] for col, _, _ in MEASURE_FIELDS[field]}
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+请求耗时埋点：分阶段计时、Server-Timing 响应头与 Prometheus 格式的 /metrics
+
+读取链路的阶段:
+    sql      执行查询并取回结果
+    records  由查询结果构建轻量要素记录（API 读取，见 backend.utils.features）
+    gdf      由查询结果构建 GeoDataFrame（read_postgis_table，解析 WKB）
+    to_json  GeoDataFrame.to_json
+    loads    json.loads（gdf_to_geojson 中）
+    jsonify  序列化响应
+每个请求的阶段耗时写入 Server-Timing 头（浏览器开发者工具可直接查看），同时累计到全局直方图。
+指标只在内存中累加（加锁的字典操作），开销在微秒级，可在生产环境常开；多进程部署时每个进程单独统计。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from backend.config import METRICS_CONFIG
+
+# 延迟直方图桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 响应大小直方图桶（字节）
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# 行数直方图桶
+ROW_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000)
+
+_lock = threading.Lock()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra.items()) if extra else [])
+    if not items:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in items]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class Counter:
+    """计数器（可带标签）"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with _lock:
+            items = list(self._values.items())
+        return [(self.name, key, None, value) for key, value in items]
+
+
+class Gauge(Counter):
+    """仪表（当前值，可增可减）"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """直方图（累计桶、总和、次数）"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with _lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        result = []
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                result.append((f'{self.name}_bucket', key, {'le': repr(float(bound))}, bucket_count))
+            result.append((f'{self.name}_bucket', key, {'le': '+Inf'}, count))
+            result.append((f'{self.name}_sum', key, None, total))
+            result.append((f'{self.name}_count', key, None, count))
+        return result
+
+
+REQUEST_SECONDS = Histogram('gis_http_request_duration_seconds', '请求处理耗时（秒）')
+REQUESTS = Counter('gis_http_requests_total', '请求数')
+RESPONSE_BYTES = Histogram('gis_http_response_bytes', '响应体大小（字节）', SIZE_BUCKETS)
+STAGE_SECONDS = Histogram('gis_stage_duration_seconds', '各阶段耗时（秒）')
+ROWS = Histogram('gis_db_rows', '每次查询返回的行数', ROW_BUCKETS)
+DB_CONNECTIONS = Counter('gis_db_connections_opened_total', '打开的数据库连接数')
+DB_CHECKED_OUT = Gauge('gis_db_connections_in_use', '正在使用的数据库连接数')
+CACHE_REQUESTS = Counter('gis_cache_requests_total', '缓存访问次数（result=hit/miss）')
+
+REGISTRY = [REQUEST_SECONDS, REQUESTS, RESPONSE_BYTES, STAGE_SECONDS, ROWS, DB_CONNECTIONS, DB_CHECKED_OUT,
+            CACHE_REQUESTS]
+
+
+def enabled():
+    return METRICS_CONFIG.get('enabled', True)
+
+
+@contextmanager
+def timed(stage):
+    """
+    计时上下文：累加到当前请求的 Server-Timing 并记录到全局直方图（在请求外使用时只记录直方图）
+
+    参数:
+        stage: 阶段名（sql / gdf / to_json / loads / jsonify ...）
+    """
+    if not enabled():
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if has_request_context():
+            timings = g.setdefault('stage_timings', {})
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def record_rows(table_name, count):
+    """记录查询返回的行数"""
+    if enabled():
+        ROWS.observe(count, table=table_name)
+
+
+def record_cache(cache_name, hit):
+    """记录缓存命中/未命中"""
+    if enabled():
+        CACHE_REQUESTS.inc(cache=cache_name, result='hit' if hit else 'miss')
+
+
+def instrument_engine(engine):
+    """统计数据库连接的打开与使用情况"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        DB_CONNECTIONS.inc()
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        DB_CHECKED_OUT.inc(-1)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify 时记录 jsonify 阶段耗时"""
+
+    def response(self, *args, **kwargs):
+        with timed('jsonify'):
+            return super().response(*args, **kwargs)
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = {'route': route, 'method': request.method}
+
+    REQUEST_SECONDS.observe(elapsed, **labels)
+    REQUESTS.inc(status=str(response.status_code), **labels)
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe(response.calculate_content_length() or 0, **labels)
+
+    if METRICS_CONFIG.get('server_timing', True):
+        timings = g.get('stage_timings', {})
+        parts = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in timings.items()]
+        parts.append(f'total;dur={elapsed * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(parts)
+    return response
+
+
+def init_metrics(app):
+    """为 Flask 应用注册计时钩子与 JSON 序列化计时"""
+    if not enabled():
+        return
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def _cache_ratio_samples():
+    """按缓存汇总命中率（便于直接查看，Prometheus 中也可由计数器计算）"""
+    totals = {}
+    for _, key, _, value in CACHE_REQUESTS.samples():
+        labels = dict(key)
+        hits, total = totals.get(labels['cache'], (0, 0))
+        totals[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    return [('gis_cache_hit_ratio', (('cache', name),), None, hits / total)
+            for name, (hits, total) in totals.items() if total]
+
+
+def render_metrics():
+    """生成 Prometheus 文本格式（text/plain; version=0.0.4）"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, key, extra, value in metric.samples():
+            lines.append(f'{name}{_format_labels(key, extra)} {value}')
+    lines.append('# HELP gis_cache_hit_ratio 缓存命中率')
+    lines.append('# TYPE gis_cache_hit_ratio gauge')
+    for name, key, extra, value in _cache_ratio_samples():
+        lines.append(f'{name}{_format_labels(key, extra)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+SQL 慢查询日志与执行计划采样
+
+在数据库引擎上挂接 SQLAlchemy 的 before/after_cursor_execute 事件:
+    - 每条语句按“规范化语句”（字面量、参数替换为 ?，IN 列表合并）汇总次数、耗时和行数
+    - 超过 slow_ms 的语句输出 [SLOW SQL] 日志（带绑定参数）
+    - 超过 explain_min_ms 的只读查询按 explain_sample_rate 采样，在后台线程中用独立连接执行
+      EXPLAIN (ANALYZE, BUFFERS)，保存最近一次执行计划，并标记带过滤条件的顺序扫描（可能缺少索引）
+汇总结果通过 /debug/queries 查看。
+"""
+
+import random
+import re
+import threading
+import time
+
+from backend.config import QUERY_LOG_CONFIG
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+\b")
+_IN_LIST_RE = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+_SEQ_SCAN_RE = re.compile(r"Seq Scan on (\S+)")
+
+_stats = {}
+_stats_lock = threading.Lock()
+_explain_slots = threading.Semaphore(1)
+
+
+def normalize_statement(statement):
+    """
+    规范化SQL：合并空白，字面量与绑定参数替换为 ?，IN (?, ?, ...) 合并为 IN (...)
+
+    例如 "SELECT * FROM villages WHERE status = 1 AND (name LIKE '%张%')"
+      -> "SELECT * FROM villages WHERE status = ? AND (name LIKE ?)"
+    """
+    statement = _STRING_RE.sub('?', statement)
+    statement = _PARAM_RE.sub('?', statement)
+    statement = _NUMBER_RE.sub('?', statement)
+    statement = _IN_LIST_RE.sub('(...)', statement)
+    return _SPACE_RE.sub(' ', statement).strip()
+
+
+def _format_params(parameters):
+    """截断过长的参数值（如 WKB、GeoJSON），便于输出日志"""
+    limit = QUERY_LOG_CONFIG.get('max_param_chars', 200)
+
+    def shorten(value):
+        text = repr(value)
+        return text if len(text) <= limit else text[:limit] + f'...({len(text)} chars)'
+
+    if isinstance(parameters, dict):
+        return {key: shorten(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [shorten(value) for value in parameters]
+    return parameters
+
+
+def _is_read_only(statement):
+    head = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return head == 'SELECT' and 'pg_notify' not in statement
+
+
+def _record(statement, parameters, elapsed_ms, rowcount):
+    """累加到规范化语句的统计中（超过 max_statements 时丢弃新语句）"""
+    key = normalize_statement(statement)
+    with _stats_lock:
+        entry = _stats.get(key)
+        if entry is None:
+            if len(_stats) >= QUERY_LOG_CONFIG.get('max_statements', 500):
+                return None
+            entry = _stats[key] = {
+                'statement': key, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                'slow_calls': 0, 'example': None, 'plan': None, 'seq_scans': [],
+            }
+        entry['calls'] += 1
+        entry['total_ms'] += elapsed_ms
+        entry['rows'] += max(rowcount, 0)
+        if elapsed_ms >= entry['max_ms']:
+            entry['max_ms'] = elapsed_ms
+            entry['example'] = {'statement': statement.strip(), 'parameters': _format_params(parameters)}
+        if elapsed_ms >= QUERY_LOG_CONFIG.get('slow_ms', 200):
+            entry['slow_calls'] += 1
+    return key
+
+
+def find_filtered_seq_scans(plan):
+    """找出执行计划中带 Filter 条件的顺序扫描的表（通常意味着过滤列缺少索引）"""
+    tables, current = set(), None
+    for line in plan.splitlines():
+        match = _SEQ_SCAN_RE.search(line)
+        if match:
+            current = match.group(1)
+        elif '->' in line:
+            current = None
+        elif current and 'Filter:' in line:
+            tables.add(current)
+    return sorted(tables)
+
+
+def _explain(engine, key, statement, parameters):
+    """在独立连接中执行 EXPLAIN (ANALYZE, BUFFERS) 并保存计划（后台线程）"""
+    try:
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + statement, parameters)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            connection.rollback()
+        finally:
+            connection.close()
+        seq_scans = find_filtered_seq_scans(plan)
+        with _stats_lock:
+            if key in _stats:
+                _stats[key]['plan'] = plan
+                _stats[key]['seq_scans'] = seq_scans
+        if seq_scans:
+            print(f"[SLOW SQL] 执行计划包含带过滤条件的顺序扫描: {', '.join(seq_scans)}（检查相关列是否缺少索引）")
+    except Exception as e:
+        print(f"[WARN] EXPLAIN 采样失败: {e}")
+    finally:
+        _explain_slots.release()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    key = _record(statement, parameters, elapsed_ms, cursor.rowcount)
+
+    if elapsed_ms >= QUERY_LOG_CONFIG.get('slow_ms', 200):
+        params = _format_params(parameters) if QUERY_LOG_CONFIG.get('log_params', True) else '...'
+        print(f"[SLOW SQL] {elapsed_ms:.1f} ms, {cursor.rowcount} 行: {_SPACE_RE.sub(' ', statement).strip()} | 参数: {params}")
+
+    if (key is not None and not executemany and _is_read_only(statement)
+            and elapsed_ms >= QUERY_LOG_CONFIG.get('explain_min_ms', 500)
+            and random.random() < QUERY_LOG_CONFIG.get('explain_sample_rate', 0.0)
+            and _explain_slots.acquire(blocking=False)):
+        threading.Thread(
+            target=_explain, args=(conn.engine, key, statement, parameters), name='sql-explain', daemon=True
+        ).start()
+
+
+def install_query_log(engine):
+    """在引擎上启用语句计时（QUERY_LOG_CONFIG['enabled'] 为 False 时不挂接）"""
+    if not QUERY_LOG_CONFIG.get('enabled', True):
+        return
+    from sqlalchemy import event
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def get_query_stats(sort='total_ms', limit=50):
+    """
+    按规范化语句汇总的统计
+
+    参数:
+        sort: 排序字段（total_ms / mean_ms / max_ms / calls / rows）
+        limit: 返回条数
+
+    返回:
+        list: [{'statement', 'calls', 'total_ms', 'mean_ms', 'max_ms', 'rows', 'slow_calls', 'example', 'plan', 'seq_scans'}]
+    """
+    with _stats_lock:
+        entries = [dict(entry) for entry in _stats.values()]
+    for entry in entries:
+        entry['mean_ms'] = entry['total_ms'] / entry['calls'] if entry['calls'] else 0.0
+    if sort not in ('total_ms', 'mean_ms', 'max_ms', 'calls', 'rows'):
+        raise ValueError(f"无效的排序字段: {sort}")
+    entries.sort(key=lambda entry: entry[sort], reverse=True)
+    return entries[:limit]
+
+
+def reset_query_stats():
+    """清空统计"""
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+几何简化金字塔工具
+
+线、面图层在表中额外存储若干级简化几何列（见 SIMPLIFY_CONFIG），
+读取时按地图缩放级别或容差选择合适的级别，减少低缩放级别下的顶点数量。
+"""
+
+from backend.config import SIMPLIFY_CONFIG
+
+
+def get_simplify_levels(table_name):
+    """
+    获取表对应的简化级别列表（按容差从小到大）
+
+    参数:
+        table_name: 表名
+
+    返回:
+        list: 级别配置字典列表；表不参与简化时返回空列表
+    """
+    if table_name not in SIMPLIFY_CONFIG['tables']:
+        return []
+    return sorted(SIMPLIFY_CONFIG['levels'], key=lambda level: level['tolerance'])
+
+
+def get_simplify_columns(table_name=None):
+    """获取简化几何列名列表（table_name为None时返回所有级别的列名）"""
+    if table_name is None:
+        return [level['column'] for level in SIMPLIFY_CONFIG['levels']]
+    return [level['column'] for level in get_simplify_levels(table_name)]
+
+
+def tolerance_for_zoom(zoom):
+    """
+    根据Web墨卡托缩放级别估算简化容差（度）
+
+    取该级别下赤道处半个像素对应的经度跨度，简化误差肉眼不可见。
+    """
+    degrees_per_pixel = 360.0 / (256 * 2 ** zoom)
+    return degrees_per_pixel / 2
+
+
+def select_simplify_level(table_name, zoom=None, tolerance=None):
+    """
+    按缩放级别或容差选择简化级别
+
+    参数:
+        table_name: 表名
+        zoom: 地图缩放级别（可选）
+        tolerance: 可接受的最大简化容差，单位度（可选，优先于zoom）
+
+    返回:
+        dict: 选中的级别配置；需要全精度几何时返回None
+    """
+    levels = get_simplify_levels(table_name)
+    if not levels:
+        return None
+
+    if tolerance is not None:
+        # 容差不超过请求值的最粗级别
+        candidates = [level for level in levels if level['tolerance'] <= tolerance]
+        return candidates[-1] if candidates else None
+
+    if zoom is not None:
+        # max_zoom 不小于当前缩放级别的最粗级别
+        candidates = [level for level in levels if level['max_zoom'] >= zoom]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda level: level['max_zoom'])
+
+    return None
+
+
+def parse_simplify_args(args, table_name):
+    """
+    从请求参数（zoom / tolerance）解析简化级别
+
+    参数:
+        args: request.args
+        table_name: 表名
+
+    返回:
+        str: 简化几何列名；不简化时返回None
+
+    异常:
+        ValueError: 参数格式错误
+    """
+    zoom = args.get('zoom')
+    tolerance = args.get('tolerance')
+    try:
+        zoom = float(zoom) if zoom not in (None, '') else None
+        tolerance = float(tolerance) if tolerance not in (None, '') else None
+    except ValueError:
+        raise ValueError('zoom和tolerance参数必须是数字')
+
+    level = select_simplify_level(table_name, zoom=zoom, tolerance=tolerance)
+    return level['column'] if level else None
+
+
+def simplify_sql_expressions(table_name, geom_expr='geometry'):
+    """
+    生成维护简化几何列的SQL表达式
+
+    参数:
+        table_name: 表名
+        geom_expr: 源几何的SQL表达式
+
+    返回:
+        dict: {列名: SQL表达式}
+    """
+    return {
+        level['column']: f"ST_SimplifyPreserveTopology({geom_expr}, {level['tolerance']})"
+        for level in get_simplify_levels(table_name)
+    }
+
+
+def simplify_gdf(gdf, tolerance):
+    """
+    对GeoDataFrame的几何做保拓扑简化（向量化，返回新的GeoDataFrame）
+
+    参数:
+        gdf: GeoDataFrame对象
+        tolerance: 简化容差（与gdf坐标单位一致）
+
+    返回:
+        GeoDataFrame对象
+    """
+    if gdf is None or gdf.empty or not tolerance:
+        return gdf
+    simplified = gdf.copy()
+    simplified['geometry'] = gdf.geometry.simplify(tolerance, preserve_topology=True)
+    return simplified
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+图层内存快照：进程内的只读副本，用 shapely STRtree 回答相交/包含查询，不访问数据库
+
+每个图层的快照保存有效要素（status=1）的 gid 数组、几何数组（EPSG:4326）和 STRtree 索引:
+    - 首次查询时从数据库加载；要素数超过 max_features 的图层不建快照，查询回退到 PostGIS
+    - 查询时距上次同步超过 refresh_seconds，或本进程通过API写入过该图层，先读取快照同步位置之后提交的
+      行并重建索引（只传输变更的行）；同步位置是事务号水位（与 /api/changes 相同，见 backend.utils.changes），
+      晚提交的长事务不会被跳过。未启用变更跟踪的表整表重新加载
+    - 距上次整表加载超过 full_reload_seconds 时整表重新加载（覆盖重新导入表等不经过变更跟踪的修改）
+    - 几何数组和索引不可变，同步时构建新快照后整体替换引用，查询不需要加锁
+谓词对所有查询几何一次完成（STRtree.query 的向量化形式），结果按查询几何分组。
+"""
+
+import threading
+import time
+
+from sqlalchemy import text
+
+from backend.config import SNAPSHOT_CONFIG
+from backend.utils.changes import XID_COLUMN, read_watermark, xid_param
+from backend.utils.db import add_write_listener, get_engine, get_table_columns
+from backend.utils.metrics import record_cache, record_rows, timed
+
+# 查询谓词 -> STRtree.query 的谓词（STRtree 计算 predicate(查询几何, 图层几何)）
+#   intersects  与查询几何相交的要素
+#   contains    包含查询几何的要素（即查询几何 within 要素）
+PREDICATES = {'intersects': 'intersects', 'contains': 'within'}
+
+# 回退到 PostGIS 时的函数（参数顺序为 (图层几何, 查询几何)）
+SQL_PREDICATES = {'intersects': 'ST_Intersects', 'contains': 'ST_Contains'}
+
+# 表名 -> LayerSnapshot；None 表示要素数超过上限，不建快照
+_snapshots = {}
+# 本进程通过API写入过、下次查询前需要同步的图层
+_dirty = set()
+_sync_lock = threading.Lock()
+_MISSING = object()
+
+
+class LayerSnapshot:
+    """单个图层的快照（gid、几何与 STRtree 索引）"""
+
+    __slots__ = ('table_name', 'gids', 'geometries', 'tree', 'rev', 'synced_at', 'loaded_at')
+
+    def __init__(self, table_name, gids, geometries, rev, loaded_at=None):
+        import shapely
+        self.table_name = table_name
+        self.gids = gids
+        self.geometries = geometries
+        self.tree = shapely.STRtree(geometries)
+        # 同步位置（事务号水位，未启用变更跟踪时为 None）
+        self.rev = rev
+        self.synced_at = time.monotonic()
+        # 最近一次整表加载的时间（增量同步时沿用）
+        self.loaded_at = loaded_at or self.synced_at
+
+    def __len__(self):
+        return len(self.gids)
+
+    def query(self, geometries, predicate):
+        """
+        查询与每个几何满足谓词的要素
+
+        参数:
+            geometries: shapely 几何数组（EPSG:4326）
+            predicate: 'intersects' 或 'contains'
+
+        返回:
+            list: 每个查询几何匹配的 gid 列表（升序）
+        """
+        import numpy as np
+        input_index, tree_index = self.tree.query(geometries, predicate=PREDICATES[predicate])
+        order = np.lexsort((self.gids[tree_index], input_index))
+        input_index, matched = input_index[order], self.gids[tree_index][order]
+        bounds = np.searchsorted(input_index, np.arange(len(geometries) + 1))
+        return [matched[bounds[i]:bounds[i + 1]].tolist() for i in range(len(geometries))]
+
+
+def _build(table_name, rows, rev, gids=None, geometries=None, loaded_at=None):
+    """由查询结果（gid, EWKB）构建快照，可在已有的 gid/几何数组后追加"""
+    import numpy as np
+    import shapely
+    new_gids = np.array([row[0] for row in rows], dtype=np.int64)
+    new_geometries = shapely.from_wkb(np.array([row[1] for row in rows], dtype=object))
+    if gids is not None:
+        new_gids = np.concatenate([gids, new_gids])
+        new_geometries = np.concatenate([geometries, new_geometries])
+    return LayerSnapshot(table_name, new_gids, new_geometries, rev, loaded_at)
+
+
+def load_snapshot(table_name):
+    """
+    从数据库加载图层快照
+
+    同步位置在读取数据之前确定（之后提交的修改在下次同步时重复应用，结果不变）。
+
+    返回:
+        LayerSnapshot；要素数超过 max_features 时返回 None
+    """
+    max_features = SNAPSHOT_CONFIG['max_features']
+    tracked = XID_COLUMN in get_table_columns(table_name)
+    sql = (f'SELECT gid, "geometry" FROM {table_name} '
+           f'WHERE status = 1 AND "geometry" IS NOT NULL LIMIT :limit')
+    with timed('snapshot'):
+        with get_engine().connect() as conn:
+            rev = read_watermark(conn) if tracked else None
+            rows = conn.execute(text(sql), {'limit': max_features + 1}).fetchall()
+        record_rows(table_name, len(rows))
+        if len(rows) > max_features:
+            print(f"[WARN] 图层 {table_name} 超过 {max_features} 个要素，不建内存快照，查询在数据库中执行")
+            return None
+        snapshot = _build(table_name, rows, rev)
+    print(f"[DEBUG] 加载图层快照 {table_name}: {len(snapshot)} 个要素, rev {snapshot.rev}")
+    return snapshot
+
+
+def sync_snapshot(snapshot):
+    """
+    把快照同步位置之后提交的变更应用到快照（变更的 gid 先移除，仍有效的再加入）
+
+    先读取新的水位，再读取事务号不小于原水位的行；水位之后已提交的行会在下次同步时重复应用，结果不变。
+
+    返回:
+        新的 LayerSnapshot（没有变更时返回原快照）；要素数超过上限时返回 None
+    """
+    import numpy as np
+
+    table_name = snapshot.table_name
+    if snapshot.rev is None:
+        return load_snapshot(table_name)
+
+    with timed('snapshot'):
+        with get_engine().connect() as conn:
+            watermark = read_watermark(conn)
+            rows = conn.execute(
+                text(f'SELECT gid, "geometry", status FROM {table_name} WHERE {XID_COLUMN} >= {xid_param("rev")}'),
+                {'rev': snapshot.rev}
+            ).fetchall()
+        if not rows:
+            snapshot.rev = max(snapshot.rev, watermark)
+            snapshot.synced_at = time.monotonic()
+            return snapshot
+        record_rows(table_name, len(rows))
+
+        keep = ~np.isin(snapshot.gids, [row[0] for row in rows])
+        active = [row for row in rows if row[2] == 1 and row[1] is not None]
+        if int(keep.sum()) + len(active) > SNAPSHOT_CONFIG['max_features']:
+            print(f"[WARN] 图层 {table_name} 超过 {SNAPSHOT_CONFIG['max_features']} 个要素，停用内存快照")
+            return None
+        updated = _build(table_name, active, max(snapshot.rev, watermark),
+                         snapshot.gids[keep], snapshot.geometries[keep], snapshot.loaded_at)
+    print(f"[DEBUG] 同步图层快照 {table_name}: {len(rows)} 条变更, {len(updated)} 个要素, rev {updated.rev}")
+    return updated
+
+
+def _is_fresh(table_name, snapshot):
+    if snapshot is _MISSING:
+        return False
+    if snapshot is None:
+        return True
+    return table_name not in _dirty and time.monotonic() - snapshot.synced_at < SNAPSHOT_CONFIG['refresh_seconds']
+
+
+def get_snapshot(table_name):
+    """
+    获取图层快照（必要时先加载或同步）
+
+    返回:
+        LayerSnapshot；未启用、图层不在配置中或要素数超过上限时返回 None（调用方应回退到 PostGIS）
+    """
+    if not SNAPSHOT_CONFIG.get('enabled') or table_name not in SNAPSHOT_CONFIG['tables']:
+        return None
+    snapshot = _snapshots.get(table_name, _MISSING)
+    if _is_fresh(table_name, snapshot):
+        record_cache('snapshot', True)
+        return snapshot
+
+    with _sync_lock:
+        # 等待锁期间其他线程可能已完成同步
+        snapshot = _snapshots.get(table_name, _MISSING)
+        if _is_fresh(table_name, snapshot):
+            record_cache('snapshot', True)
+            return snapshot
+        record_cache('snapshot', False)
+        _dirty.discard(table_name)
+        if snapshot is _MISSING or time.monotonic() - snapshot.loaded_at >= SNAPSHOT_CONFIG['full_reload_seconds']:
+            snapshot = load_snapshot(table_name)
+        else:
+            snapshot = sync_snapshot(snapshot)
+        _snapshots[table_name] = snapshot
+        return snapshot
+
+
+def invalidate_snapshot(table_name=None):
+    """丢弃快照（table_name 为 None 时丢弃全部），下次查询时重新加载"""
+    with _sync_lock:
+        if table_name is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(table_name, None)
+
+
+def _query_database(table_name, geometries, predicate):
+    """在 PostGIS 中执行同样的查询（所有查询几何在一条语句中完成）"""
+    import shapely
+    sql = f"""
+        WITH q AS (
+            SELECT ord, ST_SetSRID(ST_GeomFromWKB(wkb), 4326) AS geom
+            FROM unnest(CAST(:geometries AS bytea[])) WITH ORDINALITY AS u(wkb, ord)
+        )
+        SELECT q.ord, t.gid FROM q
+        JOIN {table_name} t ON {SQL_PREDICATES[predicate]}(t."geometry", q.geom)
+        WHERE t.status = 1
+        ORDER BY q.ord, t.gid
+    """
+    with timed('sql'):
+        with get_engine().connect() as conn:
+            rows = conn.execute(text(sql), {'geometries': shapely.to_wkb(geometries).tolist()}).fetchall()
+    record_rows(table_name, len(rows))
+    matches = [[] for _ in range(len(geometries))]
+    for ord_, gid in rows:
+        matches[ord_ - 1].append(gid)
+    return matches
+
+
+def query_layers(tables, geometries, predicate):
+    """
+    空间查询：优先使用内存快照，没有快照的图层在 PostGIS 中执行
+
+    参数:
+        tables: 表名列表
+        geometries: shapely 几何数组（EPSG:4326）
+        predicate: 'intersects' 或 'contains'
+
+    返回:
+        dict: {表名: {'source': 'memory'|'database', 'rev', 'matches': [每个查询几何匹配的 gid 列表]}}
+    """
+    import numpy as np
+    geometries = np.asarray(geometries, dtype=object)
+    results = {}
+    for table_name in tables:
+        snapshot = get_snapshot(table_name)
+        if snapshot is not None:
+            with timed('snapshot_query'):
+                matches = snapshot.query(geometries, predicate)
+            results[table_name] = {'source': 'memory', 'rev': snapshot.rev, 'matches': matches}
+        else:
+            results[table_name] = {'source': 'database', 'rev': None,
+                                   'matches': _query_database(table_name, geometries, predicate)}
+    return results
+
+
+def snapshot_status():
+    """
+    各图层快照的状态
+
+    返回:
+        dict: {表名: {'loaded', 'features', 'coordinates', 'rev', 'age_seconds', 'dirty'}}
+        （未加载的图层为 {'loaded': False, 'too_large': 是否因要素过多停用}）
+    """
+    import shapely
+    status = {}
+    for table_name in SNAPSHOT_CONFIG['tables']:
+        snapshot = _snapshots.get(table_name, _MISSING)
+        if snapshot is _MISSING or snapshot is None:
+            status[table_name] = {'loaded': False, 'too_large': snapshot is None}
+            continue
+        status[table_name] = {
+            'loaded': True,
+            'features': len(snapshot),
+            'coordinates': int(shapely.get_num_coordinates(snapshot.geometries).sum()),
+            'rev': snapshot.rev,
+            'age_seconds': round(time.monotonic() - snapshot.synced_at, 1),
+            'dirty': table_name in _dirty,
+        }
+    return status
+
+
+def _on_write(event):
+    """本进程通过API写入后，下次查询前同步对应图层"""
+    _dirty.add(event['layer'])
+
+
+add_write_listener(_on_write)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+空间连接：两个图层按空间谓词在一条 SQL 中连接（如“河渠 500 米范围内的村庄”）
+
+谓词（左图层要素 l 与右图层要素 r）:
+    intersects  l 与 r 相交
+    within      l 在 r 内部（如村庄在水系面内）
+    dwithin     l 与 r 的椭球面距离不超过 distance 米
+dwithin 先用按纬度换算成度的外包框（&&，走 GiST 索引）筛选候选，再按 geography 精确计算距离。
+结果两种形式:
+    pairs   [[左 gid, 右 gid(, 距离米)], ...]，按批次流式输出（服务端游标，不在内存中累积）
+    counts  每个要素匹配的对方要素数 [[gid, 数量], ...]（group_by 指定按左或右图层分组）
+"""
+
+import json
+
+from sqlalchemy import text
+
+from backend.config import JOIN_CONFIG, LAYER_TABLES
+from backend.utils.db import get_engine
+from backend.utils.metrics import record_rows, timed
+
+JOIN_PREDICATES = ('intersects', 'within', 'dwithin')
+JOIN_MODES = ('pairs', 'counts')
+
+# 每度纬度的最小长度（米），用于把距离换算成度（偏大的外包框只增加候选，不影响结果）
+METERS_PER_DEGREE = 110_000
+
+
+def _parse_gids(value, name):
+    """解析 gid 列表（JSON 数组或逗号分隔的字符串）"""
+    if value is None or value == '':
+        return None
+    items = value.split(',') if isinstance(value, str) else value
+    try:
+        gids = [int(item) for item in items]
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的 {name}: {value}（应为 gid 列表）")
+    if not gids:
+        raise ValueError(f"{name} 不能为空")
+    return gids
+
+
+def parse_join_spec(params):
+    """
+    解析并校验连接参数
+
+    参数:
+        params: dict，键为 left、right、predicate、distance、mode、group_by、limit、
+                left_gids / right_gids（gid 列表）、left_name / right_name（名称包含的文字）
+
+    返回:
+        dict: 校验后的参数
+
+    异常:
+        ValueError: 参数无效
+    """
+    spec = {}
+    for side in ('left', 'right'):
+        layer = params.get(side)
+        if layer not in LAYER_TABLES:
+            raise ValueError(f"无效的 {side}: {layer}（可选: {', '.join(LAYER_TABLES)}）")
+        spec[side] = layer
+        spec[f'{side}_gids'] = _parse_gids(params.get(f'{side}_gids'), f'{side}_gids')
+        spec[f'{side}_name'] = params.get(f'{side}_name') or None
+
+    spec['predicate'] = params.get('predicate') or 'intersects'
+    if spec['predicate'] not in JOIN_PREDICATES:
+        raise ValueError(f"无效的 predicate: {spec['predicate']}（可选: {', '.join(JOIN_PREDICATES)}）")
+    spec['distance'] = None
+    if spec['predicate'] == 'dwithin':
+        try:
+            distance = float(params.get('distance'))
+        except (TypeError, ValueError):
+            raise ValueError('predicate=dwithin 时需要 distance（米）')
+        if not 0 <= distance <= JOIN_CONFIG['max_distance']:
+            raise ValueError(f"distance 应在 0 到 {JOIN_CONFIG['max_distance']} 米之间")
+        spec['distance'] = distance
+
+    spec['mode'] = params.get('mode') or 'pairs'
+    if spec['mode'] not in JOIN_MODES:
+        raise ValueError(f"无效的 mode: {spec['mode']}（可选: {', '.join(JOIN_MODES)}）")
+    spec['group_by'] = params.get('group_by') or 'right'
+    if spec['group_by'] not in ('left', 'right'):
+        raise ValueError(f"无效的 group_by: {spec['group_by']}（可选: left、right）")
+
+    try:
+        limit = int(params.get('limit') or JOIN_CONFIG['max_pairs'])
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的 limit: {params.get('limit')}")
+    if limit <= 0:
+        raise ValueError(f"无效的 limit: {limit}（应为正整数）")
+    spec['limit'] = min(limit, JOIN_CONFIG['max_pairs'])
+    return spec
+
+
+def _predicate_sql(predicate):
+    if predicate == 'intersects':
+        return 'ST_Intersects(l."geometry", r."geometry")'
+    if predicate == 'within':
+        return 'ST_Within(l."geometry", r."geometry")'
+    # 经度方向按外包框中离赤道最远的纬度（加 1° 余量）换算
+    lat = 'LEAST(GREATEST(abs(ST_YMin(r."geometry")), abs(ST_YMax(r."geometry"))) + 1, 89)'
+    return (
+        f'l."geometry" && ST_Expand(r."geometry", '
+        f'CAST(:distance AS float8) / ({METERS_PER_DEGREE} * cos(radians({lat}))), '
+        f'CAST(:distance AS float8) / {METERS_PER_DEGREE}) '
+        f'AND ST_DWithin(l."geometry"::geography, r."geometry"::geography, :distance)'
+    )
+
+
+def build_join_sql(spec):
+    """
+    生成连接语句
+
+    返回:
+        tuple: (SQL, 参数)
+    """
+    conditions = ['l.status = 1', 'r.status = 1', _predicate_sql(spec['predicate'])]
+    params = {'distance': spec['distance']} if spec['distance'] is not None else {}
+    if spec['left'] == spec['right']:
+        conditions.append('l.gid <> r.gid')
+    for side, alias in (('left', 'l'), ('right', 'r')):
+        if spec[f'{side}_gids']:
+            conditions.append(f'{alias}.gid = ANY(:{side}_gids)')
+            params[f'{side}_gids'] = spec[f'{side}_gids']
+        if spec[f'{side}_name']:
+            conditions.append(f"{alias}.name LIKE '%' || :{side}_name || '%'")
+            params[f'{side}_name'] = spec[f'{side}_name']
+
+    tables = f"{spec['left']} l JOIN {spec['right']} r ON {' AND '.join(conditions)}"
+    if spec['mode'] == 'counts':
+        alias = 'l' if spec['group_by'] == 'left' else 'r'
+        sql = f"SELECT {alias}.gid, count(*) FROM {tables} GROUP BY {alias}.gid ORDER BY {alias}.gid"
+    else:
+        distance = ', ST_Distance(l."geometry"::geography, r."geometry"::geography)' if spec['distance'] is not None else ''
+        sql = f"SELECT l.gid, r.gid{distance} FROM {tables} LIMIT :limit"
+        params['limit'] = spec['limit'] + 1
+    return sql, params
+
+
+def _header(spec):
+    header = {key: spec[key] for key in ('left', 'right', 'predicate', 'distance', 'mode')}
+    if spec['mode'] == 'counts':
+        header['group_by'] = spec['group_by']
+    return json.dumps(header, ensure_ascii=False)[:-1]
+
+
+def _format_row(row):
+    if len(row) == 3:
+        return f'[{row[0]},{row[1]},{round(row[2], 2)}]'
+    return f'[{row[0]},{row[1]}]'
+
+
+def stream_join(spec):
+    """
+    执行连接并按批次生成 JSON 文本片段（服务端游标分批读取，可直接作为流式响应体）
+
+    查询在生成第一个片段前执行，调用方可先取第一个片段，使SQL错误在发送响应头之前抛出。
+    之后读取批次时出错（如 statement_timeout）响应头已发送，不再抛出: 结果以 "error" 字段结尾，
+    JSON 仍然完整，已输出的部分保留（pairs 的 truncated 为 true）。
+
+    pairs:  {"left": ..., "predicate": ..., "pairs": [[左gid, 右gid(, 距离)], ...], "count": n, "truncated": bool}
+    counts: {"left": ..., "group_by": "right", "counts": [[gid, 数量], ...], "count": n}
+    出错时: {..., "count": n, "truncated": true, "error": "错误信息"}（counts 没有 truncated）
+    """
+    sql, params = build_join_sql(spec)
+    key = 'counts' if spec['mode'] == 'counts' else 'pairs'
+    print(f"[DEBUG] 执行空间连接: {' '.join(sql.split())} 参数: {params}")
+
+    count = seen = 0
+    started = False
+    error = None
+    try:
+        with get_engine().connect() as conn:
+            with conn.begin():
+                conn.execute(text(f"SET LOCAL statement_timeout = {int(JOIN_CONFIG['statement_timeout_ms'])}"))
+                with timed('sql'):
+                    result = conn.execute(text(sql).execution_options(stream_results=True), params)
+                started = True
+                yield _header(spec) + f', "{key}": ['
+                # pairs 最多读取 limit + 1 行，多出的一行只用于判断是否截断
+                for rows in result.partitions(JOIN_CONFIG['stream_batch']):
+                    seen += len(rows)
+                    if key == 'pairs':
+                        rows = rows[:max(spec['limit'] - count, 0)]
+                    if rows:
+                        yield (',' if count else '') + ','.join(_format_row(row) for row in rows)
+                        count += len(rows)
+    except Exception as e:
+        if not started:
+            raise
+        # 响应头已发送，只能在结果末尾报告错误
+        import traceback
+        print(f"[ERROR] 空间连接在输出 {count} 条后失败: {e}")
+        print(f"[ERROR] 错误详情: {traceback.format_exc()}")
+        error = str(e)
+    record_rows(spec['left'], count)
+    print(f"[DEBUG] 空间连接完成: {count} 条")
+    truncated = f', "truncated": {json.dumps(seen > count or error is not None)}' if key == 'pairs' else ''
+    failed = f', "error": {json.dumps(error, ensure_ascii=False)}' if error is not None else ''
+    yield f'], "count": {count}{truncated}{failed}}}'
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+API 基准测试：合成数据生成、加载与并发压测
+
+按 shp/ 示例数据的分布生成任意规模（1 千到 1 千万要素）的村庄、河渠、水系，
+通过二进制 COPY 写入独立的基准测试数据库，再启动API服务并发请求 /api 端点，
+输出吞吐量、p50/p95/p99 延迟和服务进程内存（RSS）的 JSON 报告。
+报告记录提交、数据集规模与种子、压测参数，相同参数下不同提交的报告可直接对比。
+
+用法:
+    python -m benchmarks all --features 100000 --scenario mixed --concurrency 8 --duration 30
+    python -m benchmarks load --features 10000000
+    python -m benchmarks run --features 10000000 --scenario lookup
+    python -m benchmarks run --base-url http://127.0.0.1:5000 --server-pid 12345 --features 145
+    python -m benchmarks compare benchmarks/results/a1b2c3d-mixed-100000.json benchmarks/results/e4f5a6b-mixed-100000.json
+
+转换层微基准（固定种子与规模，与 benchmarks/baselines/micro.json 比较，退化时退出码为 1）:
+    python -m benchmarks micro --threshold 0.25
+    python -m benchmarks micro --update-baseline
+
+导入流程基准（shp/ 示例数据平铺放大，分阶段计时；--dry-run 不需要数据库）:
+    python -m benchmarks import --scale 1000 --dry-run --profile-dir output/profile
+
+API 冷启动基准（--eager 同时运行先导入 geopandas 等依赖的对照组）:
+    python -m benchmarks startup --repeat 10 --eager
+"""
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试命令行：生成并加载合成数据、压测API、输出/对比JSON报告
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+from backend.config import get_database_url
+from benchmarks.synthetic import dataset_extent, layer_counts
+
+# 报告格式版本（字段含义变化时递增，compare 只比较相同版本的报告）
+REPORT_FORMAT = 1
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_info():
+    """当前提交（短哈希）及工作区是否有未提交的修改"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': dirty}
+
+
+def build_report(args, result, loaded=None):
+    """组装报告（包含提交、环境、数据集和压测参数，便于在不同提交之间比较）"""
+    return {
+        'benchmark': 'api-load',
+        'format': REPORT_FORMAT,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git': git_info(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'dataset': {
+            'features': args.features,
+            'seed': args.seed,
+            'counts': layer_counts(args.features),
+            'extent': [round(v, 6) for v in dataset_extent(args.features)],
+            'load': loaded['layers'] if loaded else None,
+        },
+        'load': {
+            'scenario': args.scenario,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+        },
+        **result,
+    }
+
+
+def write_report(report, output=None, label=None):
+    """写入报告（默认 benchmarks/results/<提交>-<label>.json，label 默认为 <场景>-<要素数>），返回文件路径"""
+    if output is None:
+        commit = report['git']['commit'] or 'unknown'
+        if report['git']['dirty']:
+            commit += '-dirty'
+        label = label or f"{report['load']['scenario']}-{report['dataset']['features']}"
+        output = os.path.join(RESULTS_DIR, f"{commit}-{label}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return output
+
+
+def print_report(report):
+    """输出各端点的吞吐量与延迟"""
+    print("\n" + "=" * 92)
+    print(f"{'端点':<20}{'请求数':>8}{'错误':>6}{'吞吐量(req/s)':>15}{'p50(ms)':>11}{'p95(ms)':>11}{'p99(ms)':>11}{'max(ms)':>10}")
+    print("-" * 92)
+    rows = list(report['endpoints'].items()) + [('总计', report['summary'])]
+    for name, stats in rows:
+        latency = stats.get('latency_ms', {})
+        print(f"{name:<20}{stats['requests']:>8}{stats['errors']:>6}{stats['throughput_rps']:>15.1f}"
+              f"{latency.get('p50', 0):>11.1f}{latency.get('p95', 0):>11.1f}{latency.get('p99', 0):>11.1f}"
+              f"{latency.get('max', 0):>10.1f}")
+    print("=" * 92)
+    rss = report.get('server_rss')
+    if rss:
+        print(f"服务内存 (RSS): 开始 {rss['start_mb']} MB, 峰值 {rss['peak_mb']} MB, 结束 {rss['end_mb']} MB")
+
+
+def _percent(old, new):
+    return f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+
+
+def compare_reports(old, new):
+    """
+    对比两份报告（通常是两个提交在相同数据集和参数下的结果）
+
+    返回:
+        list: 数据集或压测参数不一致的说明（为空表示可直接比较）
+    """
+    mismatches = []
+    if old.get('format') != new.get('format'):
+        mismatches.append(f"报告格式不同: {old.get('format')} / {new.get('format')}")
+    for key in ('features', 'seed'):
+        if old['dataset'][key] != new['dataset'][key]:
+            mismatches.append(f"数据集 {key} 不同: {old['dataset'][key]} / {new['dataset'][key]}")
+    for key, value in old['load'].items():
+        if new['load'].get(key) != value:
+            mismatches.append(f"压测参数 {key} 不同: {value} / {new['load'].get(key)}")
+
+    print(f"\n{old['git']['commit']} -> {new['git']['commit']}")
+    print(f"{'端点':<20}{'吞吐量(req/s)':>28}{'p50(ms)':>26}{'p95(ms)':>26}{'p99(ms)':>26}")
+    names = sorted(set(old['endpoints']) | set(new['endpoints']))
+    for name, a, b in [(n, old['endpoints'].get(n), new['endpoints'].get(n)) for n in names] + \
+            [('总计', old['summary'], new['summary'])]:
+        if not a or not b or 'latency_ms' not in a or 'latency_ms' not in b:
+            print(f"{name:<20}（只在一份报告中出现）")
+            continue
+        cells = [f"{a['throughput_rps']:.1f}->{b['throughput_rps']:.1f} {_percent(a['throughput_rps'], b['throughput_rps'])}"]
+        for p in ('p50', 'p95', 'p99'):
+            x, y = a['latency_ms'][p], b['latency_ms'][p]
+            cells.append(f"{x:.1f}->{y:.1f} {_percent(x, y)}")
+        print(f"{name:<20}" + ''.join(f"{cell:>26}" for cell in cells))
+    old_rss, new_rss = old.get('server_rss'), new.get('server_rss')
+    if old_rss and new_rss:
+        print(f"服务内存峰值: {old_rss['peak_mb']} MB -> {new_rss['peak_mb']} MB "
+              f"{_percent(old_rss['peak_mb'], new_rss['peak_mb'])}")
+    for mismatch in mismatches:
+        print(f"⚠ {mismatch}")
+    return mismatches
+
+
+def _add_dataset_args(parser):
+    parser.add_argument('--features', type=int, default=1000,
+                        help='合成数据总要素数，按示例数据比例分配到三个图层（默认: 1000，可到 10000000）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认: 42）')
+
+
+def _add_load_args(parser):
+    parser.add_argument('--db-url', default=None,
+                        help='基准测试数据库URL（默认: 配置中的服务器上的 gis_bench 库，不存在时自动创建）')
+
+
+def _add_run_args(parser):
+    parser.add_argument('--scenario', default='mixed', choices=['mixed', 'browse', 'lookup'],
+                        help='压测场景（默认: mixed；数据量大时建议 lookup）')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发线程数（默认: 8）')
+    parser.add_argument('--duration', type=float, default=30.0, help='统计时长，秒（默认: 30）')
+    parser.add_argument('--warmup', type=float, default=5.0, help='预热时长，秒（默认: 5）')
+    parser.add_argument('--base-url', default=None,
+                        help='压测已运行的服务（如 http://127.0.0.1:5000）；不指定时连接基准测试数据库自动启动服务')
+    parser.add_argument('--server-pid', type=int, default=None, help='已运行服务的进程号（采样内存，含子进程）')
+    parser.add_argument('--port', type=int, default=5055, help='自动启动服务时的端口（默认: 5055）')
+    parser.add_argument('--server-log', default=os.devnull, help='自动启动服务时的输出文件（默认丢弃）')
+    parser.add_argument('--output', default=None, help='报告文件（默认: benchmarks/results/<提交>-<场景>-<要素数>.json）')
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='API 压测与合成数据生成')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    load = commands.add_parser('load', help='生成合成数据并写入基准测试数据库')
+    _add_dataset_args(load)
+    _add_load_args(load)
+    load.add_argument('--layers', nargs='+', choices=list(layer_counts(1)), help='只加载指定的表（默认全部）')
+
+    run = commands.add_parser('run', help='压测API并输出JSON报告')
+    _add_dataset_args(run)
+    _add_load_args(run)
+    _add_run_args(run)
+
+    run_all = commands.add_parser('all', help='加载合成数据后立即压测')
+    _add_dataset_args(run_all)
+    _add_load_args(run_all)
+    _add_run_args(run_all)
+
+    compare = commands.add_parser('compare', help='对比两份报告')
+    compare.add_argument('old', help='基准报告')
+    compare.add_argument('new', help='新报告')
+
+    micro = commands.add_parser('micro', help='转换层微基准（与保存的基准比较，退化时退出码为 1）')
+    micro.add_argument('--filter', dest='pattern', default=None, help='只运行名称包含该字符串的用例')
+    micro.add_argument('--repeat', type=int, default=3, help='每轮每个用例的计时样本数（默认: 3）')
+    micro.add_argument('--rounds', type=int, default=5,
+                       help='所有用例轮流计时的轮数，轮间极差计入允许的波动（默认: 5）')
+    micro.add_argument('--threshold', type=float, default=0.25,
+                       help='允许的相对增幅，另加轮间极差，超过即视为退化（默认: 0.25，即 25%%）')
+    micro.add_argument('--baseline', default=None, help='基准文件（默认: benchmarks/baselines/micro.json）')
+    micro.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基准文件（须在干净的提交上运行）')
+    micro.add_argument('--allow-dirty', action='store_true', help='允许在有未提交修改的工作区中更新基准')
+
+    imports = commands.add_parser('import', help='导入流程基准（示例数据平铺放大后分阶段计时）')
+    imports.add_argument('--scale', type=int, default=100, help='示例数据放大倍数（默认: 100，即 14,500 个要素）')
+    imports.add_argument('--dry-run', action='store_true', help='COPY 数据直接丢弃，不需要数据库')
+    _add_load_args(imports)
+    imports.add_argument('--workers', type=int, default=None, help='并行进程数（默认: 图层数与CPU数的较小值）')
+    imports.add_argument('--batch-size', type=int, default=None, help='每批要素数（默认与导入程序相同）')
+    imports.add_argument('--crs', default=None,
+                         help='放大数据的坐标系（默认与示例数据相同的 EPSG:4326；如 EPSG:4547 可计入重投影开销）')
+    imports.add_argument('--profile-dir', default=None, help='把每个图层的分析结果写入该目录')
+    imports.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile',
+                         help='--profile-dir 使用的分析器（默认: cprofile）')
+    imports.add_argument('--keep-dir', default=None, help='放大后的 Shapefile 写入该目录并保留（默认写入临时目录）')
+    imports.add_argument('--output', default=None, help='报告文件（默认: benchmarks/results/<提交>-import-<倍数>.json）')
+
+    startup = commands.add_parser('startup', help='API 冷启动基准（新进程中导入 backend.app 并创建应用）')
+    startup.add_argument('--repeat', type=int, default=10, help='重复次数（默认: 10）')
+    startup.add_argument('--eager', action='store_true',
+                         help='同时运行对照组：先导入 geopandas / shapely / pyproj 再导入应用')
+    startup.add_argument('--output', default=None, help='报告文件（默认: benchmarks/results/<提交>-startup.json）')
+    return parser
+
+
+def _startup(args):
+    from benchmarks.startup import run_startup
+
+    runs = [run_startup(args.repeat)]
+    if args.eager:
+        runs.append(run_startup(args.repeat, eager=True))
+
+    print(f"\n{'模式':<8}{'总耗时(s)':>12}{'预加载(s)':>12}{'导入(s)':>12}{'create_app(s)':>16}  已加载的重量级模块")
+    for run in runs:
+        timings = run['timings']
+        print(f"{run['mode']:<10}{timings['wall_s']['median']:>12.3f}{timings['eager_s']['median']:>12.3f}"
+              f"{timings['import_s']['median']:>12.3f}{timings['create_app_s']['median']:>16.3f}  "
+              f"{', '.join(run['heavy']) or '无'}")
+    print("\n耗时最多的导入（lazy，毫秒）: " + ', '.join(f"{name} {ms}" for name, ms in runs[0]['top_imports_ms'][:6]))
+
+    report = {
+        'benchmark': 'startup',
+        'format': REPORT_FORMAT,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git': git_info(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'runs': runs,
+    }
+    path = write_report(report, args.output, 'startup')
+    print(f"报告已保存: {path}")
+    return 0
+
+
+def _import(args):
+    from benchmarks.importbench import run_import_benchmark, slowest_stages
+    from importer.cli import print_profile, print_report
+
+    db_url = None
+    if not args.dry_run:
+        from benchmarks.dataset import bench_database_url, ensure_database
+        db_url = args.db_url or bench_database_url(get_database_url())
+        ensure_database(db_url)
+
+    result = run_import_benchmark(args.scale, db_url, args.dry_run, args.workers, args.batch_size, args.crs,
+                                  args.profile_dir, args.profiler, args.keep_dir)
+    print_report(result['layers'], result['elapsed'])
+    print_profile(result['layers'])
+    print("最慢的阶段: " + ', '.join(f"{stage} {seconds:.2f} s" for stage, seconds in slowest_stages(result)))
+
+    report = {
+        'benchmark': 'import',
+        'format': REPORT_FORMAT,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git': git_info(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'dataset': {'source': 'shp', 'scale': args.scale, 'crs': args.crs or 'EPSG:4326'},
+        'options': {'dry_run': args.dry_run, 'workers': args.workers, 'batch_size': args.batch_size},
+        **result,
+    }
+    label = f"import-{args.scale}" + ('-dryrun' if args.dry_run else '')
+    path = write_report(report, args.output, label)
+    print(f"报告已保存: {path}")
+    return 1 if any('error' in stats for stats in result['layers']) else 0
+
+
+def _environment():
+    """运行环境（Python 版本、平台、CPU 数）"""
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def _micro(args):
+    from benchmarks.micro import BASELINE_PATH, find_regressions, run_micro
+
+    baseline_path = args.baseline or BASELINE_PATH
+    print(f"微基准: {args.rounds} 轮 × {args.repeat} 个样本（每个样本至少 100 ms；显示各轮最小值的中位数 ± 轮间极差）")
+    results = run_micro(args.repeat, args.pattern, args.rounds)
+
+    if args.update_baseline:
+        git = git_info()
+        if git['dirty'] and not args.allow_dirty:
+            print("✗ 工作区有未提交的修改，基准应在干净的提交上生成（确需覆盖时加 --allow-dirty）")
+            return 2
+        baseline = {
+            'benchmark': 'micro',
+            'format': REPORT_FORMAT,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git': git,
+            'environment': _environment(),
+            'repeat': args.repeat,
+            'rounds': args.rounds,
+            'results': results,
+        }
+        if args.pattern and os.path.exists(baseline_path):
+            # 只运行了部分用例时保留其余用例的基准
+            with open(baseline_path, encoding='utf-8') as f:
+                baseline['results'] = {**json.load(f)['results'], **results}
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"基准已更新: {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"⚠ 基准文件不存在: {baseline_path}（使用 --update-baseline 生成）")
+        return 0
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    # 绝对耗时只能在相同环境下比较
+    environment = _environment()
+    different = {key: (baseline.get('environment', {}).get(key), value) for key, value in environment.items()
+                 if baseline.get('environment', {}).get(key) != value}
+    if different:
+        print("⚠ 运行环境与基准不同，比较结果仅供参考: "
+              + ', '.join(f"{key} {old} -> {new}" for key, (old, new) in different.items()))
+    regressions = find_regressions(results, baseline['results'], args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} 项超过基准 {args.threshold * 100:.0f}% + 轮间极差（基准: {baseline['git']['commit']}）:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\n✓ 未超过基准 {args.threshold * 100:.0f}% + 轮间极差（基准: {baseline['git']['commit']}）")
+    return 0
+
+
+def _run(args, loaded=None):
+    from benchmarks.loadgen import run_load
+    from benchmarks.server import start_server, stop_server
+
+    process = None
+    base_url, server_pid = args.base_url, args.server_pid
+    if base_url is None:
+        print(f"启动API服务: 127.0.0.1:{args.port}（数据库 {args.db_url.rsplit('/', 1)[-1]}）")
+        process = start_server(args.db_url, args.port, args.server_log)
+        base_url, server_pid = f'http://127.0.0.1:{args.port}', process.pid
+    try:
+        print(f"压测: 场景 {args.scenario}, 并发 {args.concurrency}, 预热 {args.warmup} s, 统计 {args.duration} s")
+        result = run_load(base_url, args.scenario, args.features, args.seed, args.concurrency,
+                          args.duration, args.warmup, server_pid)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    report = build_report(args, result, loaded)
+    print_report(report)
+    path = write_report(report, args.output)
+    print(f"报告已保存: {path}")
+    return 1 if report['summary']['requests'] == 0 or report['summary']['errors'] else 0
+
+
+def main(argv=None):
+    """命令行入口，返回退出码"""
+    # 修复Windows控制台编码问题
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except Exception:
+            pass
+
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'micro':
+        return _micro(args)
+
+    if args.command == 'import':
+        return _import(args)
+
+    if args.command == 'startup':
+        return _startup(args)
+
+    if args.command == 'compare':
+        with open(args.old, encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        compare_reports(old, new)
+        return 0
+
+    from benchmarks.dataset import bench_database_url, load_dataset
+
+    if args.db_url is None:
+        args.db_url = bench_database_url(get_database_url())
+
+    loaded = None
+    if args.command in ('load', 'all'):
+        print(f"生成并加载合成数据: {args.features:,} 条要素, 种子 {args.seed}")
+        loaded = load_dataset(args.db_url, args.features, args.seed, getattr(args, 'layers', None))
+        if args.command == 'load':
+            return 0
+    return _run(args, loaded)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+把合成数据写入基准测试数据库
+
+与导入程序（importer.loader）使用相同的建表语句、二进制 COPY 编码、派生列刷新和索引，
+因此基准测试读到的表结构与正式导入的一致。每个图层删除并重建，gid 从 1 开始连续编号。
+"""
+
+import time
+from itertools import chain
+
+from sqlalchemy import make_url, text
+
+from backend.utils.db import refresh_derived_columns
+from benchmarks.synthetic import dataset_extent, iter_layer_batches, layer_counts
+from importer.loader import (
+    HASH_COLUMN, TARGET_SRID, create_copy_engine, create_indexes, create_table_sql, ensure_postgis,
+)
+from importer.pgcopy import CopyStream, encode_rows, get_copy_columns
+
+# 基准测试默认使用的数据库（与业务数据库分开，加载时会删除并重建图层表）
+DEFAULT_DATABASE = 'gis_bench'
+
+
+def bench_database_url(base_url, database=DEFAULT_DATABASE):
+    """把连接URL中的数据库名替换为基准测试数据库"""
+    return make_url(base_url).set(database=database).render_as_string(hide_password=False)
+
+
+def ensure_database(db_url):
+    """基准测试数据库不存在时创建（连接同一服务器的 postgres 库执行 CREATE DATABASE）"""
+    url = make_url(db_url)
+    engine = create_copy_engine(url.set(database='postgres').render_as_string(hide_password=False))
+    try:
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {'name': url.database}
+            ).scalar()
+            if not exists:
+                conn.execute(text(f'CREATE DATABASE "{url.database}"'))
+                print(f"✓ 已创建数据库 {url.database}")
+    finally:
+        engine.dispose()
+
+
+def load_layer(engine, table, count, seed, extent, geom_col='geometry', schema='public'):
+    """
+    生成一个图层并通过 COPY 写入（替换已有表）
+
+    参数:
+        engine: 数据库引擎（psycopg2）
+        table: 表名
+        count: 要素数
+        seed: 随机种子
+        extent: 数据范围
+        geom_col: 几何列名
+        schema: 模式名
+
+    返回:
+        dict: {'table', 'features', 'bytes', 'timings': {'generate', 'copy', 'index'}}
+    """
+    stats = {'table': table, 'features': 0, 'bytes': 0, 'timings': {'generate': 0.0, 'copy': 0.0, 'index': 0.0}}
+    timings = stats['timings']
+    batches = iter_layer_batches(table, count, seed, extent)
+
+    t0 = time.perf_counter()
+    first = next(batches)
+    if first.geometry.name != geom_col:
+        first = first.rename_geometry(geom_col)
+    columns = get_copy_columns(first, geom_col)
+    timings['generate'] += time.perf_counter() - t0
+
+    def encoded_batches():
+        for batch in chain([first], batches):
+            t_generate = time.perf_counter()
+            if batch.geometry.name != geom_col:
+                batch = batch.rename_geometry(geom_col)
+            chunk = encode_rows(batch, columns, TARGET_SRID, fingerprint=True)
+            timings['generate'] += time.perf_counter() - t_generate
+            stats['features'] += len(batch)
+            yield chunk
+
+    target = f"{schema}.{table}"
+    column_list = ', '.join(f'"{col}"' for col, _ in columns)
+    with engine.begin() as conn:
+        ensure_postgis(conn)
+        conn.execute(text(f"DROP TABLE IF EXISTS {target} CASCADE"))
+        conn.execute(text(create_table_sql(table, columns, geom_col, schema)))
+
+        t0 = time.perf_counter()
+        generate_before = timings['generate']
+        stream = CopyStream(encoded_batches())
+        conn.connection.cursor().copy_expert(
+            f"COPY {target} ({column_list}, {HASH_COLUMN}) FROM STDIN (FORMAT binary)", stream
+        )
+        stats['bytes'] = stream.bytes_read
+        timings['copy'] = time.perf_counter() - t0 - (timings['generate'] - generate_before)
+
+        t0 = time.perf_counter()
+        refresh_derived_columns(conn, table, geom_col=geom_col)
+        create_indexes(conn, table, geom_col, schema)
+        conn.execute(text(f"ANALYZE {target}"))
+        timings['index'] = time.perf_counter() - t0
+    return stats
+
+
+def load_dataset(db_url, features, seed, tables=None):
+    """
+    生成并加载全部图层
+
+    参数:
+        db_url: 基准测试数据库URL（不存在时自动创建）
+        features: 总要素数（按示例数据的比例分配到各图层）
+        seed: 随机种子
+        tables: 只加载这些表（默认全部）
+
+    返回:
+        dict: {'features', 'seed', 'extent', 'counts', 'layers': [每个图层的统计]}
+    """
+    counts = layer_counts(features)
+    extent = dataset_extent(features)
+    ensure_database(db_url)
+    engine = create_copy_engine(db_url)
+    layers = []
+    try:
+        for table, count in counts.items():
+            if tables and table not in tables:
+                continue
+            stats = load_layer(engine, table, count, seed, extent)
+            total = sum(stats['timings'].values())
+            print(f"✓ {table}: {stats['features']:,} 条要素, {stats['bytes'] / 1024 / 1024:.1f} MB, {total:.1f} s "
+                  f"(生成 {stats['timings']['generate']:.1f} s, COPY {stats['timings']['copy']:.1f} s, "
+                  f"索引 {stats['timings']['index']:.1f} s)")
+            layers.append(stats)
+    finally:
+        engine.dispose()
+    return {'features': features, 'seed': seed, 'extent': list(extent), 'counts': counts, 'layers': layers}
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+导入流程基准：把 shp/ 示例数据按网格平铺放大 scale 倍，再用 importer 导入并分阶段计时
+
+放大后的 Shapefile 写入临时目录（默认与示例数据相同的 GBK 编码和 WGS84 坐标系，
+可用 --crs 写成投影坐标系以计入重投影开销），然后以 --profile 方式导入：每个图层在独立进程中运行，
+记录 detect/read/reproject/validate/encode/copy/index 各阶段耗时、要素/秒、顶点/秒和内存峰值。
+--dry-run 时 COPY 数据直接丢弃，不需要数据库。
+"""
+
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+import pyogrio
+import shapely
+
+from importer.cli import DEFAULT_LAYERS, resolve_layers, run_import
+from importer.loader import READ_STAGES
+
+# 每次写入的最大要素数（平铺副本分批追加写入，避免一次在内存中构建全部数据）
+WRITE_CHUNK = 50_000
+
+
+def _sample_bounds(source_dir):
+    bounds = [pyogrio.read_info(os.path.join(source_dir, layer['file']))['total_bounds'] for layer in DEFAULT_LAYERS]
+    return (min(b[0] for b in bounds), min(b[1] for b in bounds), max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+
+def scale_shapefiles(source_dir, target_dir, scale, crs=None, encoding='GBK'):
+    """
+    把示例数据平铺 scale 份写入目标目录（文件名与示例数据相同，可直接作为 --base-path）
+
+    第 k 份平移到 ceil(sqrt(scale)) 列网格的第 k 格，属性不变。
+
+    参数:
+        source_dir: 示例数据目录
+        target_dir: 输出目录
+        scale: 份数
+        crs: 输出坐标系（None 表示与示例数据相同）
+        encoding: 属性编码
+
+    返回:
+        dict: {表名: 要素数}
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    minx, miny, maxx, maxy = _sample_bounds(source_dir)
+    width, height = (maxx - minx) * 1.05, (maxy - miny) * 1.05
+    columns = math.ceil(math.sqrt(scale))
+
+    counts = {}
+    for layer in DEFAULT_LAYERS:
+        sample = pyogrio.read_dataframe(os.path.join(source_dir, layer['file']), encoding='GBK')
+        copies_per_write = max(WRITE_CHUNK // max(len(sample), 1), 1)
+        path = os.path.join(target_dir, layer['file'])
+        for start in range(0, scale, copies_per_write):
+            copies = []
+            for k in range(start, min(start + copies_per_write, scale)):
+                copy = sample.copy()
+                copy.geometry = shapely.transform(
+                    sample.geometry.values, lambda coords, k=k: coords + [(k % columns) * width, (k // columns) * height]
+                )
+                copies.append(copy)
+            batch = pd.concat(copies, ignore_index=True)
+            if crs is not None:
+                batch = batch.to_crs(crs)
+            pyogrio.write_dataframe(batch, path, encoding=encoding, append=start > 0)
+        counts[layer['table']] = len(sample) * scale
+    return counts
+
+
+def run_import_benchmark(scale, db_url=None, dry_run=False, workers=None, batch_size=None, crs=None,
+                         profile_dir=None, profiler='cprofile', keep_dir=None, source_dir='shp'):
+    """
+    生成放大的数据并导入
+
+    参数:
+        scale: 放大倍数
+        db_url: 数据库URL（dry_run 时不使用）
+        dry_run: 不写入数据库
+        workers: 并行进程数
+        batch_size: 每批要素数（None 表示导入程序的默认值）
+        crs: 放大数据的坐标系
+        profile_dir: 不为 None 时把各图层的 cProfile/pyinstrument 结果写入该目录
+        profiler: 'cprofile' 或 'pyinstrument'
+        keep_dir: 放大后的数据写入该目录并保留（None 表示写入临时目录，结束后删除）
+        source_dir: 示例数据目录
+
+    返回:
+        dict: {'generate_seconds', 'elapsed', 'layers': [各图层统计（含 features_per_s、vertices_per_s）]}
+    """
+    target_dir = keep_dir or tempfile.mkdtemp(prefix='import_bench_')
+    try:
+        t0 = time.perf_counter()
+        counts = scale_shapefiles(source_dir, target_dir, scale, crs)
+        generate_seconds = time.perf_counter() - t0
+        print(f"✓ 已生成放大 {scale} 倍的数据: " + ', '.join(f"{t} {n:,}" for t, n in counts.items())
+              + f"（{generate_seconds:.1f} s，{target_dir}）")
+
+        options = {'batch_size': batch_size} if batch_size else {}
+        started = time.perf_counter()
+        results = run_import(resolve_layers(target_dir), db_url, workers, dry_run=dry_run, profile=True,
+                             profile_dir=profile_dir, profiler=profiler, **options)
+        elapsed = time.perf_counter() - started
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(target_dir, ignore_errors=True)
+
+    for stats in results:
+        total = stats['timings'].get('total') or 0
+        stats['features_per_s'] = round(stats['features'] / total, 1) if total else 0.0
+        stats['vertices_per_s'] = round(stats['vertices'] / total, 1) if total else 0.0
+        stats['timings'] = {stage: round(seconds, 4) for stage, seconds in stats['timings'].items()}
+    return {'generate_seconds': round(generate_seconds, 2), 'elapsed': round(elapsed, 3), 'layers': results}
+
+
+def slowest_stages(results, top=3):
+    """按各图层合计耗时列出最慢的阶段，如 [('encode', 12.3), ...]"""
+    totals = {stage: 0.0 for stage in list(READ_STAGES) + ['copy', 'index']}
+    for stats in results['layers']:
+        for stage in totals:
+            totals[stage] += stats['timings'].get(stage, 0.0)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+并发压测：多个线程按场景的权重循环请求 /api 端点，统计吞吐量、延迟分位数和服务进程内存
+
+每个线程使用独立的 HTTP 连接（服务端支持 keep-alive 时复用），请求序列由 (种子, 线程号) 确定，
+因此同样的参数在不同提交之间发出的请求相同。预热阶段的请求不计入统计。
+"""
+
+import http.client
+import os
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+from benchmarks.synthetic import NAME_CHARS, layer_counts
+
+# 压测场景：[(名称, 权重, 路径模板)]，模板中的 {gid:表名}、{name}、{zoom} 按请求随机替换
+SCENARIOS = {
+    # 地图浏览：按缩放级别加载整个图层（数据量大时单个请求即可能很慢）
+    'browse': [
+        ('villages', 3, '/api/villages'),
+        ('rivers_zoom', 2, '/api/rivers?zoom={zoom}'),
+        ('water_bodies_zoom', 2, '/api/water_bodies?zoom={zoom}'),
+        ('villages_fields', 3, '/api/villages?fields=centroid,name'),
+    ],
+    # 查询：单个要素、名称搜索、地名索引与增量变更（适合大数据量）
+    'lookup': [
+        ('village_by_gid', 4, '/api/villages/{gid:villages}'),
+        ('water_body_by_gid', 3, '/api/water_bodies/{gid:water_bodies}'),
+        ('river_by_gid', 1, '/api/rivers/{gid:rivers}'),
+        ('village_name', 2, '/api/villages?name={name}&fields=centroid,name'),
+        ('index', 1, '/api/index'),
+        ('changes', 1, '/api/changes?since=0&limit=100'),
+    ],
+}
+SCENARIOS['mixed'] = SCENARIOS['browse'] + SCENARIOS['lookup']
+
+ZOOM_LEVELS = (8, 10, 12, 14)
+
+# 服务进程内存采样间隔（秒）
+RSS_INTERVAL = 0.5
+
+
+def _proc_rss(pid):
+    """读取 /proc/<pid>/status 中的 VmRSS（字节）"""
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return 0
+
+
+def _proc_children(pid):
+    """读取 /proc/<pid>/task/*/children，递归列出子进程（如 gunicorn 工作进程）"""
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children', encoding='ascii') as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        return []
+    result = list(children)
+    for child in children:
+        result.extend(_proc_children(child))
+    return result
+
+
+def process_tree_rss(pid):
+    """
+    进程及其全部子进程的常驻内存之和（字节）
+
+    Linux 上读取 /proc，其他平台需要安装 psutil；都不可用时返回 None
+    """
+    if os.path.exists(f'/proc/{pid}'):
+        values = [_proc_rss(p) for p in [pid] + _proc_children(pid)]
+        values = [v for v in values if v is not None]
+        return sum(values) if values else None
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        process = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+    except psutil.Error:
+        return None
+
+
+class RssSampler(threading.Thread):
+    """后台线程：定期采样服务进程内存"""
+
+    def __init__(self, pid, interval=RSS_INTERVAL):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            rss = process_tree_rss(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        rss = process_tree_rss(self.pid)
+        if rss is not None:
+            self.samples.append(rss)
+
+    def summary(self):
+        if not self.samples:
+            return None
+        mb = 1024 * 1024
+        return {
+            'start_mb': round(self.samples[0] / mb, 1),
+            'peak_mb': round(max(self.samples) / mb, 1),
+            'end_mb': round(self.samples[-1] / mb, 1),
+        }
+
+
+class RequestPlan:
+    """按场景权重和数据规模生成确定的请求序列"""
+
+    def __init__(self, scenario, features, seed, worker):
+        self.endpoints = SCENARIOS[scenario]
+        weights = np.array([weight for _, weight, _ in self.endpoints], dtype=float)
+        self.probabilities = weights / weights.sum()
+        self.counts = layer_counts(features)
+        self.rng = np.random.default_rng([seed, worker])
+
+    def next(self):
+        """返回 (端点名称, 路径)"""
+        name, _, template = self.endpoints[self.rng.choice(len(self.endpoints), p=self.probabilities)]
+        path = template
+        for table, count in self.counts.items():
+            path = path.replace(f'{{gid:{table}}}', str(int(self.rng.integers(1, count + 1))))
+        path = path.replace('{zoom}', str(ZOOM_LEVELS[self.rng.integers(0, len(ZOOM_LEVELS))]))
+        path = path.replace('{name}', quote(NAME_CHARS[self.rng.integers(0, len(NAME_CHARS))]))
+        return name, path
+
+
+def _worker(base_url, plan, started, warmup_until, deadline, results, timeout):
+    """单个压测线程：循环请求直到截止时间，记录 (端点, 开始时间, 延迟秒, 状态码, 字节数)"""
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    conn = connection_class(parts.hostname, parts.port, timeout=timeout)
+    prefix = parts.path.rstrip('/')
+    started.wait()
+    try:
+        while True:
+            now = time.perf_counter()
+            if now >= deadline[0]:
+                return
+            name, path = plan.next()
+            status, size = 0, 0
+            t0 = time.perf_counter()
+            try:
+                conn.request('GET', prefix + path, headers={'Accept-Encoding': 'identity'})
+                response = conn.getresponse()
+                size = len(response.read())
+                status = response.status
+                if response.will_close:
+                    conn.close()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+            elapsed = time.perf_counter() - t0
+            if t0 >= warmup_until[0]:
+                results.append((name, t0, elapsed, status, size))
+    finally:
+        conn.close()
+
+
+def summarize(samples, elapsed):
+    """
+    汇总一组请求
+
+    参数:
+        samples: [(端点, 开始时间, 延迟秒, 状态码, 字节数)]
+        elapsed: 统计时长（秒）
+
+    返回:
+        dict: requests、errors、throughput_rps、bytes 与延迟（毫秒）mean/p50/p95/p99/max
+    """
+    if not samples:
+        return {'requests': 0, 'errors': 0, 'throughput_rps': 0.0, 'bytes': 0}
+    latencies = np.array([s[2] for s in samples]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for s in samples if not 200 <= s[3] < 400),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        'bytes': int(sum(s[4] for s in samples)),
+        'latency_ms': {
+            'mean': round(float(latencies.mean()), 2),
+            'p50': round(float(p50), 2),
+            'p95': round(float(p95), 2),
+            'p99': round(float(p99), 2),
+            'max': round(float(latencies.max()), 2),
+        },
+    }
+
+
+def run_load(base_url, scenario='mixed', features=1000, seed=42, concurrency=8, duration=30.0,
+             warmup=5.0, server_pid=None, timeout=120.0):
+    """
+    运行一次压测
+
+    参数:
+        base_url: 服务地址（如 http://127.0.0.1:5000）
+        scenario: 场景名（见 SCENARIOS）
+        features: 数据集总要素数（决定随机 gid 的范围）
+        seed: 随机种子（请求序列）
+        concurrency: 并发线程数
+        duration: 统计时长（秒，不含预热）
+        warmup: 预热时长（秒）
+        server_pid: 服务进程号（用于采样内存，None 表示不采样）
+        timeout: 单个请求超时（秒）
+
+    返回:
+        dict: {'summary': 总体统计, 'endpoints': {端点: 统计}, 'server_rss': 内存采样或 None}
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"未知场景: {scenario}（可选: {', '.join(SCENARIOS)}）")
+    results = []
+    started = threading.Event()
+    # 线程启动后再确定时间窗口（列表便于各线程读取同一个值）
+    warmup_until, deadline = [0.0], [0.0]
+    threads = [
+        threading.Thread(
+            target=_worker, name=f'load-{i}',
+            args=(base_url, RequestPlan(scenario, features, seed, i), started, warmup_until, deadline, results, timeout),
+            daemon=True,
+        )
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+
+    sampler = RssSampler(server_pid) if server_pid else None
+    begin = time.perf_counter()
+    warmup_until[0] = begin + warmup
+    deadline[0] = warmup_until[0] + duration
+    started.set()
+    if sampler:
+        time.sleep(min(warmup, 1.0))
+        sampler.start()
+    for thread in threads:
+        thread.join()
+    if sampler:
+        sampler.stop()
+
+    # 统计窗口：预热结束到最后一个请求完成（慢请求可能超过 duration）
+    end = max([warmup_until[0] + duration] + [s[1] + s[2] for s in results])
+    elapsed = end - warmup_until[0]
+    by_endpoint = {}
+    for sample in results:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    return {
+        'summary': summarize(results, elapsed),
+        'endpoints': {name: summarize(samples, elapsed) for name, samples in sorted(by_endpoint.items())},
+        'server_rss': sampler.summary() if sampler else None,
+    }
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+转换层微基准：gdf_to_geojson、geojson_to_gdf、feature_to_gdf、validate_and_fix_geometry，
+以及 API 读写使用的轻量要素记录（feature_collection_json、parse_geometry）
+
+输入数据由 benchmarks.synthetic 按固定种子和规模生成，每个用例:
+    - 先预热一次，再确定每个样本的调用次数（number），使一个样本至少耗时 MIN_SAMPLE_MS
+    - 所有用例轮流计时 rounds 轮（一次干扰只影响每个用例的一轮），每轮 repeat 个样本取最小值；
+      记录各轮最小值的中位数 median_ms、最小值 min_ms 和极差 spread_ms（单次调用，毫秒）
+    - 另外在 tracemalloc 下运行一次，记录峰值分配（KB，不计入耗时）
+计时期间关闭垃圾回收。结果与保存的基准（benchmarks/baselines/micro.json）比较: median_ms 超过
+基准的 (1 + threshold) 倍再加上两次运行中较大的极差（同一台机器上不同进程之间的波动），或峰值分配
+超过基准的 (1 + threshold) 倍时视为退化。被测函数的调试输出在计时期间丢弃。
+"""
+
+import contextlib
+import copy
+import gc
+import math
+import os
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.synthetic import dataset_extent, generate_chunk
+
+MICRO_SEED = 20240601
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'micro.json')
+
+# 低于该耗时（毫秒）的差异视为计时噪声，不判定为退化
+MIN_TIME_DELTA_MS = 0.05
+
+# 每个计时样本的最短耗时（毫秒），耗时短的用例在一个样本中调用多次
+MIN_SAMPLE_MS = 100
+
+# 自相交的“8”字形面（make_valid 修复为 MultiPolygon）
+BOWTIE = {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]}
+
+
+def _layer(table, count):
+    return generate_chunk(table, 0, count, MICRO_SEED, dataset_extent(count))
+
+
+def _feature_collection(table, count):
+    import json
+    return json.loads(_layer(table, count).to_json())
+
+
+def _single_feature(table):
+    feature = _feature_collection(table, 1)['features'][0]
+    feature.pop('id', None)
+    return feature
+
+
+def _records(table, count):
+    """模拟查询结果构建要素记录（几何为 GeoJSON 文本，与 ST_AsGeoJSON 的输出相同）"""
+    import shapely
+    from backend.utils.features import records_from_rows
+    gdf = _layer(table, count)
+    gdf.insert(0, 'gid', range(1, len(gdf) + 1))
+    gdf['status'] = 1
+    columns = [col for col in gdf.columns if col != 'geometry'] + ['geometry']
+    values = gdf[columns[:-1]].astype(object).where(gdf[columns[:-1]].notna(), None).values.tolist()
+    geometries = shapely.to_geojson(gdf.geometry.values).tolist()
+    return records_from_rows(columns, [tuple(row) + (geom,) for row, geom in zip(values, geometries)])
+
+
+def build_cases():
+    """
+    微基准用例
+
+    返回:
+        list: [(名称, 准备函数)]，准备函数返回 (被测函数, 每次调用的操作数)；数据在准备函数中生成，不计入耗时
+    """
+    from backend.utils.features import feature_collection_json, parse_geometry
+    from backend.utils.geojson import feature_to_gdf, gdf_to_geojson, geojson_to_gdf, validate_and_fix_geometry
+
+    def to_geojson(table, count):
+        def setup():
+            gdf = _layer(table, count)
+            return (lambda: gdf_to_geojson(gdf)), count
+        return setup
+
+    def records_to_json(table, count):
+        def setup():
+            records = _records(table, count)
+            return (lambda: feature_collection_json(records)), count
+        return setup
+
+    def from_geojson(table, count):
+        def setup():
+            collection = _feature_collection(table, count)
+            return (lambda: geojson_to_gdf(collection)), count
+        return setup
+
+    def single(func, feature, calls=500):
+        def setup():
+            # 每次调用使用独立的副本，避免被测函数修改输入后影响后续调用
+            features = [copy.deepcopy(feature() if callable(feature) else feature) for _ in range(calls)]
+
+            def run():
+                for item in features:
+                    func(item)
+            return run, calls
+        return setup
+
+    cases = []
+    for table, count in (('villages', 1_000), ('villages', 10_000), ('rivers', 1_000), ('water_bodies', 1_000)):
+        cases.append((f'gdf_to_geojson[{table}-{count}]', to_geojson(table, count)))
+    for table, count in (('villages', 1_000), ('villages', 10_000), ('rivers', 1_000), ('water_bodies', 1_000)):
+        cases.append((f'feature_collection_json[{table}-{count}]', records_to_json(table, count)))
+    for table, count in (('villages', 1_000), ('villages', 10_000), ('water_bodies', 1_000)):
+        cases.append((f'geojson_to_gdf[{table}-{count}]', from_geojson(table, count)))
+    for table in ('villages', 'rivers', 'water_bodies'):
+        cases.append((f'feature_to_gdf[{table}]', single(feature_to_gdf, lambda table=table: _single_feature(table), 100)))
+    for table in ('villages', 'rivers', 'water_bodies'):
+        cases.append((f'parse_geometry[{table}]',
+                      single(parse_geometry, lambda table=table: _single_feature(table)['geometry'], 100)))
+    cases.append(('validate_and_fix_geometry[valid]',
+                  single(validate_and_fix_geometry, lambda: _single_feature('water_bodies'))))
+    cases.append(('validate_and_fix_geometry[repair]',
+                  single(validate_and_fix_geometry, {'type': 'Feature', 'properties': {}, 'geometry': BOWTIE})))
+    return cases
+
+
+@contextlib.contextmanager
+def _quiet():
+    """丢弃被测函数的调试输出，并在计时期间关闭垃圾回收"""
+    enabled = gc.isenabled()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        gc.disable()
+        try:
+            yield
+        finally:
+            if enabled:
+                gc.enable()
+
+
+def _sample(func, number):
+    """一个计时样本：连续调用 number 次，返回单次调用的耗时（毫秒）"""
+    t0 = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - t0) * 1000 / number
+
+
+def calibrate(func):
+    """预热一次，返回使一个样本至少耗时 MIN_SAMPLE_MS 的调用次数"""
+    func()
+    elapsed = _sample(func, 1)
+    return max(1, math.ceil(MIN_SAMPLE_MS / max(elapsed, 1e-3)))
+
+
+def measure(func, repeat, number):
+    """
+    一轮计时
+
+    返回:
+        float: repeat 个样本中单次调用的最小耗时（毫秒）
+    """
+    return min(_sample(func, number) for _ in range(repeat))
+
+
+def peak_allocation(func):
+    """在 tracemalloc 下调用一次，返回峰值分配（KB）"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def run_micro(repeat=3, pattern=None, rounds=5):
+    """
+    运行微基准（所有用例的数据先准备好，再轮流计时 rounds 轮）
+
+    参数:
+        repeat: 每轮每个用例的样本数
+        pattern: 只运行名称包含该字符串的用例
+        rounds: 轮数
+
+    返回:
+        dict: {名称: {'median_ms', 'min_ms', 'spread_ms', 'peak_kb', 'ops', 'number', 'per_op_us'}}
+    """
+    prepared = []
+    for name, setup in build_cases():
+        if pattern and pattern not in name:
+            continue
+        func, ops = setup()
+        with _quiet():
+            number = calibrate(func)
+        prepared.append((name, func, ops, number))
+
+    round_times = {name: [] for name, *_ in prepared}
+    for i in range(rounds):
+        print(f"  第 {i + 1}/{rounds} 轮...")
+        for name, func, ops, number in prepared:
+            with _quiet():
+                round_times[name].append(measure(func, repeat, number))
+
+    results = {}
+    for name, func, ops, number in prepared:
+        times = round_times[name]
+        with _quiet():
+            peak_kb = peak_allocation(func)
+        result = {
+            'median_ms': round(statistics.median(times), 4),
+            'min_ms': round(min(times), 4),
+            'spread_ms': round(max(times) - min(times), 4),
+            'peak_kb': peak_kb,
+            'ops': ops,
+            'number': number,
+        }
+        result['per_op_us'] = round(result['median_ms'] * 1000 / ops, 3)
+        results[name] = result
+        print(f"  {name:<40}{result['median_ms']:>12.3f} ms ±{result['spread_ms']:<9.3f}"
+              f"{result['per_op_us']:>12.3f} us/op{result['peak_kb']:>12.1f} KB")
+    return results
+
+
+def find_regressions(results, baseline, threshold=0.25):
+    """
+    与基准比较
+
+    参数:
+        results: run_micro 的结果
+        baseline: 基准结果（同样的结构）
+        threshold: 允许的相对增幅（0.25 表示 25%）
+
+    返回:
+        list: 退化说明（用例不在基准中时忽略）
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        # 允许的波动: 两次运行中较大的轮间极差（旧基准没有 spread_ms 时按 0 计）
+        noise = max(base.get('spread_ms', 0), result.get('spread_ms', 0), MIN_TIME_DELTA_MS)
+        limit = base['median_ms'] * (1 + threshold) + noise
+        if result['median_ms'] > limit:
+            regressions.append(f"{name}: 耗时 {base['median_ms']:.3f} -> {result['median_ms']:.3f} ms "
+                               f"(+{(result['median_ms'] / base['median_ms'] - 1) * 100:.0f}%，"
+                               f"允许 {limit:.3f} ms)")
+        if base['peak_kb'] and result['peak_kb'] > base['peak_kb'] * (1 + threshold):
+            regressions.append(f"{name}: 峰值分配 {base['peak_kb']:.1f} -> {result['peak_kb']:.1f} KB "
+                               f"(+{(result['peak_kb'] / base['peak_kb'] - 1) * 100:.0f}%)")
+    return regressions
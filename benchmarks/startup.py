@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+API 冷启动基准：在新的解释器进程中导入 backend.app 并创建应用，重复多次取中位数
+
+每次运行记录:
+    wall_s        子进程总耗时（含解释器启动）
+    import_s      import backend.app 的耗时
+    create_app_s  create_app() 的耗时
+    heavy         创建应用后已加载的重量级模块（geopandas、pandas 等，冷启动时应为空）
+eager 模式在导入应用前先导入 geopandas / shapely / pyproj，作为“启动时加载全部依赖”的对照。
+另外用 -X importtime 运行一次，列出累计耗时最多的模块（顶层导入及其直接导入）。
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('geopandas', 'pandas', 'numpy', 'shapely', 'pyproj', 'pyogrio')
+
+_SNIPPET = """
+import json, sys, time
+t0 = time.perf_counter()
+if {eager!r}:
+    import geopandas, shapely, pyproj
+t1 = time.perf_counter()
+import backend.app
+t2 = time.perf_counter()
+backend.app.create_app()
+t3 = time.perf_counter()
+print(json.dumps({{'eager_s': t1 - t0, 'import_s': t2 - t1, 'create_app_s': t3 - t2,
+                   'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_once(eager=False, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + \
+        ['-c', _SNIPPET.format(eager=eager, heavy=HEAVY_MODULES)]
+    t0 = time.perf_counter()
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['wall_s'] = wall
+    return result, completed.stderr
+
+
+def top_imports(stderr, top=10):
+    """解析 -X importtime 输出，返回累计耗时最多的模块（顶层导入及其直接导入）[(模块, 毫秒)]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(parts[1].strip())
+        except ValueError:
+            continue
+        name = parts[2].rstrip()
+        # 每层缩进 2 个空格：顶层为 1 个空格，其直接导入为 3 个空格
+        if len(name) - len(name.lstrip(' ')) <= 3:
+            entries.append((name.strip(), round(cumulative / 1000, 1)))
+    return sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]
+
+
+def run_startup(repeat=10, eager=False):
+    """
+    运行冷启动基准
+
+    参数:
+        repeat: 重复次数
+        eager: 先导入 geopandas / shapely / pyproj（对照）
+
+    返回:
+        dict: 各项耗时的中位数与最小值（秒）、heavy 模块、耗时最多的导入
+    """
+    runs = [_run_once(eager)[0] for _ in range(repeat)]
+    summary = {}
+    for key in ('wall_s', 'eager_s', 'import_s', 'create_app_s'):
+        values = [run[key] for run in runs]
+        summary[key] = {'median': round(statistics.median(values), 4), 'min': round(min(values), 4)}
+    _, stderr = _run_once(eager, importtime=True)
+    return {
+        'mode': 'eager' if eager else 'lazy',
+        'repeat': repeat,
+        'timings': summary,
+        'heavy': runs[-1]['heavy'],
+        'top_imports_ms': top_imports(stderr),
+    }
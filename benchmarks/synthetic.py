@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+合成测试数据：按 shp/ 示例数据的分布生成任意规模的村庄、河渠、水系
+
+示例数据（84 个村庄点、5 条河渠、56 个水系面）的统计特征:
+    - 三个图层的要素数比例 84 : 5 : 56
+    - 河渠 22~148 个顶点（中位数 81），约 40% 为 MultiLineString，外包框宽度中位数约 0.15°
+    - 水系 4~462 个顶点（中位数 26，95% 分位 181），外包框宽度中位数约 0.003°
+    - 属性字段、编码取值及空值比例与示例数据相同（code/fclass 成对出现）
+数据范围以示例数据的中心为中心，按要素数放大以保持相近的密度（上限约 40° x 25°）。
+
+生成过程只依赖随机种子：每个图层按固定大小的块生成，块的随机数发生器由 (种子, 图层, 块号)
+确定，因此相同的种子和规模在任何机器上生成完全相同的数据，与读取方式无关。
+"""
+
+import math
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+# 每块生成的要素数（决定随机数流的划分，修改后生成的数据会变化）
+GENERATOR_CHUNK = 10_000
+
+# 示例数据各图层的要素数（用于按比例分配）
+SAMPLE_COUNTS = {'villages': 84, 'rivers': 5, 'water_bodies': 56}
+
+# 示例数据范围（WGS84）
+SAMPLE_EXTENT = (110.89, 35.0, 111.18, 35.23)
+
+# 数据范围上限（度）
+MAX_EXTENT_SIZE = (40.0, 25.0)
+
+# 顶点数分布：累计概率 -> 顶点数（按示例数据的分位数插值）
+VERTEX_QUANTILES = {
+    'rivers': ([0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0], [22, 23, 25, 81, 140, 146, 148]),
+    'water_bodies': ([0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0], [4, 6, 15, 26, 46, 181, 462]),
+}
+
+# 河渠中 MultiLineString 的比例
+MULTI_LINE_RATIO = 0.4
+
+# (code, fclass, 概率)
+VILLAGE_CLASSES = [(1003, 'village', 0.595), (0, None, 0.345), (1004, 'hamlet', 0.036), (1050, 'locality', 0.024)]
+WATER_CLASSES = [(8200, 'water', 0.77), (0, None, 0.125), (8201, 'reservoir', 0.09), (8221, 'wetland', 0.015)]
+
+NAME_CHARS = list('张李王陶薛阳苦安东西南北上下新古柳杨马刘高河池坡沟岭头营口家堡')
+VILLAGE_SUFFIXES = ['村', '庄', '', '屯', '寨', '堡']
+RIVER_SUFFIXES = ['河', '渠', '沟', '干渠']
+WATER_SUFFIXES = ['水库', '湖', '池', '塘']
+
+LAYER_SEEDS = {'villages': 1, 'rivers': 2, 'water_bodies': 3}
+
+
+def layer_counts(features):
+    """
+    按示例数据的比例把总要素数分配到各图层（每个图层至少 1 个）
+
+    返回:
+        dict: {表名: 要素数}
+    """
+    total = sum(SAMPLE_COUNTS.values())
+    counts = {table: max(features * count // total, 1) for table, count in SAMPLE_COUNTS.items()}
+    counts['villages'] = max(features - counts['rivers'] - counts['water_bodies'], 1)
+    return counts
+
+
+def dataset_extent(features):
+    """
+    数据范围：示例范围按 sqrt(要素数 / 示例要素数) 放大，保持相近的要素密度
+
+    返回:
+        (minx, miny, maxx, maxy)
+    """
+    minx, miny, maxx, maxy = SAMPLE_EXTENT
+    factor = math.sqrt(max(features, 1) / sum(SAMPLE_COUNTS.values()))
+    width = min((maxx - minx) * factor, MAX_EXTENT_SIZE[0])
+    height = min((maxy - miny) * factor, MAX_EXTENT_SIZE[1])
+    cx, cy = (minx + maxx) / 2, (miny + maxy) / 2
+    return (cx - width / 2, cy - height / 2, cx + width / 2, cy + height / 2)
+
+
+def _chunk_rng(seed, table, chunk):
+    return np.random.default_rng([seed, LAYER_SEEDS[table], chunk])
+
+
+def _grouped_cumsum(values, counts):
+    """按组（连续的 counts 个元素）分别累加"""
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    total = np.cumsum(values)
+    return total - np.repeat(total[offsets] - values[offsets], counts)
+
+
+def _sample_vertices(rng, table, n):
+    quantiles, vertices = VERTEX_QUANTILES[table]
+    return np.rint(np.interp(rng.random(n), quantiles, vertices)).astype(np.int64)
+
+
+def _uniform_points(rng, n, extent):
+    minx, miny, maxx, maxy = extent
+    return rng.uniform(minx, maxx, n), rng.uniform(miny, maxy, n)
+
+
+def _names(rng, n, suffixes, missing_ratio):
+    """随机中文名称（两个字 + 后缀），按比例置空"""
+    chars = np.array(NAME_CHARS, dtype=object)
+    names = chars[rng.integers(0, len(chars), n)] + chars[rng.integers(0, len(chars), n)]
+    names = names + np.array(suffixes, dtype=object)[rng.integers(0, len(suffixes), n)]
+    names[rng.random(n) < missing_ratio] = None
+    return names
+
+
+def _osm_ids(rng, n, base, start, missing_ratio):
+    ids = np.array([str(base + start + i) for i in range(n)], dtype=object)
+    ids[rng.random(n) < missing_ratio] = None
+    return ids
+
+
+def _classes(rng, n, classes):
+    codes = np.array([code for code, _, _ in classes])
+    fclasses = np.array([fclass for _, fclass, _ in classes], dtype=object)
+    choice = rng.choice(len(classes), size=n, p=[p for _, _, p in classes])
+    return codes[choice], fclasses[choice]
+
+
+def _villages(rng, n, start, extent):
+    """村庄点：成簇分布（每簇约 50 个点）"""
+    clusters = max(n // 50, 1)
+    cx, cy = _uniform_points(rng, clusters, extent)
+    member = rng.integers(0, clusters, n)
+    x = np.clip(cx[member] + rng.normal(0, 0.02, n), extent[0], extent[2])
+    y = np.clip(cy[member] + rng.normal(0, 0.02, n), extent[1], extent[3])
+    code, fclass = _classes(rng, n, VILLAGE_CLASSES)
+    population = np.where(rng.random(n) < 0.8, 0, np.rint(rng.lognormal(6.5, 0.8, n))).astype(np.int64)
+    return {
+        'osm_id': _osm_ids(rng, n, 4_000_000_000, start, 0.345),
+        'code': code,
+        'fclass': fclass,
+        'population': population,
+        'name': _names(rng, n, VILLAGE_SUFFIXES, 0.0),
+    }, shapely.points(x, y)
+
+
+def _random_walks(rng, vertices, sizes, x0, y0):
+    """随机游走折线：每条线的总长度约为 size，方向缓慢偏转"""
+    total = int(vertices.sum())
+    heading = np.repeat(rng.uniform(0, 2 * np.pi, len(vertices)), vertices)
+    heading = heading + _grouped_cumsum(rng.normal(0, 0.25, total), vertices)
+    step = np.repeat(sizes / np.maximum(vertices - 1, 1), vertices)
+    first = np.concatenate([[0], np.cumsum(vertices)[:-1]])
+    dx, dy = step * np.cos(heading), step * np.sin(heading)
+    dx[first] = 0.0
+    dy[first] = 0.0
+    x = np.repeat(x0, vertices) + _grouped_cumsum(dx, vertices)
+    y = np.repeat(y0, vertices) + _grouped_cumsum(dy, vertices)
+    return shapely.linestrings(np.column_stack([x, y]), indices=np.repeat(np.arange(len(vertices)), vertices))
+
+
+def _rivers(rng, n, start, extent):
+    """河渠：随机游走折线，部分为两段组成的 MultiLineString"""
+    vertices = _sample_vertices(rng, 'rivers', n)
+    sizes = np.clip(rng.lognormal(math.log(0.1), 0.8, n), 0.002, 0.3)
+    x0, y0 = _uniform_points(rng, n, extent)
+
+    parts_per = np.where(rng.random(n) < MULTI_LINE_RATIO, 2, 1)
+    part_feature = np.repeat(np.arange(n), parts_per)
+    part_sizes = sizes[part_feature] / parts_per[part_feature]
+    offsets = rng.uniform(-0.5, 0.5, (len(part_feature), 2)) * part_sizes[:, None] * (parts_per[part_feature] > 1)[:, None]
+    parts = _random_walks(
+        rng, np.maximum(vertices[part_feature] // parts_per[part_feature], 2), part_sizes,
+        x0[part_feature] + offsets[:, 0], y0[part_feature] + offsets[:, 1],
+    )
+
+    geometries = np.empty(n, dtype=object)
+    single = parts_per[part_feature] == 1
+    geometries[part_feature[single]] = parts[single]
+    if (~single).any():
+        features, inverse = np.unique(part_feature[~single], return_inverse=True)
+        geometries[features] = shapely.multilinestrings(parts[~single], indices=inverse)
+    return {'name': _names(rng, n, RIVER_SUFFIXES, 0.2)}, geometries
+
+
+def _water_bodies(rng, n, start, extent):
+    """水系面：以随机点为中心的星形多边形（角度单调递增，保证是简单多边形）"""
+    distinct = np.maximum(_sample_vertices(rng, 'water_bodies', n) - 1, 3)
+    radius = np.clip(rng.lognormal(math.log(0.0014), 1.2, n), 0.0002, 0.05)
+    cx, cy = _uniform_points(rng, n, extent)
+
+    total = int(distinct.sum())
+    index = np.arange(total) - np.repeat(np.concatenate([[0], np.cumsum(distinct)[:-1]]), distinct)
+    angle = (index + rng.uniform(-0.4, 0.4, total)) / np.repeat(distinct, distinct) * 2 * np.pi
+    r = np.repeat(radius, distinct) * (1 + 0.25 * rng.uniform(-1, 1, total))
+    x = np.repeat(cx, distinct) + r * np.cos(angle)
+    y = np.repeat(cy, distinct) + r * np.sin(angle)
+    rings = shapely.linearrings(np.column_stack([x, y]), indices=np.repeat(np.arange(n), distinct))
+
+    code, fclass = _classes(rng, n, WATER_CLASSES)
+    return {
+        'osm_id': _osm_ids(rng, n, 200_000_000, start, 0.34),
+        'code': code,
+        'fclass': fclass,
+        'name': _names(rng, n, WATER_SUFFIXES, 0.79),
+    }, shapely.polygons(rings)
+
+
+_GENERATORS = {'villages': _villages, 'rivers': _rivers, 'water_bodies': _water_bodies}
+
+
+def generate_chunk(table, chunk, count, seed, extent):
+    """
+    生成图层的第 chunk 块（GENERATOR_CHUNK 个要素，最后一块可能更少）
+
+    参数:
+        table: 表名（villages / rivers / water_bodies）
+        chunk: 块号（从 0 开始）
+        count: 图层总要素数
+        seed: 随机种子
+        extent: 数据范围
+
+    返回:
+        GeoDataFrame（EPSG:4326）
+    """
+    start = chunk * GENERATOR_CHUNK
+    n = min(GENERATOR_CHUNK, count - start)
+    columns, geometries = _GENERATORS[table](_chunk_rng(seed, table, chunk), n, start, extent)
+    return gpd.GeoDataFrame(pd.DataFrame(columns), geometry=gpd.GeoSeries(geometries), crs='EPSG:4326')
+
+
+def iter_layer_batches(table, count, seed, extent):
+    """按块依次生成图层的全部要素"""
+    for chunk in range(math.ceil(count / GENERATOR_CHUNK)):
+        yield generate_chunk(table, chunk, count, seed, extent)
@@ -37,6 +37,12 @@ MAP_CONFIG = {
     'width': '100%',
     'height': '100%',
     'prefer_canvas': False,
+    # 线、面几何按缩放级别做保拓扑简化（容差按 初始缩放级别 + 偏移 计算，放大若干级后仍无明显失真）
+    'simplify_by_zoom': True,
+    'simplify_zoom_offset': 3,
+    # 只加载该范围（WGS84经纬度 minx, miny, maxx, maxy）内的要素，例如某个乡镇的范围；None 表示全部
+    # 通过 Shapefile 的 .sbn/.sbx 空间索引定位记录，只读取命中的要素
+    'bbox': None,
 }
 
 # 底图选项（可选，用于图层切换）
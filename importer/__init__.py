@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Shapefile 导入 PostgreSQL + PostGIS 的批量导入模块
+
+使用二进制 COPY 流式写入、多进程并行导入各图层，
+导入后统一创建空间索引并执行 ANALYZE。
+
+用法:
+    python -m importer --base-path shp --workers 3
+"""
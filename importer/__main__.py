@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+命令行入口：python -m importer
+"""
+
+import sys
+
+from importer.cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+导入命令行：并行导入所有图层并输出吞吐量报告
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from backend.config import get_database_url
+from importer.loader import READ_STAGES, import_layer
+from importer.reader import DEFAULT_BATCH_SIZE, DEFAULT_ENCODINGS, parse_bbox
+from importer.sync import sync_layer
+
+# 默认导入的图层（Shapefile文件名 -> 表名）
+# key: 增量同步时用于原地更新的源数据标识字段（只对非空且唯一的值生效）
+DEFAULT_LAYERS = [
+    {'file': '点_村.shp', 'table': 'villages', 'name': '村庄（点）', 'key': 'osm_id'},
+    {'file': '线_河渠.shp', 'table': 'rivers', 'name': '河渠（线）', 'key': None},
+    {'file': '面_水系.shp', 'table': 'water_bodies', 'name': '水系（面）', 'key': 'osm_id'},
+]
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog='python -m importer',
+        description='Shapefile 导入 PostgreSQL + PostGIS（二进制COPY，多进程并行）'
+    )
+    parser.add_argument('--base-path', default='shp示例', help='Shapefile 所在目录（默认: shp示例）')
+    parser.add_argument('--db-url', default=None, help='数据库连接URL（默认使用 backend/config.py 配置）')
+    parser.add_argument('--layers', nargs='+', choices=[layer['table'] for layer in DEFAULT_LAYERS],
+                        help='只导入指定的表（默认全部）')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认: 图层数与CPU数的较小值）')
+    parser.add_argument('--encoding', action='append', dest='encodings',
+                        help=f"Shapefile 属性编码，可重复指定（默认依次尝试: {', '.join(DEFAULT_ENCODINGS)}）")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'每批读取并写入的要素数，决定峰值内存（默认: {DEFAULT_BATCH_SIZE}）')
+    parser.add_argument('--mode', choices=['replace', 'sync'], default='replace',
+                        help='replace: 删除并重建表; sync: 按要素指纹增量同步，保留gid和status（默认: replace）')
+    parser.add_argument('--adopt-existing', action='store_true',
+                        help='sync 模式下为没有指纹的旧数据按属性与几何补写指纹（旧表首次增量同步时使用）')
+    parser.add_argument('--bbox', type=parse_bbox, default=None, metavar='MINX,MINY,MAXX,MAXY',
+                        help='只导入与该范围（WGS84经纬度）相交的要素，通过 .sbn/.sbx 空间索引定位记录')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='试运行：照常读取、重投影、校验和编码，COPY 数据直接丢弃（不连接数据库）')
+    parser.add_argument('--profile', action='store_true',
+                        help='输出各阶段耗时、要素/秒、顶点/秒和内存峰值（每个图层在独立进程中导入）')
+    parser.add_argument('--profile-dir', default=None,
+                        help='把每个图层的分析结果写入该目录（cProfile: <表名>.prof，pyinstrument: <表名>.html）')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile',
+                        help='--profile-dir 使用的分析器（默认: cprofile；pyinstrument 需另行安装）')
+    return parser
+
+
+def profiled(task, profile_dir, profiler, layer, *args):
+    """
+    在分析器下执行导入任务（在工作进程中执行）
+
+    cProfile 结果写入 <profile_dir>/<表名>.prof（可用 python -m pstats 或 snakeviz 查看），
+    pyinstrument 结果写入 <profile_dir>/<表名>.html
+    """
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, layer['table'])
+    if profiler == 'pyinstrument':
+        from pyinstrument import Profiler
+        sampler = Profiler()
+        sampler.start()
+        try:
+            return task(layer, *args)
+        finally:
+            sampler.stop()
+            with open(path + '.html', 'w', encoding='utf-8') as f:
+                f.write(sampler.output_html())
+
+    import cProfile
+    sampler = cProfile.Profile()
+    try:
+        return sampler.runcall(task, layer, *args)
+    finally:
+        sampler.dump_stats(path + '.prof')
+
+
+def resolve_layers(base_path, tables=None, bbox=None):
+    """根据目录、表名过滤和导入范围生成图层定义列表"""
+    layers = []
+    for layer in DEFAULT_LAYERS:
+        if tables and layer['table'] not in tables:
+            continue
+        layers.append({
+            'path': os.path.join(base_path, layer['file']),
+            'table': layer['table'],
+            'name': layer['name'],
+            'key': layer['key'],
+            'bbox': bbox,
+        })
+    return layers
+
+
+def run_import(layers, db_url, workers=None, encodings=None, batch_size=DEFAULT_BATCH_SIZE,
+               mode='replace', adopt_existing=False, dry_run=False, profile=False, profile_dir=None,
+               profiler='cprofile'):
+    """
+    并行导入图层
+
+    参数:
+        layers: 图层定义列表
+        db_url: 数据库连接URL
+        workers: 并行进程数
+        encodings: 候选编码列表
+        batch_size: 每批要素数
+        mode: 'replace'（全量重建）或 'sync'（增量同步）
+        adopt_existing: sync 模式下是否为旧数据补写指纹
+        dry_run: 试运行，不写入数据库（只支持 replace 模式）
+        profile: 每个图层在新的工作进程中导入，使内存峰值只反映该图层
+        profile_dir: 不为 None 时在分析器下导入，结果写入该目录
+        profiler: 'cprofile' 或 'pyinstrument'
+
+    返回:
+        list: 各图层的导入统计
+    """
+    if mode == 'sync':
+        task, extra = sync_layer, (encodings, batch_size, adopt_existing)
+    else:
+        task, extra = partial(import_layer, dry_run=dry_run), (encodings, batch_size)
+    if profile_dir:
+        task = partial(profiled, task, profile_dir, profiler)
+
+    workers = workers or min(len(layers), os.cpu_count() or 1)
+    if workers <= 1 and not profile:
+        return [task(layer, db_url, *extra) for layer in layers]
+
+    pool_options = {'max_tasks_per_child': 1} if profile else {}
+    with ProcessPoolExecutor(max_workers=workers, **pool_options) as executor:
+        futures = [executor.submit(task, layer, db_url, *extra) for layer in layers]
+        return [future.result() for future in futures]
+
+
+def print_report(results, elapsed):
+    """输出导入报告（要素数、耗时、吞吐量）"""
+    print("\n" + "=" * 70)
+    print(f"{'图层':<14}{'要素数':>10}{'读取(s)':>10}{'COPY(s)':>10}{'索引(s)':>10}{'要素/秒':>12}")
+    print("-" * 70)
+    total_features = 0
+    for stats in results:
+        if 'error' in stats:
+            print(f"{stats['table']:<16}[错误] {stats['error'].splitlines()[0]}")
+            continue
+        timings = stats['timings']
+        rate = stats['features'] / timings['total'] if timings['total'] > 0 else 0
+        total_features += stats['features']
+        read = sum(timings[stage] for stage in READ_STAGES)
+        print(f"{stats['table']:<16}{stats['features']:>10}{read:>10.2f}"
+              f"{timings['copy']:>10.2f}{timings['index']:>10.2f}{rate:>12.0f}")
+    print("-" * 70)
+    for stats in results:
+        if 'error' not in stats and 'unchanged' in stats:
+            print(f"{stats['table']:<16}增量: 未变 {stats['unchanged']}, 更新 {stats['updated']}, "
+                  f"新增 {stats['inserted']}, 软删除 {stats['deleted']}"
+                  + (f", 补写指纹 {stats['adopted']}" if 'adopted' in stats else ''))
+    for stats in results:
+        if 'error' not in stats and (stats['repaired'] or stats['invalid']):
+            print(f"{stats['table']:<16}几何: 已修复 {stats['repaired']}, 无法修复 {stats['invalid']}（按原样导入）")
+    overall_rate = total_features / elapsed if elapsed > 0 else 0
+    print(f"合计: {total_features} 个要素, 用时 {elapsed:.2f} 秒, {overall_rate:.0f} 要素/秒")
+    print("=" * 70)
+
+
+def print_profile(results):
+    """输出各图层分阶段耗时（秒与占比）、吞吐量和内存峰值"""
+    stages = list(READ_STAGES) + ['copy', 'index']
+    print("\n分阶段耗时（秒 / 占总耗时）:")
+    print(f"{'图层':<14}" + ''.join(f"{stage:>16}" for stage in stages))
+    for stats in results:
+        if 'error' in stats:
+            continue
+        timings = stats['timings']
+        total = timings['total'] or 1
+        print(f"{stats['table']:<16}" + ''.join(
+            f"{timings[stage]:>9.2f} {timings[stage] / total * 100:>5.1f}%" for stage in stages))
+    print(f"\n{'图层':<14}{'要素/秒':>12}{'顶点/秒':>14}{'COPY(MB)':>12}{'内存峰值(MB)':>16}")
+    for stats in results:
+        if 'error' in stats:
+            continue
+        total = stats['timings']['total']
+        rss = stats.get('peak_rss_mb')
+        print(f"{stats['table']:<16}{stats['features'] / total if total else 0:>12.0f}"
+              f"{stats['vertices'] / total if total else 0:>14.0f}{stats['bytes'] / 1024 / 1024:>12.1f}"
+              f"{rss if rss is not None else 'n/a':>16}")
+
+
+def main(argv=None):
+    """主函数"""
+    # 修复Windows控制台编码问题
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except Exception:
+            pass
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.bbox and args.mode == 'sync':
+        # 增量同步会软删除源数据中不存在的要素，只同步部分范围会误删范围外的数据
+        parser.error('--bbox 不能与 --mode sync 同时使用')
+    if args.dry_run and args.mode == 'sync':
+        parser.error('--dry-run 只支持 --mode replace')
+    if args.profile_dir and args.profiler == 'pyinstrument':
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            parser.error('未安装 pyinstrument（pip install pyinstrument），或使用 --profiler cprofile')
+    db_url = args.db_url or get_database_url()
+    layers = resolve_layers(args.base_path, args.layers, args.bbox)
+
+    print("=" * 70)
+    print(f"Shapefile 导入 PostgreSQL + PostGIS（二进制COPY，模式: {args.mode}"
+          + ("，试运行不写入数据库" if args.dry_run else '') + "）")
+    print("=" * 70)
+    for layer in layers:
+        print(f"  {layer['name']}: {layer['path']} -> public.{layer['table']}")
+    if args.bbox:
+        print(f"  导入范围: {args.bbox}")
+
+    started = time.perf_counter()
+    results = run_import(layers, db_url, args.workers, args.encodings, args.batch_size,
+                         args.mode, args.adopt_existing, args.dry_run, args.profile or bool(args.profile_dir),
+                         args.profile_dir, args.profiler)
+    print_report(results, time.perf_counter() - started)
+    if args.profile or args.profile_dir:
+        print_profile(results)
+        if args.profile_dir:
+            print(f"分析结果已保存到: {args.profile_dir}")
+
+    failed = [stats for stats in results if 'error' in stats]
+    return 1 if failed else 0
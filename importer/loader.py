@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+单图层导入：读取 Shapefile -> 重投影 -> 二进制 COPY -> 建索引 -> ANALYZE
+
+每个图层在独立进程中运行（见 importer.cli），因此这里的函数只接收可序列化参数，
+在进程内自行创建数据库连接。
+"""
+
+import os
+import time
+
+import shapely
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.pool import NullPool
+
+from backend.utils.changes import XID_COLUMN, ensure_change_tracking, rev_column_defs, sequence_sql
+from backend.utils.crs import STORAGE_SRID, to_srid
+from backend.utils.db import refresh_derived_columns
+from backend.utils.geojson import GEOMETRY_INVALID, GEOMETRY_REPAIRED, validate_and_fix_gdf
+from backend.utils.measures import get_measure_column_types
+from backend.utils.simplify import get_simplify_columns
+from importer.pgcopy import CopyStream, encode_rows, get_schema_columns
+from importer.reader import (
+    DEFAULT_BATCH_SIZE, detect_encoding, iter_shapefile_batches, read_layer_info, select_features,
+)
+
+# 源要素指纹列（属性 + WKB 的 MD5），增量同步时据此判断要素是否变化
+HASH_COLUMN = 'src_hash'
+
+# 导入程序自行维护的列，源数据中的同名字段会被忽略
+RESERVED_COLUMNS = {'gid', 'status', HASH_COLUMN, 'rev', 'updated_at', XID_COLUMN}
+
+TARGET_SRID = STORAGE_SRID
+
+# 读取侧的阶段（在 COPY 流的生成器中执行）；copy 为写入数据库的时间，index 为刷新派生列、建索引和 ANALYZE
+READ_STAGES = ('detect', 'read', 'reproject', 'validate', 'encode')
+
+# 试运行时每次从 COPY 流读取的字节数
+DRY_RUN_CHUNK = 1 << 20
+
+
+def peak_rss_mb():
+    """当前进程的内存峰值（MB，getrusage 的 ru_maxrss；Windows 上不可用时返回 None）"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def to_target_crs(gdf, source_crs=None):
+    """确保坐标系为 WGS84 (EPSG:4326)，未定义坐标系时直接设置（转换器按源坐标系缓存，各批次复用）"""
+    return to_srid(gdf, TARGET_SRID, source_crs)
+
+
+def layer_columns(info, geom_col='geometry'):
+    """根据图层元数据生成目标表的列定义（字段名转小写，忽略保留列）"""
+    fields, dtypes = [], []
+    for field, dtype in zip(info['fields'], info['dtypes']):
+        if field.lower() in RESERVED_COLUMNS:
+            continue
+        fields.append(field.lower())
+        dtypes.append(dtype)
+    return get_schema_columns(fields, dtypes, geom_col)
+
+
+def prepare_batch(batch, columns, source_crs=None, geom_col='geometry'):
+    """
+    整理单个批次：重投影到 EPSG:4326，列名转小写，按目标表列顺序排列
+    """
+    batch = to_target_crs(batch, source_crs)
+    if batch.geometry.name != geom_col:
+        batch = batch.rename_geometry(geom_col)
+    batch = batch.rename(columns={c: c.lower() for c in batch.columns if c != geom_col})
+    return batch[[col for col, _ in columns]]
+
+
+def create_copy_engine(db_url):
+    """创建用于COPY的数据库引擎（COPY依赖 psycopg2 的 copy_expert，未指定驱动时显式使用 psycopg2）"""
+    url = make_url(db_url)
+    if url.drivername == 'postgresql':
+        url = url.set(drivername='postgresql+psycopg2')
+    return create_engine(url, poolclass=NullPool)
+
+
+def ensure_postgis(conn):
+    """确保 PostGIS 扩展、变更序号序列已创建"""
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+    for sql in sequence_sql():
+        conn.execute(text(sql))
+
+
+def create_table_sql(table_name, columns, geom_col='geometry', schema='public'):
+    """
+    生成建表SQL（gid主键、status软删除字段、src_hash指纹、rev变更序号、简化几何列、量测列与导入字段一并创建）
+
+    参数:
+        table_name: 表名
+        columns: get_copy_columns 返回的列定义
+        geom_col: 几何列名
+        schema: 模式名
+    """
+    column_defs = ['gid SERIAL PRIMARY KEY']
+    for col, pg_type in columns:
+        if pg_type == 'geometry':
+            column_defs.append(f'"{col}" geometry(Geometry, {TARGET_SRID})')
+        else:
+            column_defs.append(f'"{col}" {pg_type}')
+    column_defs.append('status INTEGER DEFAULT 1')
+    column_defs.append(f'{HASH_COLUMN} text')
+    column_defs.extend(rev_column_defs())
+    for col in get_simplify_columns(table_name):
+        column_defs.append(f'"{col}" geometry(Geometry, {TARGET_SRID})')
+    for col, col_type in get_measure_column_types(table_name):
+        column_defs.append(f'"{col}" {col_type}')
+    return f"CREATE TABLE {schema}.{table_name} (\n    " + ",\n    ".join(column_defs) + "\n)"
+
+
+def create_indexes(conn, table_name, geom_col='geometry', schema='public'):
+    """导入完成后创建空间索引、状态索引和指纹索引，并启用变更跟踪触发器"""
+    conn.execute(text(
+        f'CREATE INDEX IF NOT EXISTS idx_{table_name}_geometry ON {schema}.{table_name} USING GIST ("{geom_col}")'
+    ))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_status ON {schema}.{table_name} (status)"
+    ))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{HASH_COLUMN} ON {schema}.{table_name} ({HASH_COLUMN})"
+    ))
+    ensure_change_tracking(conn, table_name, schema)
+
+
+def open_layer(layer, encodings=None, geom_col='geometry'):
+    """
+    探测编码并读取图层元数据
+
+    返回:
+        (编码, 元数据, 列定义)
+    """
+    if not os.path.exists(layer['path']):
+        raise FileNotFoundError(f"文件不存在: {layer['path']}")
+    encoding = detect_encoding(layer['path'], encodings)
+    info = read_layer_info(layer['path'], encoding)
+    if info['crs'] is None:
+        print(f"⚠ 警告: {layer['name']} 未检测到坐标系，按 WGS84 处理")
+    return encoding, info, layer_columns(info, geom_col)
+
+
+def copy_layer(conn, layer, encoding, info, columns, target, stats,
+               batch_size=DEFAULT_BATCH_SIZE, geom_col='geometry'):
+    """
+    按批读取图层并通过一个 COPY 流写入目标表（附带每行的 src_hash 指纹）
+
+    图层定义带 bbox（WGS84）时，只读取空间索引选出的要素。每批几何先批量校验并修复，
+    无法修复的几何按原样写入，数量记入 stats['invalid']。
+
+    参数:
+        conn: 数据库连接（在调用方事务内）；None 表示试运行，COPY 流被读取后丢弃
+        layer: 图层定义
+        encoding, info, columns: open_layer 的返回值
+        target: 目标表（可带模式名）
+        stats: 导入统计，累加 features、vertices、bytes、repaired、invalid 与各阶段耗时
+        batch_size: 每批要素数
+        geom_col: 几何列名
+    """
+    timings = stats['timings']
+    column_list = ', '.join(f'"{col}"' for col, _ in columns)
+    copy_sql = f"COPY {target} ({column_list}, {HASH_COLUMN}) FROM STDIN (FORMAT binary)"
+
+    fids = None
+    if layer.get('bbox'):
+        t_index = time.perf_counter()
+        fids = select_features(layer['path'], layer['bbox'], info['crs'])
+        timings['read'] += time.perf_counter() - t_index
+
+    def encoded_batches():
+        batches = iter_shapefile_batches(layer['path'], encoding, batch_size, info['features'], fids)
+        while True:
+            t0 = time.perf_counter()
+            batch = next(batches, None)
+            t1 = time.perf_counter()
+            timings['read'] += t1 - t0
+            if batch is None:
+                return
+            batch = prepare_batch(batch, columns, info['crs'], geom_col)
+            t2 = time.perf_counter()
+            timings['reproject'] += t2 - t1
+            batch, status, _ = validate_and_fix_gdf(batch)
+            stats['repaired'] += int((status == GEOMETRY_REPAIRED).sum())
+            stats['invalid'] += int((status == GEOMETRY_INVALID).sum())
+            t3 = time.perf_counter()
+            timings['validate'] += t3 - t2
+            stats['features'] += len(batch)
+            stats['vertices'] += int(shapely.get_num_coordinates(batch.geometry.values).sum())
+            chunk = encode_rows(batch, columns, TARGET_SRID, fingerprint=True)
+            timings['encode'] += time.perf_counter() - t3
+            yield chunk
+
+    def read_side():
+        return sum(timings[stage] for stage in READ_STAGES)
+
+    t0 = time.perf_counter()
+    read_before = read_side()
+    stream = CopyStream(encoded_batches())
+    if conn is None:
+        while stream.read(DRY_RUN_CHUNK):
+            pass
+    else:
+        conn.connection.cursor().copy_expert(copy_sql, stream)
+    stats['bytes'] += stream.bytes_read
+    timings['copy'] += time.perf_counter() - t0 - (read_side() - read_before)
+
+
+def new_layer_stats(layer):
+    """创建空的导入统计"""
+    return {
+        'table': layer['table'], 'name': layer['name'], 'features': 0, 'vertices': 0, 'bytes': 0,
+        'repaired': 0, 'invalid': 0,
+        'timings': {**{stage: 0.0 for stage in READ_STAGES}, 'copy': 0.0, 'index': 0.0},
+    }
+
+
+def replace_table(db_url, layer, encoding, info, columns, stats, batch_size=DEFAULT_BATCH_SIZE,
+                  geom_col='geometry', schema='public'):
+    """删除并重建目标表，COPY 写入后刷新派生列、建索引并 ANALYZE（在一个事务内完成）"""
+    table_name = layer['table']
+    engine = create_copy_engine(db_url)
+    try:
+        with engine.begin() as conn:
+            ensure_postgis(conn)
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{table_name} CASCADE"))
+            conn.execute(text(create_table_sql(table_name, columns, geom_col, schema)))
+
+            copy_layer(conn, layer, encoding, info, columns, f"{schema}.{table_name}", stats,
+                       batch_size, geom_col)
+
+            t0 = time.perf_counter()
+            refresh_derived_columns(conn, table_name, geom_col=geom_col)
+            create_indexes(conn, table_name, geom_col, schema)
+            conn.execute(text(f"ANALYZE {schema}.{table_name}"))
+            stats['timings']['index'] = time.perf_counter() - t0
+    finally:
+        engine.dispose()
+
+
+def import_layer(layer, db_url, encodings=None, batch_size=DEFAULT_BATCH_SIZE,
+                 geom_col='geometry', schema='public', dry_run=False):
+    """
+    导入单个图层（在工作进程中执行，替换已有表）
+
+    按批读取、重投影、编码并通过同一个 COPY 流写入，峰值内存取决于 batch_size。
+
+    参数:
+        layer: 图层定义 {'path': ..., 'table': ..., 'name': ..., 'bbox': 可选范围}
+        db_url: 数据库连接URL
+        encodings: 候选编码列表
+        batch_size: 每批要素数
+        geom_col: 几何列名
+        schema: 模式名
+        dry_run: 试运行（读取、重投影、校验、编码照常执行，COPY 流不写入数据库，不连接数据库）
+
+    返回:
+        dict: 导入统计（features、vertices、bytes、各阶段耗时、peak_rss_mb；失败时包含error）
+    """
+    table_name = layer['table']
+    stats = new_layer_stats(layer)
+    timings = stats['timings']
+    started = time.perf_counter()
+
+    try:
+        t0 = time.perf_counter()
+        encoding, info, columns = open_layer(layer, encodings, geom_col)
+        stats['encoding'] = encoding
+        timings['detect'] += time.perf_counter() - t0
+
+        if dry_run:
+            copy_layer(None, layer, encoding, info, columns, f"{schema}.{table_name}", stats, batch_size, geom_col)
+        else:
+            replace_table(db_url, layer, encoding, info, columns, stats, batch_size, geom_col, schema)
+    except Exception as e:
+        stats['error'] = str(e)
+
+    timings['total'] = time.perf_counter() - started
+    stats['peak_rss_mb'] = peak_rss_mb()
+    return stats
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+PostgreSQL 二进制 COPY 编码
+
+将 GeoDataFrame 按 COPY ... FROM STDIN (FORMAT binary) 的格式编码为字节流，
+几何列编码为带 SRID 的 EWKB（PostGIS geometry 的二进制接收格式）。
+"""
+
+import hashlib
+import struct
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import shapely
+
+# 二进制COPY文件头：签名 + 标志位 + 头扩展长度
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+# 文件尾：字段数 -1
+COPY_TRAILER = struct.pack('>h', -1)
+
+NULL_FIELD = struct.pack('>i', -1)
+
+# PostgreSQL 时间戳纪元（2000-01-01）
+_PG_EPOCH = datetime(2000, 1, 1)
+
+
+def pg_type_for_dtype(dtype):
+    """
+    根据 pandas 列类型推断 PostgreSQL 列类型
+
+    返回:
+        str: 'bigint' / 'double precision' / 'boolean' / 'timestamp' / 'text'
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'bigint'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'double precision'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'timestamp'
+    return 'text'
+
+
+def get_copy_columns(gdf, geom_col='geometry'):
+    """
+    获取 COPY 的列定义列表
+
+    返回:
+        list: [(列名, PostgreSQL类型), ...]，几何列类型为 'geometry'
+    """
+    columns = []
+    for col in gdf.columns:
+        if col == geom_col:
+            columns.append((col, 'geometry'))
+        else:
+            columns.append((col, pg_type_for_dtype(gdf[col].dtype)))
+    return columns
+
+
+def get_schema_columns(fields, dtypes, geom_col='geometry'):
+    """
+    根据图层元数据（字段名与 numpy 类型名）生成 COPY 列定义
+
+    分块导入时列类型必须在整个文件范围内固定，不能由单个批次推断
+    （例如含空值的整数字段在某些批次中会被读成 float64）。
+
+    返回:
+        list: [(列名, PostgreSQL类型), ...]，几何列位于最后
+    """
+    columns = [(field, pg_type_for_dtype(dtype)) for field, dtype in zip(fields, dtypes)]
+    columns.append((geom_col, 'geometry'))
+    return columns
+
+
+def _fixed_width_fields(values, mask, fmt):
+    """按固定宽度格式编码数值列，返回每行的字段字节（含长度前缀）"""
+    packed = np.asarray(values, dtype=fmt)
+    width = packed.dtype.itemsize
+    prefix = struct.pack('>i', width)
+    raw = packed.tobytes()
+    return [
+        NULL_FIELD if mask[i] else prefix + raw[i * width:(i + 1) * width]
+        for i in range(len(packed))
+    ]
+
+
+def _variable_fields(chunks):
+    """编码变长字段（bytes列表，None表示NULL）"""
+    return [
+        NULL_FIELD if chunk is None else struct.pack('>i', len(chunk)) + chunk
+        for chunk in chunks
+    ]
+
+
+def encode_column(series, pg_type, srid=4326):
+    """
+    将一列编码为二进制COPY字段列表
+
+    参数:
+        series: pandas Series / GeoSeries
+        pg_type: PostgreSQL类型（见 get_copy_columns）
+        srid: 几何列SRID
+
+    返回:
+        list: 每行一个字段的字节串（含4字节长度前缀）
+    """
+    mask = series.isna().to_numpy()
+
+    if pg_type == 'geometry':
+        geoms = shapely.set_srid(np.asarray(series.values, dtype=object), srid)
+        wkb = shapely.to_wkb(geoms, include_srid=True)
+        return _variable_fields([None if m else chunk for m, chunk in zip(mask, wkb)])
+
+    if pg_type == 'bigint':
+        return _fixed_width_fields(series.fillna(0).to_numpy(dtype='int64'), mask, '>i8')
+
+    if pg_type == 'double precision':
+        return _fixed_width_fields(series.to_numpy(dtype='float64', na_value=0.0), mask, '>f8')
+
+    if pg_type == 'boolean':
+        return _fixed_width_fields(series.fillna(False).to_numpy(dtype='bool'), mask, '>u1')
+
+    if pg_type == 'timestamp':
+        # 微秒数，自2000-01-01起
+        micros = (series - _PG_EPOCH).dt.total_seconds().fillna(0).to_numpy() * 1_000_000
+        return _fixed_width_fields(micros.astype('int64'), mask, '>i8')
+
+    texts = series.to_numpy(dtype=object)
+    return _variable_fields([
+        None if m else str(value).encode('utf-8') for m, value in zip(mask, texts)
+    ])
+
+
+def encode_rows(gdf, columns, srid=4326, fingerprint=False):
+    """
+    将 GeoDataFrame 编码为二进制COPY行数据（不含文件头/尾）
+
+    参数:
+        gdf: GeoDataFrame对象
+        columns: get_copy_columns 返回的列定义
+        srid: 几何列SRID
+        fingerprint: 是否在行尾追加一个文本字段：该行全部字段编码（属性 + EWKB）的 MD5
+
+    返回:
+        bytes: 编码后的行数据
+    """
+    if gdf.empty:
+        return b''
+    encoded = [encode_column(gdf[col], pg_type, srid) for col, pg_type in columns]
+    if fingerprint:
+        hashes = [hashlib.md5(b''.join(fields)).hexdigest().encode('ascii') for fields in zip(*encoded)]
+        encoded.append(_variable_fields(hashes))
+    row_header = struct.pack('>h', len(encoded))
+    return b''.join(row_header + b''.join(fields) for fields in zip(*encoded))
+
+
+class CopyStream:
+    """
+    将分块生成的字节串包装为文件对象，供 cursor.copy_expert 流式读取
+
+    参数:
+        chunks: 可迭代的字节串（不含文件头/尾，由本类自动添加）
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray(COPY_HEADER)
+        self._finished = False
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        while not self._finished and (size < 0 or len(self._buffer) < size):
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                self._buffer += COPY_TRAILER
+                self._finished = True
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def readline(self, size=-1):
+        return self.read(size)
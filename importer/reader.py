@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+分块读取 Shapefile
+
+按固定行数窗口逐批读取（pyogrio 的 skip_features/max_features，未安装时回退到 fiona），
+峰值内存只取决于批大小，与文件大小无关。指定范围（bbox）时先通过空间索引选出要素，
+再只读取这些要素（见 importer.spatial_index）。
+"""
+
+from itertools import islice
+
+import geopandas as gpd
+from backend.utils.crs import get_crs, get_transformer
+from importer.spatial_index import query_fids
+
+try:
+    import pyogrio
+except ImportError:  # pragma: no cover - 依赖 fiona 回退
+    pyogrio = None
+
+# 默认尝试的编码（UTF-8优先：GBK数据按UTF-8解码会报错，反之可能静默乱码）
+DEFAULT_ENCODINGS = ['utf-8', 'gbk', 'gb2312', 'cp936']
+
+# 默认批大小（要素数）
+DEFAULT_BATCH_SIZE = 50000
+
+# 编码探测时读取的要素数
+ENCODING_PROBE_SIZE = 1000
+
+# 命令行/配置中 bbox 的默认坐标系
+BBOX_CRS = 'EPSG:4326'
+
+
+def _read_window(path, encoding, skip, limit):
+    """读取 [skip, skip + limit) 范围内的要素"""
+    if pyogrio is not None:
+        return pyogrio.read_dataframe(path, encoding=encoding, skip_features=skip, max_features=limit)
+
+    import fiona
+    with fiona.open(path, encoding=encoding) as src:
+        # values(start, stop) 通过 OGR SetNextByIndex 定位，不从头遍历
+        features = list(src.values(skip, skip + limit))
+        return gpd.GeoDataFrame.from_features(features, crs=src.crs)
+
+
+def _read_fids(path, encoding, fids):
+    """按 fid 读取指定要素（保持 fids 的顺序）"""
+    if pyogrio is not None:
+        return pyogrio.read_dataframe(path, encoding=encoding, fids=fids)
+
+    import fiona
+    with fiona.open(path, encoding=encoding) as src:
+        features = [src[int(fid)] for fid in fids]
+        return gpd.GeoDataFrame.from_features(features, crs=src.crs)
+
+
+def parse_bbox(value):
+    """
+    解析 "minx,miny,maxx,maxy" 形式的范围
+
+    异常:
+        ValueError: 格式错误或 min 大于 max
+    """
+    parts = [float(v) for v in value.split(',')] if isinstance(value, str) else [float(v) for v in value]
+    if len(parts) != 4:
+        raise ValueError(f"bbox 需要4个数值 minx,miny,maxx,maxy: {value}")
+    if parts[0] > parts[2] or parts[1] > parts[3]:
+        raise ValueError(f"bbox 的最小值不能大于最大值: {value}")
+    return tuple(parts)
+
+
+def select_features(path, bbox, layer_crs=None, bbox_crs=BBOX_CRS):
+    """
+    通过空间索引选出与 bbox 相交的要素（按外包框判断）
+
+    参数:
+        path: Shapefile 路径
+        bbox: (minx, miny, maxx, maxy)
+        layer_crs: 图层坐标系（None 时认为与 bbox 坐标系相同）
+        bbox_crs: bbox 所用坐标系（默认 WGS84）
+
+    返回:
+        numpy.ndarray: 排序后的 fid
+    """
+    if layer_crs is not None and not get_crs(layer_crs).equals(get_crs(bbox_crs)):
+        bbox = get_transformer(bbox_crs, layer_crs).transform_bounds(*bbox)
+    return query_fids(path, bbox)
+
+
+def detect_encoding(path, encodings=None, probe_size=ENCODING_PROBE_SIZE):
+    """
+    探测 Shapefile 属性编码（只读取前 probe_size 个要素，不读取整个文件）
+
+    返回:
+        str: 第一个能成功解码的编码
+
+    异常:
+        ValueError: 所有编码都无法解码
+    """
+    encodings = encodings or DEFAULT_ENCODINGS
+    last_error = None
+    for encoding in encodings:
+        try:
+            _read_window(path, encoding, 0, probe_size)
+            return encoding
+        except (UnicodeDecodeError, LookupError) as e:
+            last_error = e
+            continue
+    raise ValueError(f"无法使用编码 {encodings} 读取文件: {path} ({last_error})")
+
+
+def read_layer_info(path, encoding=None):
+    """
+    读取图层元数据（不读取要素）
+
+    返回:
+        dict: {'crs', 'features', 'fields', 'dtypes', 'geometry_type'}
+    """
+    if pyogrio is not None:
+        info = pyogrio.read_info(path, encoding=encoding)
+        return {
+            'crs': info['crs'],
+            'features': info['features'],
+            'fields': list(info['fields']),
+            'dtypes': list(info['dtypes']),
+            'geometry_type': info['geometry_type'],
+        }
+
+    import fiona
+    with fiona.open(path, encoding=encoding) as src:
+        sample = gpd.GeoDataFrame.from_features(list(islice(src, ENCODING_PROBE_SIZE)), crs=src.crs)
+        fields = list(src.schema['properties'].keys())
+        return {
+            'crs': src.crs.to_string() if src.crs else None,
+            'features': len(src),
+            'fields': fields,
+            'dtypes': [str(sample[field].dtype) if field in sample else 'object' for field in fields],
+            'geometry_type': src.schema['geometry'],
+        }
+
+
+def read_shapefile_bbox(path, encoding, bbox, bbox_crs=BBOX_CRS):
+    """
+    只读取与 bbox 相交的要素（预览某个范围时使用，不读取其他记录）
+
+    返回:
+        GeoDataFrame
+    """
+    info = read_layer_info(path, encoding)
+    fids = select_features(path, bbox, info['crs'], bbox_crs)
+    return _read_fids(path, encoding, fids)
+
+
+def iter_shapefile_batches(path, encoding, batch_size=DEFAULT_BATCH_SIZE, total=None, fids=None):
+    """
+    按批读取 Shapefile
+
+    参数:
+        path: Shapefile 路径
+        encoding: 属性编码（见 detect_encoding）
+        batch_size: 每批要素数
+        total: 要素总数（可选，已知时避免多读一次空批）
+        fids: 只读取这些要素（见 select_features），None 表示全部
+
+    返回:
+        生成器，逐批产出 GeoDataFrame
+    """
+    if fids is not None:
+        for start in range(0, len(fids), batch_size):
+            yield _read_fids(path, encoding, fids[start:start + batch_size])
+        return
+
+    skip = 0
+    while total is None or skip < total:
+        batch = _read_window(path, encoding, skip, batch_size)
+        if batch.empty:
+            break
+        yield batch
+        skip += len(batch)
+        if len(batch) < batch_size:
+            break
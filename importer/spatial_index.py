@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Shapefile 空间索引：按范围（bbox）查询要素，只读取命中的记录
+
+优先使用 ESRI 的 .sbn/.sbx 空间索引；没有索引时，按 .shx 偏移读取每条记录头中的外包框，
+构建 STRtree，并把外包框缓存到旁路文件（<文件名>.bounds.npy），文件未变化时直接加载。
+候选要素最后再用 .shp 记录头中的精确外包框过滤，返回的 fid 与 OGR 一致（从 0 开始）。
+
+.sbn 格式（大端序）:
+    文件头 100 字节: 第 28 字节为要素数，第 32 字节起为 xmin/ymin/xmax/ymax（double）
+    节点表（记录 1）: 每个节点 8 字节（首个 bin 编号, 要素数），节点按完全二叉树编号，
+        根节点为 1，节点 n 的子节点为 2n（上半区）和 2n+1（下半区），偶数层按 x、奇数层按 y 二分
+    bin 记录（记录 2..）: 每个要素 8 字节（量化到 0-255 的 xmin/ymin/xmax/ymax, 要素编号）
+.sbx 中第 k 条记录给出第 k 条 .sbn 记录的偏移与长度（单位均为 16 位字）。
+"""
+
+import math
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+import shapely
+
+SBN_FILE_CODES = (0x270A, 0x270D)
+
+# 点类型（Point / PointZ / PointM）的记录头只有坐标，没有外包框
+POINT_SHAPE_TYPES = (1, 11, 21)
+
+BOUNDS_CACHE_SUFFIX = '.bounds.npy'
+
+
+def _sidecar(shp_path, ext):
+    """返回同名旁路文件路径（兼容大小写扩展名），不存在时返回 None"""
+    stem = os.path.splitext(shp_path)[0]
+    for candidate in (stem + ext, stem + ext.upper()):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def has_sbn_index(shp_path):
+    """判断 Shapefile 是否带有 .sbn/.sbx 空间索引"""
+    return _sidecar(shp_path, '.sbn') is not None and _sidecar(shp_path, '.sbx') is not None
+
+
+def read_shx_offsets(shp_path):
+    """
+    读取 .shx 中每条记录在 .shp 中的字节偏移
+
+    返回:
+        numpy.ndarray: 第 i 个元素为 fid=i 的记录偏移（字节）
+    """
+    shx_path = _sidecar(shp_path, '.shx')
+    if shx_path is None:
+        raise FileNotFoundError(f"缺少 .shx 文件: {shp_path}")
+    with open(shx_path, 'rb') as f:
+        f.seek(100)
+        records = np.frombuffer(f.read(), dtype='>i4').reshape(-1, 2)
+    return records[:, 0].astype(np.int64) * 2
+
+
+def read_record_bounds(shp_path, fids=None, offsets=None):
+    """
+    读取记录头中的外包框（每条记录只读 44 字节，不解析几何）
+
+    参数:
+        shp_path: Shapefile 路径
+        fids: 要读取的 fid（默认全部）
+        offsets: read_shx_offsets 的结果（可选，避免重复读取）
+
+    返回:
+        numpy.ndarray: (n, 4) 的 xmin/ymin/xmax/ymax，空几何为 NaN
+    """
+    if offsets is None:
+        offsets = read_shx_offsets(shp_path)
+    if fids is None:
+        fids = np.arange(len(offsets))
+    bounds = np.full((len(fids), 4), np.nan)
+    with open(shp_path, 'rb') as f:
+        for i, fid in enumerate(fids):
+            f.seek(offsets[fid] + 8)
+            header = f.read(36)
+            shape_type = struct.unpack('<i', header[:4])[0]
+            if shape_type in POINT_SHAPE_TYPES:
+                x, y = struct.unpack('<2d', header[4:20])
+                bounds[i] = (x, y, x, y)
+            elif shape_type != 0:
+                bounds[i] = struct.unpack('<4d', header[4:36])
+    return bounds
+
+
+def _intersects(bounds, bbox):
+    """外包框与 bbox 是否相交（NaN 视为不相交）"""
+    minx, miny, maxx, maxy = bbox
+    return ((bounds[:, 0] <= maxx) & (bounds[:, 2] >= minx)
+            & (bounds[:, 1] <= maxy) & (bounds[:, 3] >= miny))
+
+
+def _quantize(bbox, extent):
+    """把 bbox 换算到 .sbn 的 0-255 网格（向外扩一格，保证不漏选）"""
+    xmin, ymin, xmax, ymax = extent
+    sx = 255.0 / (xmax - xmin) if xmax > xmin else 0.0
+    sy = 255.0 / (ymax - ymin) if ymax > ymin else 0.0
+
+    def clamp(v):
+        return int(min(max(v, 0), 255))
+
+    return (clamp(math.floor((bbox[0] - xmin) * sx) - 1), clamp(math.floor((bbox[1] - ymin) * sy) - 1),
+            clamp(math.ceil((bbox[2] - xmin) * sx) + 1), clamp(math.ceil((bbox[3] - ymin) * sy) + 1))
+
+
+def _read_sbn_record(f, sbx_entries, record):
+    """按 .sbx 偏移读取第 record 条 .sbn 记录的内容（不含 8 字节记录头）"""
+    offset, length = sbx_entries[record - 1]
+    f.seek(offset * 2 + 8)
+    return f.read(length * 2)
+
+
+def query_sbn(shp_path, bbox):
+    """
+    用 .sbn/.sbx 查询与 bbox（Shapefile 坐标系）外包框相交的候选要素
+
+    只读取节点表和与 bbox 相交的节点所在的 bin，不扫描整个索引。
+
+    返回:
+        numpy.ndarray: 候选 fid（已排序，按量化网格粗筛，可能多于实际相交要素）
+    """
+    sbn_path, sbx_path = _sidecar(shp_path, '.sbn'), _sidecar(shp_path, '.sbx')
+    with open(sbx_path, 'rb') as f:
+        f.seek(100)
+        sbx_entries = np.frombuffer(f.read(), dtype='>i4').reshape(-1, 2)
+
+    with open(sbn_path, 'rb') as f:
+        header = f.read(100)
+        if struct.unpack('>i', header[:4])[0] not in SBN_FILE_CODES:
+            raise ValueError(f"无法识别的 .sbn 文件: {sbn_path}")
+        extent = struct.unpack('>4d', header[32:64])
+        if bbox[0] > extent[2] or bbox[2] < extent[0] or bbox[1] > extent[3] or bbox[3] < extent[1]:
+            return np.empty(0, dtype=np.int64)
+        nodes = np.frombuffer(_read_sbn_record(f, sbx_entries, 1), dtype='>i4').reshape(-1, 2)
+        qminx, qminy, qmaxx, qmaxy = _quantize(bbox, extent)
+
+        fids = []
+        bin_cache = {}
+        # 深度优先遍历：(节点号, 层级, 节点网格范围)
+        stack = [(1, 0, (0, 0, 255, 255))]
+        while stack:
+            node, depth, (x0, y0, x1, y1) = stack.pop()
+            if node > len(nodes) or x0 > qmaxx or x1 < qminx or y0 > qmaxy or y1 < qminy:
+                continue
+
+            first_bin, count = nodes[node - 1]
+            record, remaining = first_bin, count
+            while remaining > 0:
+                if record not in bin_cache:
+                    bin_cache[record] = np.frombuffer(
+                        _read_sbn_record(f, sbx_entries, record), dtype=np.uint8
+                    ).reshape(-1, 8)
+                entries = bin_cache[record][:remaining]
+                boxes = entries[:, :4]
+                hit = ((boxes[:, 0] <= qmaxx) & (boxes[:, 2] >= qminx)
+                       & (boxes[:, 1] <= qmaxy) & (boxes[:, 3] >= qminy))
+                ids = entries[hit, 4:].copy().view('>i4').ravel()
+                fids.append(ids.astype(np.int64) - 1)
+                remaining -= len(entries)
+                record += 1
+
+            # 子节点网格与父节点在中线处重叠一格
+            if depth % 2 == 0:
+                mid = (x0 + x1 + 1) // 2
+                children = ((mid, y0, x1, y1), (x0, y0, mid, y1))
+            else:
+                mid = (y0 + y1 + 1) // 2
+                children = ((x0, mid, x1, y1), (x0, y0, x1, mid))
+            stack.append((2 * node, depth + 1, children[0]))
+            stack.append((2 * node + 1, depth + 1, children[1]))
+
+    if not fids:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(fids))
+
+
+def load_record_bounds(shp_path):
+    """
+    读取全部记录的外包框，结果缓存到旁路文件（.shp 修改后自动重建；目录不可写时不缓存）
+    """
+    cache_path = os.path.splitext(shp_path)[0] + BOUNDS_CACHE_SUFFIX
+    shp_mtime = os.path.getmtime(shp_path)
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= shp_mtime:
+        try:
+            return np.load(cache_path)
+        except (OSError, ValueError):
+            pass
+
+    bounds = read_record_bounds(shp_path)
+    try:
+        with open(cache_path, 'wb') as f:
+            np.save(f, bounds)
+    except OSError:
+        pass
+    return bounds
+
+
+@lru_cache(maxsize=32)
+def _bounds_tree(shp_path, shp_mtime):
+    """构建外包框的 STRtree（按路径和修改时间缓存在进程内）"""
+    bounds = load_record_bounds(shp_path)
+    valid = ~np.isnan(bounds).any(axis=1)
+    boxes = shapely.box(bounds[valid, 0], bounds[valid, 1], bounds[valid, 2], bounds[valid, 3])
+    return shapely.STRtree(boxes), np.flatnonzero(valid)
+
+
+def query_fids(shp_path, bbox):
+    """
+    查询外包框与 bbox 相交的要素
+
+    参数:
+        shp_path: Shapefile 路径
+        bbox: (minx, miny, maxx, maxy)，与 Shapefile 坐标系一致
+
+    返回:
+        numpy.ndarray: 排序后的 fid（从 0 开始，可直接传给 pyogrio 的 fids 参数）
+    """
+    bbox = tuple(float(v) for v in bbox)
+    if has_sbn_index(shp_path):
+        candidates = query_sbn(shp_path, bbox)
+        if len(candidates) == 0:
+            return candidates
+        # 只读取候选记录的记录头做精确过滤
+        bounds = read_record_bounds(shp_path, candidates)
+        return candidates[_intersects(bounds, bbox)]
+
+    tree, fid_map = _bounds_tree(os.path.abspath(shp_path), os.path.getmtime(shp_path))
+    hits = tree.query(shapely.box(*bbox))
+    return np.sort(fid_map[hits])
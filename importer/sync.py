@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+增量同步：只把源数据与表中数据的差异写入数据库
+
+每个源要素的指纹（属性 + WKB 的 MD5）存放在 src_hash 列。同步时先把源数据 COPY 到临时表，
+再在同一个事务内计算并应用差异：
+    - 指纹相同的要素保持不变（gid、status 等状态不受影响）
+    - 配置了 key 字段时，key 唯一匹配但指纹不同的要素原地 UPDATE（保留 gid）
+    - 其余源要素 INSERT
+    - 表中带指纹但在源数据中已不存在的要素软删除（status=0），并清空指纹与源数据脱离关联
+通过 API 创建的要素没有指纹，不参与同步。
+"""
+
+import time
+
+from sqlalchemy import text
+
+from backend.utils.db import refresh_derived_columns
+from importer.loader import (
+    HASH_COLUMN, TARGET_SRID, copy_layer, create_copy_engine, create_indexes, import_layer,
+    new_layer_stats, open_layer, peak_rss_mb,
+)
+from importer.reader import DEFAULT_BATCH_SIZE
+
+STAGE_TABLE = 'sync_stage'
+
+
+def _table_exists(conn, table_name, schema):
+    return conn.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {'name': f"{schema}.{table_name}"}
+    ).scalar()
+
+
+def _create_stage_table(conn, columns):
+    """创建临时表（列类型与 COPY 编码一致，事务结束时自动删除）"""
+    column_defs = []
+    for col, pg_type in columns:
+        pg_type = f'geometry(Geometry, {TARGET_SRID})' if pg_type == 'geometry' else pg_type
+        column_defs.append(f'"{col}" {pg_type}')
+    conn.execute(text(
+        f"CREATE TEMP TABLE {STAGE_TABLE} ({', '.join(column_defs)}, {HASH_COLUMN} text, "
+        f"stage_id BIGSERIAL PRIMARY KEY) ON COMMIT DROP"
+    ))
+
+
+def _adopt_existing(conn, target, columns, geom_col):
+    """
+    为没有指纹的旧数据（早期全量导入）补写指纹：属性与几何完全相同的行视为同一要素
+    """
+    conditions = [f't."{geom_col}" ~= s."{geom_col}"', f'ST_OrderingEquals(t."{geom_col}", s."{geom_col}")']
+    conditions += [f't."{col}" IS NOT DISTINCT FROM s."{col}"' for col, pg_type in columns if pg_type != 'geometry']
+    result = conn.execute(text(f"""
+        UPDATE {target} t SET {HASH_COLUMN} = m.{HASH_COLUMN}
+        FROM (
+            SELECT DISTINCT ON (t.gid) t.gid, s.{HASH_COLUMN}
+            FROM {STAGE_TABLE} s
+            JOIN {target} t ON {' AND '.join(conditions)}
+            WHERE t.{HASH_COLUMN} IS NULL
+            ORDER BY t.gid, s.stage_id
+        ) m
+        WHERE t.gid = m.gid
+    """))
+    return result.rowcount
+
+
+def _match_unchanged(conn, target):
+    """
+    按指纹配对未变化的要素（相同指纹的重复要素按出现顺序一一配对）
+    """
+    conn.execute(text(f"""
+        CREATE TEMP TABLE sync_match ON COMMIT DROP AS
+        WITH s AS (
+            SELECT stage_id, {HASH_COLUMN},
+                   row_number() OVER (PARTITION BY {HASH_COLUMN} ORDER BY stage_id) AS ord
+            FROM {STAGE_TABLE}
+        ), t AS (
+            SELECT gid, {HASH_COLUMN},
+                   row_number() OVER (PARTITION BY {HASH_COLUMN} ORDER BY gid) AS ord
+            FROM {target}
+            WHERE {HASH_COLUMN} IS NOT NULL
+        )
+        SELECT s.stage_id, t.gid FROM s JOIN t USING ({HASH_COLUMN}, ord)
+    """))
+    return conn.execute(text("SELECT COUNT(*) FROM sync_match")).scalar()
+
+
+def _apply_updates(conn, target, columns, key):
+    """
+    key 字段在源数据和表中都唯一且未按指纹配对的要素，原地更新属性与几何
+
+    返回:
+        list: 更新的gid
+    """
+    if not key:
+        conn.execute(text("CREATE TEMP TABLE sync_update (stage_id bigint, gid integer) ON COMMIT DROP"))
+        return []
+
+    conn.execute(text(f"""
+        CREATE TEMP TABLE sync_update ON COMMIT DROP AS
+        WITH s AS (
+            SELECT stage_id, "{key}" AS k FROM {STAGE_TABLE} s
+            WHERE "{key}" IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM sync_match m WHERE m.stage_id = s.stage_id)
+        ), t AS (
+            SELECT gid, "{key}" AS k FROM {target} t
+            WHERE "{key}" IS NOT NULL AND {HASH_COLUMN} IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM sync_match m WHERE m.gid = t.gid)
+        ), s1 AS (
+            SELECT min(stage_id) AS stage_id, k FROM s GROUP BY k HAVING COUNT(*) = 1
+        ), t1 AS (
+            SELECT min(gid) AS gid, k FROM t GROUP BY k HAVING COUNT(*) = 1
+        )
+        SELECT s1.stage_id, t1.gid FROM s1 JOIN t1 USING (k)
+    """))
+    assignments = ', '.join(f'"{col}" = s."{col}"' for col, _ in columns)
+    result = conn.execute(text(f"""
+        UPDATE {target} t
+        SET {assignments}, {HASH_COLUMN} = s.{HASH_COLUMN}
+        FROM sync_update u JOIN {STAGE_TABLE} s ON s.stage_id = u.stage_id
+        WHERE t.gid = u.gid
+        RETURNING t.gid
+    """))
+    return [row[0] for row in result]
+
+
+def _apply_inserts(conn, target, columns):
+    """插入没有配对的源要素，返回新gid"""
+    column_list = ', '.join(f'"{col}"' for col, _ in columns)
+    result = conn.execute(text(f"""
+        INSERT INTO {target} ({column_list}, {HASH_COLUMN})
+        SELECT {column_list}, {HASH_COLUMN} FROM {STAGE_TABLE} s
+        WHERE NOT EXISTS (SELECT 1 FROM sync_match m WHERE m.stage_id = s.stage_id)
+          AND NOT EXISTS (SELECT 1 FROM sync_update u WHERE u.stage_id = s.stage_id)
+        ORDER BY s.stage_id
+        RETURNING gid
+    """))
+    return [row[0] for row in result]
+
+
+def _apply_deletes(conn, target):
+    """软删除源数据中已不存在的要素，返回由有效变为无效的要素数"""
+    conn.execute(text(f"""
+        CREATE TEMP TABLE sync_delete ON COMMIT DROP AS
+        SELECT gid, status FROM {target} t
+        WHERE {HASH_COLUMN} IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM sync_match m WHERE m.gid = t.gid)
+          AND NOT EXISTS (SELECT 1 FROM sync_update u WHERE u.gid = t.gid)
+    """))
+    conn.execute(text(f"""
+        UPDATE {target} t SET status = 0, {HASH_COLUMN} = NULL
+        FROM sync_delete d WHERE t.gid = d.gid
+    """))
+    return conn.execute(text("SELECT COUNT(*) FROM sync_delete WHERE status = 1")).scalar()
+
+
+def sync_layer(layer, db_url, encodings=None, batch_size=DEFAULT_BATCH_SIZE, adopt_existing=False,
+               geom_col='geometry', schema='public'):
+    """
+    增量同步单个图层（在工作进程中执行）；目标表不存在时退化为全量导入
+
+    参数:
+        layer: 图层定义 {'path', 'table', 'name', 'key'(可选)}
+        db_url: 数据库连接URL
+        encodings: 候选编码列表
+        batch_size: 每批要素数
+        adopt_existing: 是否为没有指纹的旧数据按属性与几何补写指纹
+        geom_col: 几何列名
+        schema: 模式名
+
+    返回:
+        dict: 同步统计（features 为源要素数，另含 unchanged/updated/inserted/deleted）
+    """
+    table_name = layer['table']
+    target = f"{schema}.{table_name}"
+    stats = new_layer_stats(layer)
+    timings = stats['timings']
+    started = time.perf_counter()
+
+    try:
+        engine = create_copy_engine(db_url)
+        with engine.connect() as conn:
+            exists = _table_exists(conn, table_name, schema)
+        if not exists:
+            engine.dispose()
+            stats = import_layer(layer, db_url, encodings, batch_size, geom_col, schema)
+            stats['inserted'] = stats['features']
+            return stats
+
+        t0 = time.perf_counter()
+        encoding, info, columns = open_layer(layer, encodings, geom_col)
+        stats['encoding'] = encoding
+        timings['detect'] += time.perf_counter() - t0
+
+        key = layer.get('key')
+        if key and key not in [col for col, _ in columns]:
+            key = None
+
+        # 源数据入临时表、计算差异、应用差异在同一个事务内完成
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {target} ADD COLUMN IF NOT EXISTS {HASH_COLUMN} text"))
+            create_indexes(conn, table_name, geom_col, schema)
+            _create_stage_table(conn, columns)
+            copy_layer(conn, layer, encoding, info, columns, STAGE_TABLE, stats, batch_size, geom_col)
+
+            t0 = time.perf_counter()
+            if adopt_existing:
+                stats['adopted'] = _adopt_existing(conn, target, columns, geom_col)
+            stats['unchanged'] = _match_unchanged(conn, target)
+            updated = _apply_updates(conn, target, columns, key)
+            inserted = _apply_inserts(conn, target, columns)
+            stats['deleted'] = _apply_deletes(conn, target)
+            stats['updated'] = len(updated)
+            stats['inserted'] = len(inserted)
+            refresh_derived_columns(conn, table_name, updated + inserted, geom_col)
+            timings['index'] = time.perf_counter() - t0
+        engine.dispose()
+    except Exception as e:
+        stats['error'] = str(e)
+
+    timings['total'] = time.perf_counter() - started
+    stats['peak_rss_mb'] = peak_rss_mb()
+    return stats
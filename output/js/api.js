@@ -6,6 +6,9 @@
 // API基础URL
 const API_BASE_URL = 'http://localhost:5000/api';
 
+// 简化几何各级别适用的最大缩放级别（与 backend/config.py 中 SIMPLIFY_CONFIG 的 max_zoom 一致）
+const SIMPLIFY_MAX_ZOOMS = [10, 12, 14];
+
 /**
  * 通用API请求函数
  * @param {string} url - API端点
@@ -89,14 +92,52 @@ async function deleteVillage(gid) {
     });
 }
 
+// ==================== 简化几何 ====================
+
+/**
+ * 缩放级别对应的简化级别（与服务端相同: max_zoom 不小于当前级别的最粗级别）
+ * @param {number} zoom - 地图缩放级别
+ * @returns {number|null} 该级别的 max_zoom；返回全精度几何时为 null
+ */
+function simplifyLevelForZoom(zoom) {
+    const levels = SIMPLIFY_MAX_ZOOMS.filter(maxZoom => maxZoom >= zoom);
+    return levels.length > 0 ? Math.min(...levels) : null;
+}
+
+/**
+ * 标记按缩放级别简化过的要素（feature.simplified），编辑前需重新获取全精度几何
+ * @param {Object} geojson - GeoJSON FeatureCollection
+ * @param {number} [zoom] - 请求时的缩放级别
+ * @returns {Object} 原 FeatureCollection
+ */
+function markSimplified(geojson, zoom) {
+    if (zoom !== undefined && zoom !== null && simplifyLevelForZoom(zoom) !== null) {
+        (geojson.features || []).forEach(feature => {
+            feature.simplified = true;
+        });
+    }
+    return geojson;
+}
+
 // ==================== 河渠（线）API ====================
 
 /**
  * 获取所有河渠
+ * @param {number} [zoom] - 地图缩放级别（可选，服务端按级别返回简化几何）
  * @returns {Promise<Object>} GeoJSON FeatureCollection
  */
-async function loadRivers() {
-    return await apiRequest(`${API_BASE_URL}/rivers`);
+async function loadRivers(zoom) {
+    const query = zoom !== undefined && zoom !== null ? `?zoom=${encodeURIComponent(zoom)}` : '';
+    return markSimplified(await apiRequest(`${API_BASE_URL}/rivers${query}`), zoom);
+}
+
+/**
+ * 获取单个河渠（全精度几何）
+ * @param {number} gid - 河渠ID
+ * @returns {Promise<Object>} GeoJSON Feature
+ */
+async function getRiver(gid) {
+    return await apiRequest(`${API_BASE_URL}/rivers/${gid}`);
 }
 
 /**
@@ -139,10 +180,21 @@ async function deleteRiver(gid) {
 
 /**
  * 获取所有水系
+ * @param {number} [zoom] - 地图缩放级别（可选，服务端按级别返回简化几何）
  * @returns {Promise<Object>} GeoJSON FeatureCollection
  */
-async function loadWaterBodies() {
-    return await apiRequest(`${API_BASE_URL}/water_bodies`);
+async function loadWaterBodies(zoom) {
+    const query = zoom !== undefined && zoom !== null ? `?zoom=${encodeURIComponent(zoom)}` : '';
+    return markSimplified(await apiRequest(`${API_BASE_URL}/water_bodies${query}`), zoom);
+}
+
+/**
+ * 获取单个水系（全精度几何）
+ * @param {number} gid - 水系ID
+ * @returns {Promise<Object>} GeoJSON Feature
+ */
+async function getWaterBody(gid) {
+    return await apiRequest(`${API_BASE_URL}/water_bodies/${gid}`);
 }
 
 /**
@@ -210,3 +262,69 @@ async function searchWaterBodiesByName(name) {
     return await apiRequest(`${API_BASE_URL}/water_bodies?name=${encodeURIComponent(name)}`);
 }
 
+/**
+ * 轻量查询：只返回指定字段（中心点、面积、长度、外包框、属性列），不返回几何
+ * @param {string} layer - 图层表名（villages / rivers / water_bodies）
+ * @param {Array<string>} fields - 字段列表，如 ['centroid', 'area', 'name']
+ * @returns {Promise<Object>} FeatureCollection（geometry 为 null，字段在 properties 中）
+ */
+async function loadLayerFields(layer, fields) {
+    return await apiRequest(`${API_BASE_URL}/${layer}?fields=${encodeURIComponent(fields.join(','))}`);
+}
+
+/**
+ * 加载单个图层的地名索引（gid、名称、中心点、外包框的紧凑数组，浏览器按 ETag 缓存）
+ * @param {string} layer - 图层表名（villages / rivers / water_bodies）
+ * @returns {Promise<Object>} {layer, title, count, gid: [], name: [], centroid: [[x, y]], bbox: [[minx, miny, maxx, maxy]] | null}
+ */
+async function loadLayerIndex(layer) {
+    return await apiRequest(`${API_BASE_URL}/${layer}/index`);
+}
+
+/**
+ * 加载所有图层的地名索引
+ * @param {Array<string>} [layers] - 只加载指定图层
+ * @returns {Promise<Object>} {layers: [图层索引, ...]}
+ */
+async function loadIndex(layers) {
+    const query = layers && layers.length ? `?layers=${encodeURIComponent(layers.join(','))}` : '';
+    return await apiRequest(`${API_BASE_URL}/index${query}`);
+}
+
+/**
+ * 获取当前全局变更序号（全量加载数据前调用，之后用它增量同步）
+ * @returns {Promise<Object>} {rev}
+ */
+async function getChangeRev() {
+    return await apiRequest(`${API_BASE_URL}/changes`);
+}
+
+/**
+ * 获取 since 之后的要素变更
+ * @param {number} since - 上次同步到的 rev
+ * @returns {Promise<Object>} {since, rev, has_more, layers: {villages: {upserted: FeatureCollection, deleted: [gid]}, ...}}
+ */
+async function loadChanges(since) {
+    return await apiRequest(`${API_BASE_URL}/changes?since=${encodeURIComponent(since)}`);
+}
+
+/**
+ * 订阅要素变更事件（Server-Sent Events，断线后浏览器自动重连）
+ * @param {Function} onChange - 回调，参数为 {layer, gid, op, status?, geometry?}
+ * @param {Object} [options] - {layers: ['villages'], geometry: true}
+ * @returns {EventSource} 调用 close() 取消订阅
+ */
+function subscribeEvents(onChange, options = {}) {
+    const params = new URLSearchParams();
+    if (options.layers && options.layers.length) {
+        params.set('layers', options.layers.join(','));
+    }
+    if (options.geometry) {
+        params.set('geometry', '1');
+    }
+    const query = params.toString() ? `?${params}` : '';
+    const source = new EventSource(`${API_BASE_URL}/events${query}`);
+    source.addEventListener('change', (e) => onChange(JSON.parse(e.data)));
+    return source;
+}
+
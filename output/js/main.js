@@ -204,11 +204,11 @@ async function initLabeling() {
                 console.warn('API加载失败，尝试从文件加载:', e);
                 return loadGeoJSON('data/points.geojson');
             }),
-            loadRivers().catch(e => {
+            loadRivers(mapObj.getZoom()).catch(e => {
                 console.warn('API加载失败，尝试从文件加载:', e);
                 return loadGeoJSON('data/lines.geojson');
             }),
-            loadWaterBodies().catch(e => {
+            loadWaterBodies(mapObj.getZoom()).catch(e => {
                 console.warn('API加载失败，尝试从文件加载:', e);
                 return loadGeoJSON('data/polygons.geojson');
             })
@@ -413,7 +413,7 @@ function bindDoubleClickEdit(layer) {
     layer.off('dblclick');
     
     // 绑定双击事件
-    layer.on('dblclick', function(e) {
+    layer.on('dblclick', async function(e) {
         // 阻止默认行为（地图放大）和事件传播
         if (e.originalEvent) {
             e.originalEvent.preventDefault();
@@ -497,6 +497,20 @@ function bindDoubleClickEdit(layer) {
             type = typeMap[layer.featureType];
         }
         
+        // 按缩放级别加载的是简化几何，直接编辑保存会丢失顶点，先取全精度几何
+        if (type && layer.feature && layer.feature.simplified && feature.properties.gid) {
+            const getFullFeature = { rivers: getRiver, water_bodies: getWaterBody }[layer.featureType];
+            if (getFullFeature) {
+                try {
+                    feature.geometry = (await getFullFeature(feature.properties.gid)).geometry;
+                } catch (error) {
+                    console.error('获取要素完整几何失败:', error);
+                    alert('获取要素完整几何失败：' + error.message);
+                    return;
+                }
+            }
+        }
+        
         if (type) {
             // 保存当前要素引用（不包含图层引用，避免循环）
             planningTool.currentFeature = feature;
@@ -82,7 +82,16 @@ function findFeatureById(featureCollection, featureId) {
  * @returns {Array|null} [经度, 纬度]，无效返回null
  */
 function getFeatureCoordinates(feature) {
-    if (!feature || !feature.geometry) {
+    if (!feature) {
+        return null;
+    }
+    
+    // 服务端维护的中心点（fields=centroid 轻量查询返回，不含几何）
+    if (feature.properties && Array.isArray(feature.properties.centroid)) {
+        return feature.properties.centroid;
+    }
+    
+    if (!feature.geometry) {
         return null;
     }
     
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+执行数据库迁移脚本：添加变更序号（rev / updated_at / rev_xid）列、索引与触发器，支持 /api/changes 增量同步
+（rev_xid 为 xid8 类型，需要 PostgreSQL 13 及以上）
+"""
+
+import sys
+from pathlib import Path
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.config import get_database_url, LAYER_TABLES
+from backend.utils.changes import REV_COLUMN, REV_SEQUENCE, ensure_change_tracking
+from sqlalchemy import create_engine, text
+
+def execute_migration():
+    """执行数据库迁移"""
+    print("=" * 50)
+    print("执行数据库迁移：添加变更序号列与触发器")
+    print("=" * 50)
+    
+    engine = create_engine(get_database_url())
+    tables = list(LAYER_TABLES)
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            for i, table in enumerate(tables, 1):
+                print(f"\n[{i}/{len(tables)}] 处理{table}表...")
+                # 已有记录在添加列时按顺序分配 rev
+                ensure_change_tracking(conn, table)
+                print(f"[OK] {table}: rev/updated_at/rev_xid 列、索引与触发器已就绪")
+            
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            print(f"\n[ERROR] 数据库迁移失败: {e}")
+            import traceback
+            print(traceback.format_exc())
+            return False
+        
+        # 验证
+        print("\n验证变更序号...")
+        for table in tables:
+            row = conn.execute(text(
+                f"SELECT COUNT(*), COUNT({REV_COLUMN}), MAX({REV_COLUMN}) FROM {table}"
+            )).fetchone()
+            print(f"  {table}: 记录数={row[0]}, 已分配rev={row[1]}, 最大rev={row[2]}")
+        current = conn.execute(text(f"SELECT last_value FROM {REV_SEQUENCE}")).scalar()
+        print(f"  当前全局rev: {current}")
+    
+    print("\n" + "=" * 50)
+    print("数据库迁移成功完成！")
+    print("=" * 50)
+    return True
+
+if __name__ == '__main__':
+    success = execute_migration()
+    sys.exit(0 if success else 1)
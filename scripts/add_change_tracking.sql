@@ -0,0 +1,52 @@
+-- ====================================================
+-- 添加变更序号（rev / updated_at / rev_xid）列与触发器
+-- 与 backend/utils/changes.py 的 change_tracking_sql() 保持一致：所有图层共用全局序列 feature_rev_seq，
+-- 插入时由列默认值赋值，更新（含软删除）时由触发器重新赋值
+-- rev_xid 为写入事务号，/api/changes 与快照同步按它取增量（xid8 类型，需要 PostgreSQL 13 及以上）
+-- ====================================================
+
+-- 1. 全局序列与触发器函数
+CREATE SEQUENCE IF NOT EXISTS feature_rev_seq;
+
+CREATE OR REPLACE FUNCTION set_feature_rev() RETURNS trigger AS $$
+BEGIN
+    NEW.rev := nextval('feature_rev_seq');
+    NEW.updated_at := now();
+    NEW.rev_xid := pg_current_xact_id();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 2. 为villages表添加变更序号（已有记录按顺序分配rev）
+ALTER TABLE villages ADD COLUMN IF NOT EXISTS rev bigint DEFAULT nextval('feature_rev_seq');
+ALTER TABLE villages ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+ALTER TABLE villages ADD COLUMN IF NOT EXISTS rev_xid xid8 DEFAULT pg_current_xact_id();
+CREATE INDEX IF NOT EXISTS idx_villages_rev ON villages (rev);
+CREATE INDEX IF NOT EXISTS idx_villages_rev_xid ON villages (rev_xid);
+DROP TRIGGER IF EXISTS trg_villages_rev ON villages;
+CREATE TRIGGER trg_villages_rev BEFORE UPDATE ON villages FOR EACH ROW EXECUTE FUNCTION set_feature_rev();
+
+-- 3. 为rivers表添加变更序号
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS rev bigint DEFAULT nextval('feature_rev_seq');
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS rev_xid xid8 DEFAULT pg_current_xact_id();
+CREATE INDEX IF NOT EXISTS idx_rivers_rev ON rivers (rev);
+CREATE INDEX IF NOT EXISTS idx_rivers_rev_xid ON rivers (rev_xid);
+DROP TRIGGER IF EXISTS trg_rivers_rev ON rivers;
+CREATE TRIGGER trg_rivers_rev BEFORE UPDATE ON rivers FOR EACH ROW EXECUTE FUNCTION set_feature_rev();
+
+-- 4. 为water_bodies表添加变更序号
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS rev bigint DEFAULT nextval('feature_rev_seq');
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS updated_at timestamptz DEFAULT now();
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS rev_xid xid8 DEFAULT pg_current_xact_id();
+CREATE INDEX IF NOT EXISTS idx_water_bodies_rev ON water_bodies (rev);
+CREATE INDEX IF NOT EXISTS idx_water_bodies_rev_xid ON water_bodies (rev_xid);
+DROP TRIGGER IF EXISTS trg_water_bodies_rev ON water_bodies;
+CREATE TRIGGER trg_water_bodies_rev BEFORE UPDATE ON water_bodies FOR EACH ROW EXECUTE FUNCTION set_feature_rev();
+
+-- 5. 验证
+SELECT 'villages' AS table_name, COUNT(*) AS total, COUNT(rev) AS with_rev, MAX(rev) AS max_rev FROM villages
+UNION ALL
+SELECT 'rivers', COUNT(*), COUNT(rev), MAX(rev) FROM rivers
+UNION ALL
+SELECT 'water_bodies', COUNT(*), COUNT(rev), MAX(rev) FROM water_bodies;
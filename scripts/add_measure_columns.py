@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+执行数据库迁移脚本：添加面积/长度/中心点/外包框派生列
+"""
+
+import sys
+from pathlib import Path
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.config import get_database_url, MEASURE_CONFIG
+from backend.utils.db import refresh_derived_columns
+from backend.utils.measures import get_measure_column_types
+from sqlalchemy import create_engine, text
+
+def execute_migration():
+    """执行数据库迁移"""
+    print("=" * 50)
+    print("执行数据库迁移：添加面积/长度/中心点/外包框列")
+    print("=" * 50)
+    
+    engine = create_engine(get_database_url())
+    tables = list(MEASURE_CONFIG)
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            for i, table in enumerate(tables, 1):
+                print(f"\n[{i}/{len(tables)}] 处理{table}表...")
+                for col, col_type in get_measure_column_types(table):
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {col} {col_type}"))
+                    print(f"[OK] {col} 列已就绪 ({col_type})")
+                
+                # 同时刷新简化几何等其他派生列
+                updated = refresh_derived_columns(conn, table)
+                print(f"[OK] {table}: {updated} 条记录派生列已填充")
+            
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            print(f"\n[ERROR] 数据库迁移失败: {e}")
+            import traceback
+            print(traceback.format_exc())
+            return False
+        
+        # 验证
+        print("\n验证派生列...")
+        for table in tables:
+            row = conn.execute(text(
+                f"SELECT COUNT(*), COUNT(centroid) FROM {table}"
+            )).fetchone()
+            print(f"  {table}: 记录数={row[0]}, 已计算中心点={row[1]}")
+    
+    print("\n" + "=" * 50)
+    print("数据库迁移成功完成！")
+    print("=" * 50)
+    return True
+
+if __name__ == '__main__':
+    success = execute_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,52 @@
+-- ====================================================
+-- 添加面积/长度/中心点/外包框派生列
+-- 与 backend/config.py 中 MEASURE_CONFIG 保持一致（面积、长度按椭球面计算）
+-- ====================================================
+
+-- 1. 为villages表添加中心点、外包框列
+ALTER TABLE villages ADD COLUMN IF NOT EXISTS centroid geometry(Point, 4326);
+ALTER TABLE villages ADD COLUMN IF NOT EXISTS bbox_minx double precision;
+ALTER TABLE villages ADD COLUMN IF NOT EXISTS bbox_miny double precision;
+ALTER TABLE villages ADD COLUMN IF NOT EXISTS bbox_maxx double precision;
+ALTER TABLE villages ADD COLUMN IF NOT EXISTS bbox_maxy double precision;
+
+-- 2. 为rivers表添加长度、中心点、外包框列
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS length_m double precision;
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS centroid geometry(Point, 4326);
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS bbox_minx double precision;
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS bbox_miny double precision;
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS bbox_maxx double precision;
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS bbox_maxy double precision;
+
+-- 3. 为water_bodies表添加面积、周长、中心点、外包框列
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS area_m2 double precision;
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS length_m double precision;
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS centroid geometry(Point, 4326);
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS bbox_minx double precision;
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS bbox_miny double precision;
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS bbox_maxx double precision;
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS bbox_maxy double precision;
+
+-- 4. 填充现有数据
+UPDATE villages SET
+    centroid = ST_Centroid(geometry),
+    bbox_minx = ST_XMin(geometry), bbox_miny = ST_YMin(geometry),
+    bbox_maxx = ST_XMax(geometry), bbox_maxy = ST_YMax(geometry);
+UPDATE rivers SET
+    length_m = ST_Length(geometry::geography),
+    centroid = ST_Centroid(geometry),
+    bbox_minx = ST_XMin(geometry), bbox_miny = ST_YMin(geometry),
+    bbox_maxx = ST_XMax(geometry), bbox_maxy = ST_YMax(geometry);
+UPDATE water_bodies SET
+    area_m2 = ST_Area(geometry::geography),
+    length_m = ST_Perimeter(geometry::geography),
+    centroid = ST_Centroid(geometry),
+    bbox_minx = ST_XMin(geometry), bbox_miny = ST_YMin(geometry),
+    bbox_maxx = ST_XMax(geometry), bbox_maxy = ST_YMax(geometry);
+
+-- 5. 验证
+SELECT 'villages' AS table_name, COUNT(*) AS total, COUNT(centroid) AS with_centroid, NULL::double precision AS total_m FROM villages
+UNION ALL
+SELECT 'rivers', COUNT(*), COUNT(centroid), SUM(length_m) FROM rivers
+UNION ALL
+SELECT 'water_bodies', COUNT(*), COUNT(centroid), SUM(area_m2) FROM water_bodies;
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+执行数据库迁移脚本：添加几何简化金字塔列
+"""
+
+import sys
+from pathlib import Path
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.config import get_database_url, SIMPLIFY_CONFIG
+from backend.utils.db import refresh_derived_columns
+from backend.utils.simplify import get_simplify_levels
+from sqlalchemy import create_engine, text
+
+def execute_migration():
+    """执行数据库迁移"""
+    print("=" * 50)
+    print("执行数据库迁移：添加几何简化金字塔列")
+    print("=" * 50)
+    
+    engine = create_engine(get_database_url())
+    tables = SIMPLIFY_CONFIG['tables']
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            for i, table in enumerate(tables, 1):
+                print(f"\n[{i}/{len(tables)}] 处理{table}表...")
+                for level in get_simplify_levels(table):
+                    conn.execute(text(
+                        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {level['column']} geometry(Geometry, 4326)"
+                    ))
+                    print(f"[OK] {level['column']} 列已就绪 (容差: {level['tolerance']})")
+                
+                updated = refresh_derived_columns(conn, table)
+                print(f"[OK] {table}: {updated} 条记录简化几何已填充")
+            
+            trans.commit()
+        except Exception as e:
+            trans.rollback()
+            print(f"\n[ERROR] 数据库迁移失败: {e}")
+            import traceback
+            print(traceback.format_exc())
+            return False
+        
+        # 验证各级别顶点数
+        print("\n验证各级别顶点数...")
+        for table in tables:
+            columns = ['geometry'] + [level['column'] for level in get_simplify_levels(table)]
+            sums = ', '.join(f"SUM(ST_NPoints({col}))" for col in columns)
+            row = conn.execute(text(f"SELECT {sums} FROM {table}")).fetchone()
+            summary = ', '.join(f"{col}={value}" for col, value in zip(columns, row))
+            print(f"  {table}: {summary}")
+    
+    print("\n" + "=" * 50)
+    print("数据库迁移成功完成！")
+    print("=" * 50)
+    return True
+
+if __name__ == '__main__':
+    success = execute_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,39 @@
+-- ====================================================
+-- 添加几何简化金字塔列（线、面图层）
+-- 容差与 backend/config.py 中 SIMPLIFY_CONFIG 保持一致
+-- ====================================================
+
+-- 1. 为rivers表添加简化几何列
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS geom_s1 geometry(Geometry, 4326);
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS geom_s2 geometry(Geometry, 4326);
+ALTER TABLE rivers ADD COLUMN IF NOT EXISTS geom_s3 geometry(Geometry, 4326);
+
+-- 2. 为water_bodies表添加简化几何列
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS geom_s1 geometry(Geometry, 4326);
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS geom_s2 geometry(Geometry, 4326);
+ALTER TABLE water_bodies ADD COLUMN IF NOT EXISTS geom_s3 geometry(Geometry, 4326);
+
+-- 3. 填充现有数据（保拓扑简化）
+UPDATE rivers SET
+    geom_s1 = ST_SimplifyPreserveTopology(geometry, 0.00004),
+    geom_s2 = ST_SimplifyPreserveTopology(geometry, 0.00015),
+    geom_s3 = ST_SimplifyPreserveTopology(geometry, 0.0006);
+UPDATE water_bodies SET
+    geom_s1 = ST_SimplifyPreserveTopology(geometry, 0.00004),
+    geom_s2 = ST_SimplifyPreserveTopology(geometry, 0.00015),
+    geom_s3 = ST_SimplifyPreserveTopology(geometry, 0.0006);
+
+-- 4. 验证各级别顶点数
+SELECT 'rivers' AS table_name,
+    SUM(ST_NPoints(geometry)) AS full_points,
+    SUM(ST_NPoints(geom_s1)) AS s1_points,
+    SUM(ST_NPoints(geom_s2)) AS s2_points,
+    SUM(ST_NPoints(geom_s3)) AS s3_points
+FROM rivers
+UNION ALL
+SELECT 'water_bodies',
+    SUM(ST_NPoints(geometry)),
+    SUM(ST_NPoints(geom_s1)),
+    SUM(ST_NPoints(geom_s2)),
+    SUM(ST_NPoints(geom_s3))
+FROM water_bodies;
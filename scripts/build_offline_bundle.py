@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+生成离线数据包：所有图层导出为 GeoPackage / FlatGeobuf / GeoParquet，附 manifest.json，打包为 zip
+
+用法:
+    python scripts/build_offline_bundle.py                          # 全部图层，输出到 output/offline/<日期>-r<rev>/
+    python scripts/build_offline_bundle.py --formats gpkg fgb --srid 4547 --version 2024q2
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.config import EXPORT_CONFIG, LAYER_TABLES
+from backend.utils.crs import parse_srid
+from backend.utils.export import EXPORT_FORMATS, build_bundle
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description='生成带版本号的离线数据包（所有图层）')
+    parser.add_argument('--layers', nargs='+', choices=list(LAYER_TABLES), help='只导出指定的表（默认全部）')
+    parser.add_argument('--formats', nargs='+', choices=list(EXPORT_FORMATS),
+                        help=f"导出格式（默认: {' '.join(EXPORT_CONFIG['bundle_formats'])}，未安装 pyarrow 时跳过 parquet）")
+    parser.add_argument('--srid', default=None, help='输出坐标系 EPSG 代码（默认: 4326）')
+    parser.add_argument('--output-dir', default=None, help=f"输出目录（默认: {EXPORT_CONFIG['bundle_dir']}）")
+    parser.add_argument('--version', default=None, help='数据包版本（默认: 日期-r全局rev）')
+    parser.add_argument('--no-zip', action='store_true', help='不生成 zip 压缩包')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        srid = parse_srid(args.srid)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("=" * 50)
+    print("生成离线数据包")
+    print("=" * 50)
+    try:
+        manifest = build_bundle(args.layers, args.formats, srid, args.output_dir, args.version,
+                                archive=not args.no_zip)
+    except Exception as e:
+        print(f"\n[ERROR] 生成离线数据包失败: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return False
+
+    print(f"\n版本: {manifest['version']}（rev {manifest['rev']}）")
+    for table, layer in manifest['layers'].items():
+        sizes = ', '.join(f"{fmt} {item['bytes'] / 1024:.1f} KB" for fmt, item in layer['files'].items())
+        print(f"  {table}: {layer['features']} 个要素; {sizes}")
+    print(f"目录: {manifest['path']}")
+    if manifest['archive']:
+        print(f"压缩包: {manifest['archive']}")
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+整层冲突检查：找出图层中重叠的面、共线重叠的线、自相交的线和重复的点（多进程并行）
+
+用法:
+    python scripts/check_conflicts.py                       # 检查全部图层
+    python scripts/check_conflicts.py --layers water_bodies --workers 4 --output conflicts.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.config import CONFLICT_CONFIG, LAYER_TABLES
+from backend.utils.conflicts import check_layer
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description='检查图层内要素之间的重叠、重复与自相交')
+    parser.add_argument('--layers', nargs='+', choices=list(LAYER_TABLES), help='只检查指定的表（默认全部）')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认: CPU数）')
+    parser.add_argument('--chunk-size', type=int, default=CONFLICT_CONFIG['chunk_size'],
+                        help=f"每个任务的要素数（默认: {CONFLICT_CONFIG['chunk_size']}）")
+    parser.add_argument('--output', default=None, help='把完整结果写入 JSON 文件')
+    parser.add_argument('--show', type=int, default=10, help='每个图层在终端列出的冲突数（默认: 10）')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    tables = args.layers or list(LAYER_TABLES)
+
+    print("=" * 50)
+    print("整层冲突检查")
+    print("=" * 50)
+    results = []
+    for i, table in enumerate(tables, 1):
+        print(f"\n[{i}/{len(tables)}] 检查{table}表...")
+        try:
+            result = check_layer(table, workers=args.workers, chunk_size=args.chunk_size)
+        except Exception as e:
+            print(f"[ERROR] 检查 {table} 失败: {e}")
+            import traceback
+            print(traceback.format_exc())
+            return False
+        results.append(result)
+        print(f"  要素数={result['features']}, 冲突数={len(result['conflicts'])}, 耗时={result['elapsed_seconds']}s")
+        for conflict in result['conflicts'][:args.show]:
+            print(f"  {json.dumps(conflict, ensure_ascii=False)}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)